@@ -10,6 +10,24 @@ class Config:
 	DEBUG = os.getenv('FLASK_DEBUG', 'True').lower() == 'true'
 	JWT_SECRET = os.getenv('JWT_SECRET', SECRET_KEY)
 	JWT_EXPIRES_MINUTES = int(os.getenv('JWT_EXPIRES_MINUTES', '60'))
+	# Opt-in: short-lived access tokens carrying user claims, plus rotating refresh tokens
+	JWT_STATELESS_TOKENS = os.getenv('JWT_STATELESS_TOKENS', 'False').lower() == 'true'
+	JWT_ACCESS_EXPIRES_MINUTES = int(os.getenv('JWT_ACCESS_EXPIRES_MINUTES', '15'))
+	JWT_REFRESH_EXPIRES_DAYS = int(os.getenv('JWT_REFRESH_EXPIRES_DAYS', '30'))
+
+	# Authenticated-user cache used by token_required (per worker process)
+	USER_CACHE_MAX_SIZE = int(os.getenv('USER_CACHE_MAX_SIZE', '10000'))
+	USER_CACHE_TTL_SECONDS = int(os.getenv('USER_CACHE_TTL_SECONDS', '60'))
+
+	# Hot-prefix cache for /users/search (per worker process)
+	USER_SEARCH_CACHE_MAX_SIZE = int(os.getenv('USER_SEARCH_CACHE_MAX_SIZE', '2048'))
+	USER_SEARCH_CACHE_TTL_SECONDS = int(os.getenv('USER_SEARCH_CACHE_TTL_SECONDS', '30'))
+
+	# Password hashing (work factor is part of the method string)
+	PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+	PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '2'))
+	PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', '16'))
+	PASSWORD_HASH_TIMEOUT_SECONDS = float(os.getenv('PASSWORD_HASH_TIMEOUT_SECONDS', '10'))
 
 	# MongoDB settings
 	# In debug mode, force use of MONGO_DEV_URI
@@ -32,6 +50,53 @@ class Config:
 	MAX_CONTENT_LENGTH = 500 * 1024 * 1024  # 500MB - Flask request size limit
 	ALLOWED_EXTENSIONS = {'glb', 'gltf', 'png', 'jpg', 'jpeg'}
 
+	# Disk cache for images proxied from NextCloud (shared by workers on a host)
+	IMAGE_CACHE_DIR = os.getenv('IMAGE_CACHE_DIR', os.path.join('uploads', 'image_cache'))
+	IMAGE_CACHE_MAX_BYTES = int(os.getenv('IMAGE_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+	IMAGE_CACHE_REVALIDATE_SECONDS = int(os.getenv('IMAGE_CACHE_REVALIDATE_SECONDS', '3600'))
+	PROFILE_PICTURE_MAX_AGE_SECONDS = int(os.getenv('PROFILE_PICTURE_MAX_AGE_SECONDS', '300'))
+	# /api/public/image/<file_id>; every upload gets a new file id, so this can outlive profile pictures.
+	PUBLIC_IMAGE_MAX_AGE_SECONDS = int(os.getenv('PUBLIC_IMAGE_MAX_AGE_SECONDS', '3600'))
+	IMAGE_VARIANT_MAX_DIMENSION = int(os.getenv('IMAGE_VARIANT_MAX_DIMENSION', '2048'))
+	IMAGE_VARIANT_QUALITY = int(os.getenv('IMAGE_VARIANT_QUALITY', '82'))
+
+	# Cursor pagination for list endpoints
+	PAGINATION_DEFAULT_LIMIT = int(os.getenv('PAGINATION_DEFAULT_LIMIT', '50'))
+	PAGINATION_MAX_LIMIT = int(os.getenv('PAGINATION_MAX_LIMIT', '100'))
+	USER_BATCH_MAX_IDS = int(os.getenv('USER_BATCH_MAX_IDS', '100'))
+	# Scheduled by worker.py as a deduplicated counters.reconcile job; 0 disables it.
+	COUNTER_RECONCILE_INTERVAL_SECONDS = int(os.getenv('COUNTER_RECONCILE_INTERVAL_SECONDS', '3600'))
+	COUNTER_RECONCILE_BATCH_SIZE = int(os.getenv('COUNTER_RECONCILE_BATCH_SIZE', '500'))
+	TIMELINE_FANOUT_MAX_FOLLOWERS = int(os.getenv('TIMELINE_FANOUT_MAX_FOLLOWERS', '10000'))
+	TIMELINE_MAX_ENTRIES = int(os.getenv('TIMELINE_MAX_ENTRIES', '500'))
+	PUBLISHED_FEED_CACHE_PAGES = int(os.getenv('PUBLISHED_FEED_CACHE_PAGES', '3'))
+	PUBLISHED_FEED_CACHE_TTL_SECONDS = float(os.getenv('PUBLISHED_FEED_CACHE_TTL_SECONDS', '10'))
+	PUBLISHED_FEED_CACHE_MAX_SIZE = int(os.getenv('PUBLISHED_FEED_CACHE_MAX_SIZE', '256'))
+	PUBLISHED_FEED_CACHE_SHARED = os.getenv('PUBLISHED_FEED_CACHE_SHARED', 'False').lower() == 'true'
+	# Scheduled by worker.py as a deduplicated trending.refresh job; 0 disables it.
+	TRENDING_REFRESH_INTERVAL_SECONDS = int(os.getenv('TRENDING_REFRESH_INTERVAL_SECONDS', '300'))
+	TRENDING_HALF_LIFE_HOURS = float(os.getenv('TRENDING_HALF_LIFE_HOURS', '24'))
+	TRENDING_WINDOW_HOURS = float(os.getenv('TRENDING_WINDOW_HOURS', '168'))
+	TRENDING_COMMENT_WEIGHT = float(os.getenv('TRENDING_COMMENT_WEIGHT', '2'))
+	JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '5'))
+	JOB_BASE_BACKOFF_SECONDS = float(os.getenv('JOB_BASE_BACKOFF_SECONDS', '5'))
+	JOB_MAX_BACKOFF_SECONDS = float(os.getenv('JOB_MAX_BACKOFF_SECONDS', '600'))
+	JOB_LEASE_SECONDS = float(os.getenv('JOB_LEASE_SECONDS', '300'))
+	JOB_BATCH_SIZE = int(os.getenv('JOB_BATCH_SIZE', '50'))
+	JOB_POLL_INTERVAL_SECONDS = float(os.getenv('JOB_POLL_INTERVAL_SECONDS', '1'))
+	# /api/jobs/stats answers 503 past either threshold, e.g. when no worker is running.
+	JOB_QUEUE_ALERT_DEPTH = int(os.getenv('JOB_QUEUE_ALERT_DEPTH', '1000'))
+	JOB_QUEUE_ALERT_AGE_SECONDS = float(os.getenv('JOB_QUEUE_ALERT_AGE_SECONDS', '300'))
+	LIKE_WRITE_BEHIND = os.getenv('LIKE_WRITE_BEHIND', 'False').lower() == 'true'
+	LIKE_BUFFER_MAX_PENDING = int(os.getenv('LIKE_BUFFER_MAX_PENDING', '10000'))
+	LIKE_BUFFER_FLUSH_SIZE = int(os.getenv('LIKE_BUFFER_FLUSH_SIZE', '500'))
+	LIKE_BUFFER_FLUSH_INTERVAL_SECONDS = float(os.getenv('LIKE_BUFFER_FLUSH_INTERVAL_SECONDS', '1'))
+	THUMBNAIL_STORE_BACKEND = os.getenv('THUMBNAIL_STORE_BACKEND', 'gridfs')
+	THUMBNAIL_STORE_DIR = os.getenv('THUMBNAIL_STORE_DIR', os.path.join('uploads', 'thumbnail_store'))
+	THUMBNAIL_IMMUTABLE_MAX_AGE_SECONDS = int(os.getenv('THUMBNAIL_IMMUTABLE_MAX_AGE_SECONDS', '31536000'))
+	FOLLOW_GRAPH_REFRESH_SECONDS = int(os.getenv('FOLLOW_GRAPH_REFRESH_SECONDS', '600'))
+	FOLLOW_SUGGESTIONS_TIME_BUDGET_MS = int(os.getenv('FOLLOW_SUGGESTIONS_TIME_BUDGET_MS', '50'))
+
 	# CORS settings
 	CORS_ORIGINS = [
 		"http://localhost:3000",
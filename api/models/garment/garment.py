@@ -15,6 +15,7 @@ class Garment(ABC):
         gender: Gender,
         display_name: Optional[str] = None,
         thumbnail_url: Optional[str] = None,
+        style: Optional[str] = None,
         created_at: Optional[datetime] = None,
         is_custom: bool = False,
         id: Optional[str] = None,
@@ -31,6 +32,7 @@ class Garment(ABC):
             gender: Target gender (Gender enum)
             display_name: Name to display for the garment (defaults to name if not provided)
             thumbnail_url: Optional thumbnail URL for UI previews
+            style: Optional catalog style such as 'casual' or 'formal'
             created_at: Creation timestamp
             is_custom: Flag indicating if the garment is custom
             id: Optional custom ID field from database
@@ -45,6 +47,7 @@ class Garment(ABC):
         self.is_custom = is_custom
         self.display_name = display_name or name  # Fallback to name if not provided
         self.thumbnail_url = thumbnail_url
+        self.style = style
         self.id = id  # Custom id field from database
         self._id = None  # MongoDB _id field
         self.custom_position = custom_position  # [x, y, z] position coordinates
@@ -62,6 +65,7 @@ class Garment(ABC):
             "is_custom": self.is_custom,
             "display_name": self.display_name,
             "thumbnail_url": self.thumbnail_url,
+            "style": self.style,
         }
         # Include optional custom position and scale if present
         if self.custom_position is not None:
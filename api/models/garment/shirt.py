@@ -19,6 +19,7 @@ class Shirt(Garment):
             id=data.get("id") or data.get("_id"),
             display_name=data.get("display_name"),
             thumbnail_url=data.get("thumbnail_url"),
+            style=data.get("style"),
             is_custom=data.get("is_custom", False),
             custom_position=data.get("custom_position"),
             custom_scale=data.get("custom_scale"),
@@ -34,7 +34,7 @@ class Outfit:
 			skirt: Skirt garment id
 			accessory: Accessory garment id
 			published: Whether outfit is published
-			thumbnail: Base64-encoded thumbnail image (no size limit)
+			thumbnail: Base64-encoded thumbnail image from the payload; stored in the thumbnail store, not on the document
 			created_at: Creation timestamp
 		"""
 		self.name = name
@@ -48,6 +48,10 @@ class Outfit:
 		self.thumbnail = thumbnail
 		self.published = published
 		self.created_at = created_at or datetime.now(timezone.utc)
+		self.has_thumbnail = bool(thumbnail)
+		self.thumbnail_hash = None
+		self.like_count = 0
+		self.comment_count = 0
 		self._id = None  # Set by database
 
 	@staticmethod
@@ -90,11 +94,31 @@ class Outfit:
 			created_at=outfit_doc.get('created_at'),
 		)
 		outfit._id = outfit_doc.get('_id')
+		# List reads project the inline thumbnail out and rely on the stored flag.
+		outfit.thumbnail_hash = outfit_doc.get('thumbnail_hash')
+		outfit.has_thumbnail = outfit_doc.get(
+			'has_thumbnail', bool(outfit_doc.get('thumbnail') or outfit.thumbnail_hash)
+		)
+		# Denormalized counters maintained by CounterService.
+		outfit.like_count = max(outfit_doc.get('like_count') or 0, 0)
+		outfit.comment_count = max(outfit_doc.get('comment_count') or 0, 0)
 		return outfit
 
-	def to_dict(self) -> Dict[str, Any]:
-		"""Serialize to dictionary."""
-		return {
+	def to_dict(self, include_thumbnail: bool = False) -> Dict[str, Any]:
+		"""Serialize to dictionary.
+
+		The inline base64 thumbnail is only included when include_thumbnail is
+		set; otherwise clients load it from thumbnail_url. The URL carries the
+		content hash, so it changes whenever the image does and can be cached
+		forever.
+		"""
+		thumbnail_url = None
+		if self._id and self.has_thumbnail:
+			thumbnail_url = f'/api/outfits/{self._id}/thumbnail'
+			if self.thumbnail_hash:
+				thumbnail_url = f'{thumbnail_url}?v={self.thumbnail_hash}'
+
+		outfit_dict = {
 			'id': str(self._id) if self._id else None,
 			'name': self.name,
 			'user_id': self.user_id,
@@ -104,8 +128,13 @@ class Outfit:
 			'pants': self.pants,
 			'skirt': self.skirt,
 			'accessory': self.accessory,
-			'thumbnail': self.thumbnail,
+			'thumbnail_url': thumbnail_url,
 			'published': self.published,
 			'created_at': self.created_at,
+			'like_count': self.like_count,
+			'comment_count': self.comment_count,
 		}
+		if include_thumbnail:
+			outfit_dict['thumbnail'] = self.thumbnail
+		return outfit_dict
 	
@@ -36,6 +36,9 @@ class User:
 		self.role = role
 		self.created_at = created_at or datetime.now(timezone.utc)
 		self.password_hash = None
+		self.follower_count = 0
+		self.following_count = 0
+		self.outfit_count = 0
 		self._id = None  # Set by database
 
 	@staticmethod
@@ -71,16 +74,25 @@ class User:
 		)
 		user._id = user_doc.get('_id')
 		user.password_hash = user_doc.get('password_hash')
+		# Denormalized counters maintained by CounterService.
+		user.follower_count = max(user_doc.get('follower_count') or 0, 0)
+		user.following_count = max(user_doc.get('following_count') or 0, 0)
+		user.outfit_count = max(user_doc.get('outfit_count') or 0, 0)
 		return user
 
-	def set_password(self, password: str) -> None:
-		"""Hash and set password."""
+	def set_password(self, password: str, hasher=None) -> None:
+		"""Hash and set password, using the given PasswordHasher when provided."""
+		if hasher is not None:
+			self.password_hash = hasher.hash_password(password)
+			return
 		self.password_hash = generate_password_hash(password, method='pbkdf2:sha256')
 
-	def verify_password(self, password: str) -> bool:
-		"""Verify password against hash."""
+	def verify_password(self, password: str, hasher=None) -> bool:
+		"""Verify password against hash, using the given PasswordHasher when provided."""
 		if self.password_hash is None:
 			return False
+		if hasher is not None:
+			return hasher.verify_password(self.password_hash, password)
 		return check_password_hash(self.password_hash, password)
 
 	def to_dict(self) -> Dict[str, Any]:
@@ -94,4 +106,7 @@ class User:
 			'birthday': self.birthday,
 			'role': self.role,
 			'created_at': self.created_at.isoformat() if self.created_at else None,
+			'follower_count': self.follower_count,
+			'following_count': self.following_count,
+			'outfit_count': self.outfit_count,
 		}
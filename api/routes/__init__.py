@@ -6,8 +6,10 @@ from api.routes.outfits import outfits_bp
 from api.routes.outfit_likes import outfit_likes_bp
 from api.routes.outfit_comments import outfit_comments_bp
 from api.routes.follows import follows_bp
+from api.routes.feed import feed_bp
 from api.routes.files import files_bp
 from api.routes.garments import garments_bp
+from api.routes.jobs import jobs_bp
 from api.routes.wardrobes import wardrobes_bp
 
 
@@ -20,9 +22,11 @@ def register_blueprints(app):
         outfit_likes_bp,
         outfit_comments_bp,
         follows_bp,
+        feed_bp,
         wardrobes_bp,
         files_bp,
         garments_bp,
+        jobs_bp,
     ]
     
     for blueprint in blueprints:
@@ -36,8 +40,10 @@ __all__ = [
     'outfit_likes_bp',
     'outfit_comments_bp',
     'follows_bp',
+    'feed_bp',
     'wardrobes_bp',
     'files_bp',
     'garments_bp',
+    'jobs_bp',
     'register_blueprints',
 ]
@@ -1,18 +1,57 @@
 from datetime import datetime, timedelta, timezone
 from functools import wraps
+import hashlib
+import secrets
 import jwt
 from bson import ObjectId
 from flask import Blueprint, current_app, g, jsonify, request
+from pymongo.collation import Collation
+from pymongo.errors import DuplicateKeyError
 
 from api.models.user import User
+from api.services.password_service import HashingUnavailableError
+from api.services.user_search_service import UserSearchService, name_search_fields
 
 auth_bp = Blueprint('auth', __name__)
 
+# Matches the collation of the unique name/email indexes so lookups can use them.
+IDENTITY_COLLATION = Collation(locale='en', strength=2)
+
 
 def _get_jwt_secret():
 	return current_app.config.get('JWT_SECRET', current_app.config.get('SECRET_KEY'))
 
 
+def _duplicate_identity_field(err):
+	"""Return which identity field ('name' or 'email') a DuplicateKeyError refers to."""
+	details = getattr(err, 'details', None) or {}
+	key_pattern = details.get('keyPattern') or details.get('keyValue') or {}
+	for field in ('email', 'name'):
+		if field in key_pattern:
+			return field
+
+	message = str(err)
+	for field in ('email', 'name'):
+		if f'{field}_' in message or f'{field}:' in message:
+			return field
+	return 'name or email'
+
+
+def _get_password_hasher():
+	return getattr(current_app, 'password_hasher', None)
+
+
+def _hashing_unavailable_response(err):
+	print(f"Password hashing unavailable: {err}", flush=True)
+	response = jsonify({'error': 'server busy, please retry'})
+	response.headers['Retry-After'] = '1'
+	return response, 503
+
+
+def _stateless_tokens_enabled():
+	return bool(current_app.config.get('JWT_STATELESS_TOKENS', False))
+
+
 def _generate_token(user_doc):
 	expires_in = current_app.config.get('JWT_EXPIRES_MINUTES', 60)
 	now = datetime.now(timezone.utc)
@@ -22,41 +61,173 @@ def _generate_token(user_doc):
 		'email': user_doc.get('email'),
 		'role': user_doc.get('role', 'user'),
 		'iat': now,
-		'exp': now + timedelta(minutes=expires_in),
 	}
 
+	if _stateless_tokens_enabled():
+		# Short-lived access token carrying the claims handlers read from g.current_user.
+		expires_in = current_app.config.get('JWT_ACCESS_EXPIRES_MINUTES', 15)
+		payload.update({
+			'typ': 'access',
+			'name': user_doc.get('name'),
+			'profile_picture': user_doc.get('profile_picture'),
+		})
+
+	payload['exp'] = now + timedelta(minutes=expires_in)
 	return jwt.encode(payload, _get_jwt_secret(), algorithm='HS256')
 
 
+def _hash_refresh_token(refresh_token):
+	return hashlib.sha256(refresh_token.encode('utf-8')).hexdigest()
+
+
+def _issue_refresh_token(user_doc):
+	"""Create an opaque refresh token; only its SHA-256 is stored."""
+	refresh_token = secrets.token_urlsafe(48)
+	now = datetime.now(timezone.utc)
+	expires_in = current_app.config.get('JWT_REFRESH_EXPIRES_DAYS', 30)
+
+	current_app.db.refresh_tokens.insert_one({
+		'token_hash': _hash_refresh_token(refresh_token),
+		'user_id': user_doc.get('_id'),
+		'created_at': now,
+		'expires_at': now + timedelta(days=expires_in),
+		'revoked_at': None,
+	})
+	return refresh_token
+
+
+def _revoke_refresh_token(refresh_token):
+	"""Revoke an active refresh token and return its document, or None if unusable."""
+	now = datetime.now(timezone.utc)
+	return current_app.db.refresh_tokens.find_one_and_update(
+		{
+			'token_hash': _hash_refresh_token(refresh_token),
+			'revoked_at': None,
+			'expires_at': {'$gt': now},
+		},
+		{'$set': {'revoked_at': now}},
+	)
+
+
+def _auth_response_body(user_doc):
+	body = {'token': _generate_token(user_doc), 'user': User.from_doc(user_doc).to_dict()}
+	if _stateless_tokens_enabled():
+		body['refresh_token'] = _issue_refresh_token(user_doc)
+	return body
+
+
+def _get_user_cache():
+	return getattr(current_app, 'user_cache', None)
+
+
+def load_user(user_id):
+	"""Load a user document by ObjectId, served from the user cache when possible."""
+	cache = _get_user_cache()
+	cache_key = str(user_id)
+	if cache is not None:
+		cached = cache.get(cache_key)
+		if cached is not None:
+			return dict(cached)
+
+	user = current_app.db.users.find_one({'_id': user_id})
+	if user and cache is not None:
+		cache.set(cache_key, user)
+	return dict(user) if user else None
+
+
+def invalidate_cached_user(user_id):
+	"""Drop a user document from the user cache after it changed."""
+	cache = _get_user_cache()
+	if cache is not None:
+		cache.invalidate(str(user_id))
+
+
+def _decode_request_token():
+	"""Decode the bearer token; return (decoded, user_oid, None) or (None, None, error_response)."""
+	auth_header = request.headers.get('Authorization', '')
+	if not auth_header.startswith('Bearer '):
+		print("JWT verification error: missing or invalid authorization header", flush=True)
+		return None, None, (jsonify({'error': 'missing or invalid authorization header'}), 401)
+
+	token = auth_header.split(' ', 1)[1].strip()
+	if not token:
+		print("JWT verification error: missing token", flush=True)
+		return None, None, (jsonify({'error': 'missing token'}), 401)
+
+	try:
+		decoded = jwt.decode(token, _get_jwt_secret(), algorithms=['HS256'])
+	except jwt.ExpiredSignatureError as err:
+		print(f"JWT verification error: token expired - {err}", flush=True)
+		return None, None, (jsonify({'error': 'token expired'}), 401)
+	except jwt.InvalidTokenError as err:
+		print(f"JWT verification error: invalid token - {err}", flush=True)
+		return None, None, (jsonify({'error': 'invalid token'}), 401)
+
+	try:
+		user_id = ObjectId(decoded.get('sub'))
+	except Exception as err:
+		print(f"JWT verification error: invalid token user id - {err}", flush=True)
+		return None, None, (jsonify({'error': 'invalid token user id'}), 401)
+
+	return decoded, user_id, None
+
+
+def optional_token_user_id():
+	"""ObjectId of the bearer of a valid token, or None for anonymous or invalid requests.
+
+	For public endpoints that personalise their response when a viewer is known.
+	"""
+	auth_header = request.headers.get('Authorization', '')
+	if not auth_header.startswith('Bearer '):
+		return None
+	try:
+		decoded = jwt.decode(auth_header.split(' ', 1)[1].strip(), _get_jwt_secret(), algorithms=['HS256'])
+		return ObjectId(decoded.get('sub'))
+	except Exception:
+		return None
+
+
 def token_required(handler):
 	@wraps(handler)
 	def wrapper(*args, **kwargs):
-		auth_header = request.headers.get('Authorization', '')
-		if not auth_header.startswith('Bearer '):
-			print("JWT verification error: missing or invalid authorization header", flush=True)
-			return jsonify({'error': 'missing or invalid authorization header'}), 401
-
-		token = auth_header.split(' ', 1)[1].strip()
-		if not token:
-			print("JWT verification error: missing token", flush=True)
-			return jsonify({'error': 'missing token'}), 401
-
-		try:
-			decoded = jwt.decode(token, _get_jwt_secret(), algorithms=['HS256'])
-		except jwt.ExpiredSignatureError as err:
-			print(f"JWT verification error: token expired - {err}", flush=True)
-			return jsonify({'error': 'token expired'}), 401
-		except jwt.InvalidTokenError as err:
-			print(f"JWT verification error: invalid token - {err}", flush=True)
-			return jsonify({'error': 'invalid token'}), 401
-
-		try:
-			user_id = ObjectId(decoded.get('sub'))
-		except Exception as err:
-			print(f"JWT verification error: invalid token user id - {err}", flush=True)
-			return jsonify({'error': 'invalid token user id'}), 401
-
-		user = current_app.db.users.find_one({'_id': user_id})
+		decoded, user_id, error_response = _decode_request_token()
+		if error_response:
+			return error_response
+
+		user = load_user(user_id)
+		if not user:
+			print(f"JWT verification error: user not found - user_id={decoded.get('sub')}", flush=True)
+			return jsonify({'error': 'user not found'}), 401
+
+		g.current_user = user
+		return handler(*args, **kwargs)
+
+	return wrapper
+
+
+def token_claims_required(handler):
+	"""Like token_required, but trusts the claims of stateless access tokens.
+
+	g.current_user then only carries _id, name, email, role and profile_picture.
+	Legacy tokens without those claims fall back to loading the user document.
+	"""
+	@wraps(handler)
+	def wrapper(*args, **kwargs):
+		decoded, user_id, error_response = _decode_request_token()
+		if error_response:
+			return error_response
+
+		if decoded.get('typ') == 'access':
+			g.current_user = {
+				'_id': user_id,
+				'name': decoded.get('name'),
+				'email': decoded.get('email'),
+				'role': decoded.get('role', 'user'),
+				'profile_picture': decoded.get('profile_picture'),
+			}
+			return handler(*args, **kwargs)
+
+		user = load_user(user_id)
 		if not user:
 			print(f"JWT verification error: user not found - user_id={decoded.get('sub')}", flush=True)
 			return jsonify({'error': 'user not found'}), 401
@@ -81,6 +252,21 @@ def role_required(*roles):
 	return decorator
 
 
+def _rehash_password(user_doc, password, hasher):
+	"""Upgrade a stored hash to the current work factor; failures are non-fatal."""
+	try:
+		new_hash = hasher.hash_password(password)
+	except HashingUnavailableError as err:
+		print(f"Skipping password rehash: {err}", flush=True)
+		return
+
+	current_app.db.users.update_one(
+		{'_id': user_doc.get('_id'), 'password_hash': user_doc.get('password_hash')},
+		{'$set': {'password_hash': new_hash}},
+	)
+	invalidate_cached_user(user_doc.get('_id'))
+
+
 @auth_bp.post('/auth/register')
 def register():
 	payload = request.get_json(silent=True) if request.is_json else request.form.to_dict()
@@ -92,32 +278,20 @@ def register():
 	if not name or not email or not password:
 		return jsonify({'error': 'name, email, and password are required'}), 400
 
-	if current_app.db.users.find_one({'email': email}):
-		return jsonify({'error': 'email already registered'}), 409
-	if current_app.db.users.find_one({'name': name}):
-		return jsonify({'error': 'name already registered'}), 409
-
 	user_id = ObjectId()
-	profile_picture = payload.get('profile_picture')
-	profile_file = request.files.get('profile_picture')
-	if profile_file and profile_file.filename:
-		cloud = getattr(current_app, 'cloud_service', None)
-		if not cloud:
-			return jsonify({'error': 'cloud service not available'}), 500
-		upload_result, upload_code = cloud.upload_image_profile(profile_file, str(user_id))
-		if upload_code != 201:
-			return jsonify(upload_result), upload_code
-		profile_picture = upload_result.get('cloud_url')
 
 	# Create user instance
 	user = User(
 		name=name,
 		email=email,
-		profile_picture=profile_picture,
+		profile_picture=payload.get('profile_picture'),
 		bio=payload.get('bio', ''),
 		birthday=payload.get('birthday'),
 	)
-	user.set_password(password)
+	try:
+		user.set_password(password, hasher=_get_password_hasher())
+	except HashingUnavailableError as err:
+		return _hashing_unavailable_response(err)
 
 	user_doc = {
 		'_id': user_id,
@@ -129,14 +303,36 @@ def register():
 		'bio': user.bio.strip(),
 		'birthday': user.birthday,
 		'created_at': user.created_at,
+		**name_search_fields(user.name.strip()),
 	}
 
-	result = current_app.db.users.insert_one(user_doc)
-	created = current_app.db.users.find_one({'_id': result.inserted_id})
+	# The case-insensitive unique indexes on name/email reject duplicates in the same round trip.
+	try:
+		current_app.db.users.insert_one(user_doc)
+	except DuplicateKeyError as err:
+		return jsonify({'error': f'{_duplicate_identity_field(err)} already registered'}), 409
+	UserSearchService(current_app.db, getattr(current_app, 'user_search_cache', None)).invalidate([user_doc['name']])
 
-	token = _generate_token(created)
-	created_user = User.from_doc(created)
-	return jsonify({'token': token, 'user': created_user.to_dict()}), 201
+	profile_file = request.files.get('profile_picture')
+	if profile_file and profile_file.filename:
+		cloud = getattr(current_app, 'cloud_service', None)
+		if not cloud:
+			current_app.db.users.delete_one({'_id': user_id})
+			return jsonify({'error': 'cloud service not available'}), 500
+		upload_result, upload_code = cloud.upload_image_profile(profile_file, str(user_id))
+		if upload_code != 201:
+			current_app.db.users.delete_one({'_id': user_id})
+			return jsonify(upload_result), upload_code
+		user_doc['profile_picture'] = upload_result.get('cloud_url')
+		current_app.db.users.update_one(
+			{'_id': user_id},
+			{'$set': {
+				'profile_picture': user_doc['profile_picture'],
+				'profile_picture_version': upload_result.get('file_id'),
+			}},
+		)
+
+	return jsonify(_auth_response_body(user_doc)), 201
 
 
 @auth_bp.post('/auth/login')
@@ -148,19 +344,27 @@ def login():
 	if not user_info or not password:
 		return jsonify({'error': 'username/email and password are required'}), 400
 
-	user_doc_username = current_app.db.users.find_one({'name': user_info})
-	user_doc_email = current_app.db.users.find_one({'email': user_info})
-	user_doc = user_doc_username or user_doc_email
+	user_info = user_info.strip()
+	user_doc = current_app.db.users.find_one(
+		{'$or': [{'name': user_info}, {'email': user_info}]},
+		collation=IDENTITY_COLLATION,
+	)
 
 	if not user_doc:
 		return jsonify({'error': 'invalid credentials'}), 401
 
 	user = User.from_doc(user_doc)
-	if not user.verify_password(password):
-		return jsonify({'error': 'invalid credentials'}), 401
+	hasher = _get_password_hasher()
+	try:
+		if not user.verify_password(password, hasher=hasher):
+			return jsonify({'error': 'invalid credentials'}), 401
+	except HashingUnavailableError as err:
+		return _hashing_unavailable_response(err)
+
+	if hasher is not None and hasher.needs_rehash(user.password_hash):
+		_rehash_password(user_doc, password, hasher)
 
-	token = _generate_token(user_doc)
-	return jsonify({'token': token, 'user': user.to_dict()}), 200
+	return jsonify(_auth_response_body(user_doc)), 200
 
 
 @auth_bp.get('/auth/me')
@@ -170,7 +374,33 @@ def me():
 	return jsonify(current_user.to_dict()), 200
 
 
+@auth_bp.post('/auth/refresh')
+def refresh():
+	"""Rotate a refresh token and issue a new access token."""
+	if not _stateless_tokens_enabled():
+		return jsonify({'error': 'refresh tokens are not enabled'}), 404
+
+	payload = request.get_json(silent=True) or {}
+	refresh_token = payload.get('refresh_token')
+	if not refresh_token:
+		return jsonify({'error': 'refresh_token is required'}), 400
+
+	token_doc = _revoke_refresh_token(refresh_token)
+	if not token_doc:
+		return jsonify({'error': 'invalid or expired refresh token'}), 401
+
+	user_doc = load_user(token_doc.get('user_id'))
+	if not user_doc:
+		return jsonify({'error': 'user not found'}), 401
+
+	return jsonify(_auth_response_body(user_doc)), 200
+
+
 @auth_bp.post('/auth/logout')
 def logout():
-	"""JWT logout is handled client-side; keep endpoint for API compatibility."""
+	"""Access tokens expire on their own; revoke the refresh token when one is sent."""
+	payload = request.get_json(silent=True) or {}
+	refresh_token = payload.get('refresh_token')
+	if refresh_token:
+		_revoke_refresh_token(refresh_token)
 	return jsonify({'status': 'success', 'message': 'logged out'}), 200
\ No newline at end of file
@@ -0,0 +1,39 @@
+"""Routes for personalized feeds."""
+
+from flask import Blueprint, current_app, g, jsonify, request
+
+from api.routes.auth import token_required
+from api.services.pagination import InvalidCursorError, jsonify_page, parse_page_args
+from api.services.thumbnail_service import current_thumbnail_service
+from api.services.timeline_service import TimelineService
+
+
+feed_bp = Blueprint('feed', __name__)
+
+
+def _get_timeline_service() -> TimelineService:
+	"""Get or create timeline service instance."""
+	return TimelineService(
+		current_app.db,
+		fanout_max_followers=current_app.config.get('TIMELINE_FANOUT_MAX_FOLLOWERS', 10000),
+		max_entries=current_app.config.get('TIMELINE_MAX_ENTRIES', 500),
+	)
+
+
+@feed_bp.get('/feed/following')
+@token_required
+def get_following_feed():
+	"""Published outfits from followed users, newest first, with author cards."""
+	try:
+		limit, cursor = parse_page_args()
+	except InvalidCursorError:
+		return jsonify({'error': 'invalid cursor'}), 400
+
+	owner_id = str(g.current_user.get('_id'))
+	include = {part.strip() for part in (request.args.get('include') or '').split(',')}
+	outfits, next_cursor = _get_timeline_service().read(
+		owner_id, limit, cursor, include_thumbnail='thumbnail' in include,
+	)
+	if 'thumbnail' in include:
+		current_thumbnail_service().fill_inline_thumbnails(outfits)
+	return jsonify_page(outfits, next_cursor), 200
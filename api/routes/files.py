@@ -6,7 +6,10 @@ import os
 from werkzeug.utils import secure_filename
 from bson.objectid import ObjectId
 
-from api.routes.auth import token_required
+from api.routes.auth import invalidate_cached_user, token_required
+from api.services.image_cache import ImageTooLargeError, ImageVariantError, send_cached_image
+from api.services.image_variants import parse_variant_args
+from api.services.pagination import InvalidCursorError, paginate, parse_page_args
 
 
 files_bp = Blueprint('files', __name__)
@@ -78,11 +81,17 @@ def upload_profile_picture_to_cloud():
         if not profile_picture:
             return jsonify({'error': 'upload succeeded but no profile URL returned'}), 500
 
+        # NextCloud overwrites {user_id}.jpg, so the image cache keys on the upload's file id.
+        image_proxy = getattr(current_app, 'image_proxy', None)
+        if image_proxy:
+            image_proxy.invalidate(g.current_user.get('profile_picture'))
+
         try:
             current_app.db.users.update_one(
                 {'_id': ObjectId(user_id)},
-                {'$set': {'profile_picture': profile_picture}},
+                {'$set': {'profile_picture': profile_picture, 'profile_picture_version': file_id}},
             )
+            invalidate_cached_user(user_id)
         except Exception:
             # If update fails, still return upload URL
             pass
@@ -101,8 +110,20 @@ def upload_profile_picture_to_cloud():
 
 @files_bp.route('/public/image/<file_id>', methods=['GET'])
 def get_public_image(file_id):
-    """Public endpoint to download uploaded images without authentication."""
+    """Public endpoint to download uploaded images without authentication.
+
+    Optional w, h, fit (cover, contain, fill) and format (auto, jpeg, png, webp)
+    query parameters return a resized variant rendered once and then cached.
+    """
     try:
+        spec, spec_error = parse_variant_args(
+            request.args,
+            request.accept_mimetypes,
+            max_dimension=current_app.config.get('IMAGE_VARIANT_MAX_DIMENSION', 2048),
+        )
+        if spec_error:
+            return jsonify({'error': spec_error}), 400
+
         file_doc = current_app.db.files.find_one({'_id': ObjectId(file_id)})
         if not file_doc:
             return jsonify({'error': 'File not found'}), 404
@@ -111,18 +132,30 @@ def get_public_image(file_id):
         if not cloud:
             return jsonify({'error': 'cloud service not available'}), 500
 
-        response = requests.get(
+        image, upstream_status = current_app.image_proxy.get_variant(
             file_doc['url'],
+            spec,
             auth=HTTPBasicAuth(cloud.nextcloud_user, cloud.nextcloud_pass),
-            timeout=30
+            quality=current_app.config.get('IMAGE_VARIANT_QUALITY', 82),
+            version=file_id,
         )
 
-        if response.status_code != 200:
-            return jsonify({'error': f'Failed to download file: {response.status_code}'}), 502
+        if not image:
+            return jsonify({'error': f'Failed to download file: {upstream_status}'}), 502
 
-        content_type = file_doc.get('content_type', 'application/octet-stream')
-        return Response(response.content, mimetype=content_type, status=200)
+        base_name = (file_doc.get('filename') or file_id).rsplit('.', 1)[0]
+        return send_cached_image(
+            image,
+            f"{base_name}.{spec.extension}" if spec else file_doc.get('filename') or file_id,
+            current_app.config.get('PUBLIC_IMAGE_MAX_AGE_SECONDS', 3600),
+            mimetype=None if spec else file_doc.get('content_type', 'application/octet-stream'),
+            vary_accept=bool(spec and spec.negotiated),
+        )
 
+    except ImageTooLargeError:
+        return jsonify({'error': 'Image is too large to resize'}), 413
+    except ImageVariantError:
+        return jsonify({'error': 'File is not a supported image'}), 415
     except requests.exceptions.Timeout:
         return jsonify({'error': 'Download timeout'}), 504
     except requests.exceptions.RequestException as e:
@@ -162,10 +195,15 @@ def upload_image_to_cloud():
 
 @files_bp.route('/files', methods=['GET'])
 def list_files():
-    """List all uploaded files, optionally filtered by user_id and category."""
+    """List uploaded files page by page, optionally filtered by user_id and category."""
     try:
         user_id = request.args.get('user_id')
         category = request.args.get('category')
+
+        try:
+            limit, cursor = parse_page_args()
+        except InvalidCursorError:
+            return jsonify({'error': 'invalid cursor'}), 400
         
         query = {}
         if user_id:
@@ -173,16 +211,20 @@ def list_files():
         if category:
             query['category'] = category.lower()
         
-        files = list(current_app.db.files.find(
-            query, 
-            {'_id': 1, 'filename': 1, 'url': 1, 'size': 1, 'user_id': 1, 'category': 1, 'uploaded_at': 1}
-        ))
+        files, next_cursor = paginate(
+            current_app.db.files,
+            query,
+            limit,
+            cursor,
+            sort_field='uploaded_at',
+            projection={'_id': 1, 'filename': 1, 'url': 1, 'size': 1, 'user_id': 1, 'category': 1, 'uploaded_at': 1},
+        )
         
         # Convert ObjectId to string for JSON serialization
         for f in files:
             f['_id'] = str(f['_id'])
         
-        return jsonify({'status': 'success', 'files': files}), 200
+        return jsonify({'status': 'success', 'files': files, 'next_cursor': next_cursor}), 200
 
     except Exception as e:
         return jsonify({'error': f'Failed to fetch files: {str(e)}'}), 500
@@ -1,12 +1,17 @@
+import json
 from datetime import datetime, timezone
 
 from bson import ObjectId
-from flask import Blueprint, current_app, g, jsonify, request
+from flask import Blueprint, Response, current_app, g, jsonify, request
 from pymongo.errors import DuplicateKeyError
 
 from api.models.follow import Follow
 from api.models.user import User
 from api.routes.auth import token_required
+from api.services.counter_service import CounterService
+from api.services.follow_service import FollowService
+from api.services.pagination import InvalidCursorError, jsonify_page, paginate, parse_page_args
+from api.services.timeline_service import TimelineService
 
 follows_bp = Blueprint('follows', __name__)
 
@@ -18,14 +23,24 @@ def _parse_object_id(value):
 		return None
 
 
-def _normalize_follow_doc(follow_doc):
-	if not follow_doc:
-		return None
+def _get_timeline_service() -> TimelineService:
+	"""Get or create timeline service instance."""
+	return TimelineService(
+		current_app.db,
+		fanout_max_followers=current_app.config.get('TIMELINE_FANOUT_MAX_FOLLOWERS', 10000),
+		max_entries=current_app.config.get('TIMELINE_MAX_ENTRIES', 500),
+	)
+
 
-	if 'followed_id' not in follow_doc and follow_doc.get('following_id'):
-		follow_doc['followed_id'] = follow_doc.get('following_id')
+def _ordered_user_dicts(user_ids):
+	"""Load users for string ids with one $in query, keeping the given order."""
+	object_ids = [ObjectId(uid) for uid in user_ids if ObjectId.is_valid(uid)]
+	if not object_ids:
+		return []
 
-	return follow_doc
+	users = current_app.db.users.find({'_id': {'$in': object_ids}}, {'password_hash': 0})
+	user_map = {str(user.get('_id')): User.from_doc(user).to_dict() for user in users}
+	return [user_map[uid] for uid in user_ids if uid in user_map]
 
 
 @follows_bp.post('/follows')
@@ -63,8 +78,19 @@ def follow_user():
 	except DuplicateKeyError:
 		return jsonify({'error': 'already following'}), 409
 
+	counters = CounterService(current_app.db)
+	counters.increment_user(target_oid, 'follower_count', 1)
+	counters.increment_user(current_user_id, 'following_count', 1)
+
+	current_app.follow_graph.add_follow(current_user_id, target_user_id)
+
+	try:
+		_get_timeline_service().on_follow(current_user_id, target_user_id)
+	except Exception:
+		current_app.logger.exception('Failed to seed timeline for new follow')
+
 	created = current_app.db.follows.find_one({'_id': result.inserted_id})
-	created_follow = Follow.from_doc(_normalize_follow_doc(created)).to_dict()
+	created_follow = Follow.from_doc(created).to_dict()
 	created_follow['following_id'] = created_follow['followed_id']
 
 	return jsonify(created_follow), 201
@@ -87,6 +113,16 @@ def unfollow_user(followed_id):
 	if result.deleted_count == 0:
 		return jsonify({'error': 'not following'}), 404
 
+	counters = CounterService(current_app.db)
+	counters.increment_user(followed_oid, 'follower_count', -1)
+	counters.increment_user(current_user_id, 'following_count', -1)
+
+	current_app.follow_graph.remove_follow(current_user_id, followed_id)
+
+	try:
+		_get_timeline_service().on_unfollow(current_user_id, followed_id)
+	except Exception:
+		current_app.logger.exception('Failed to prune timeline after unfollow')
 	return jsonify({'status': 'unfollowed'}), 200
 
 
@@ -101,19 +137,21 @@ def get_followers():
 	if not _parse_object_id(user_id):
 		return jsonify({'error': 'invalid user_id'}), 400
 
-	# Get all followers of the user
-	followers = list(current_app.db.follows.find({'followed_id': user_id}).sort('created_at', -1))
+	try:
+		limit, cursor = parse_page_args()
+	except InvalidCursorError:
+		return jsonify({'error': 'invalid cursor'}), 400
+
+	# Get one page of followers of the user
+	followers, next_cursor = paginate(
+		current_app.db.follows,
+		{'followed_id': user_id},
+		limit,
+		cursor,
+		projection={'follower_id': 1},
+	)
 	follower_ids = [f.get('follower_id') for f in followers]
-	follower_object_ids = [ObjectId(fid) for fid in follower_ids if ObjectId.is_valid(fid)]
-
-	if not follower_object_ids:
-		return jsonify([]), 200
-
-	follower_users = list(current_app.db.users.find({'_id': {'$in': follower_object_ids}}))
-	user_map = {str(user.get('_id')): User.from_doc(user).to_dict() for user in follower_users}
-	ordered_users = [user_map[fid] for fid in follower_ids if fid in user_map]
-
-	return jsonify(ordered_users), 200
+	return jsonify_page(_ordered_user_dicts(follower_ids), next_cursor), 200
 
 
 @follows_bp.get('/follows/following')
@@ -127,19 +165,21 @@ def get_following():
 	if not _parse_object_id(user_id):
 		return jsonify({'error': 'invalid user_id'}), 400
 
-	# Get all users that this user is following
-	following = list(current_app.db.follows.find({'follower_id': user_id}).sort('created_at', -1))
-	followed_ids = [f.get('followed_id') or f.get('following_id') for f in following]
-	followed_object_ids = [ObjectId(fid) for fid in followed_ids if ObjectId.is_valid(fid)]
-
-	if not followed_object_ids:
-		return jsonify([]), 200
-
-	following_users = list(current_app.db.users.find({'_id': {'$in': followed_object_ids}}))
-	user_map = {str(user.get('_id')): User.from_doc(user).to_dict() for user in following_users}
-	ordered_users = [user_map[fid] for fid in followed_ids if fid in user_map]
-
-	return jsonify(ordered_users), 200
+	try:
+		limit, cursor = parse_page_args()
+	except InvalidCursorError:
+		return jsonify({'error': 'invalid cursor'}), 400
+
+	# Get one page of users that this user is following
+	following, next_cursor = paginate(
+		current_app.db.follows,
+		{'follower_id': user_id},
+		limit,
+		cursor,
+		projection={'followed_id': 1},
+	)
+	followed_ids = [f.get('followed_id') for f in following]
+	return jsonify_page(_ordered_user_dicts(followed_ids), next_cursor), 200
 
 
 @follows_bp.get('/follows/is-following/<target_user_id>')
@@ -149,12 +189,54 @@ def is_following(target_user_id):
 	if not _parse_object_id(target_user_id):
 		return jsonify({'error': 'invalid target_user_id'}), 400
 
-	existing = current_app.db.follows.find_one({
-		'follower_id': current_user_id,
-		'$or': [
-			{'followed_id': target_user_id},
-			{'following_id': target_user_id},
-		],
-	})
+	existing = current_app.db.follows.find_one(
+		{'follower_id': current_user_id, 'followed_id': target_user_id},
+		{'_id': 1},
+	)
 
 	return jsonify({'is_following': existing is not None}), 200
+
+
+@follows_bp.get('/follows/is-following')
+@token_required
+def is_following_many():
+	"""Answer is-following for many targets (?ids=a,b,c) with one indexed $in query."""
+	target_ids = []
+	for raw in request.args.getlist('ids'):
+		for target_id in raw.split(','):
+			target_id = target_id.strip()
+			if target_id and target_id not in target_ids:
+				target_ids.append(target_id)
+
+	if not target_ids:
+		return jsonify({'error': 'ids is required'}), 400
+
+	max_ids = current_app.config.get('USER_BATCH_MAX_IDS', 100)
+	if len(target_ids) > max_ids:
+		return jsonify({'error': f'at most {max_ids} ids are allowed'}), 400
+
+	if any(not _parse_object_id(target_id) for target_id in target_ids):
+		return jsonify({'error': 'invalid target id'}), 400
+
+	current_user_id = str(g.current_user.get('_id'))
+	result = FollowService(current_app.db).is_following_many(current_user_id, target_ids)
+	# jsonify sorts object keys; dump directly so the map keeps request order.
+	return Response(json.dumps(result), mimetype='application/json', status=200)
+
+
+@follows_bp.get('/follows/suggestions')
+@token_required
+def get_follow_suggestions():
+	"""Suggest users followed by the people the current user follows, ranked by mutual count."""
+	limit = request.args.get('limit', 20, type=int)
+	limit = min(max(limit or 20, 1), current_app.config.get('PAGINATION_MAX_LIMIT', 100))
+	budget_ms = current_app.config.get('FOLLOW_SUGGESTIONS_TIME_BUDGET_MS', 50)
+
+	current_user_id = str(g.current_user.get('_id'))
+	ranked = current_app.follow_graph.suggest(current_user_id, limit=limit, time_budget_seconds=budget_ms / 1000)
+
+	mutual_counts = dict(ranked)
+	suggestions = _ordered_user_dicts([user_id for user_id, _ in ranked])
+	for user in suggestions:
+		user['mutual_count'] = mutual_counts.get(user['id'], 0)
+	return jsonify(suggestions), 200
@@ -2,8 +2,10 @@
 
 from flask import Blueprint, Response, current_app, g, jsonify, request, stream_with_context
 from api.models.garment import Shirt, Pants, Skirt, Accessory
+from api.models.garment.enums import Gender
 from api.services.garment_service import GarmentService
 from api.routes.auth import token_required
+from api.services.pagination import InvalidCursorError, parse_page_args
 from werkzeug.utils import secure_filename
 import requests
 from requests.auth import HTTPBasicAuth
@@ -18,6 +20,37 @@ def _get_garment_service() -> GarmentService:
     return GarmentService(current_app.db)
 
 
+def _catalog_filters():
+    """
+    Read the catalog filters from the query string.
+
+    Returns:
+        Tuple of (filters dict, error_message)
+    """
+    filters = {}
+    garment_type = request.args.get("type")
+    if garment_type:
+        filters["type"] = "accessory" if garment_type == "accessories" else garment_type
+
+    gender = request.args.get("gender")
+    if gender:
+        if gender.lower() not in {g.value for g in Gender}:
+            return None, f"gender must be one of: {', '.join(g.value for g in Gender)}"
+        filters["gender"] = gender.lower()
+
+    style = request.args.get("style")
+    if style:
+        filters["style"] = style
+
+    is_custom = request.args.get("is_custom")
+    if is_custom:
+        if is_custom not in ("true", "false"):
+            return None, "is_custom must be true or false"
+        filters["is_custom"] = is_custom == "true"
+
+    return filters, None
+
+
 def _validate_custom_position(position):
     """
     Validate custom position coordinates.
@@ -268,6 +301,7 @@ def create_garment():
             "user_id": user_id,
             "gender": payload.get("gender", "unisex"),
             "display_name": payload.get("display_name"),
+            "style": payload.get("style"),
             "is_custom": True,  # Mark all garments created through this endpoint as custom
             "id": uuid4().hex,
             "custom_position": custom_position,
@@ -342,20 +376,25 @@ def create_garment():
 
 @garments_bp.get("/garments")
 def list_garments():
-    """List garments with optional filters."""
-    garment_type = request.args.get("type")
-    gender = request.args.get("gender")
+    """List garments; type, gender, style, is_custom and creator_id filters combine."""
+    filters, error_msg = _catalog_filters()
+    if error_msg:
+        return jsonify({"error": error_msg}), 400
     creator_id = request.args.get("creator_id")
 
+    try:
+        limit, cursor = parse_page_args()
+    except InvalidCursorError:
+        return jsonify({"error": "invalid cursor"}), 400
+
     service = _get_garment_service()
 
     try:
+        query = dict(filters)
         if creator_id:
-            garments = service.get_garments_by_creator(creator_id)
-        elif garment_type:
-            garments = service.get_garments_by_type(garment_type, gender)
-        else:
-            garments = service.search_garments({})
+            query["user_id"] = creator_id
+
+        garments, next_cursor = service.list_garments_page(query, limit, cursor)
 
         return (
             jsonify(
@@ -363,6 +402,42 @@ def list_garments():
                     "status": "success",
                     "count": len(garments),
                     "garments": [g.to_dict() for g in garments],
+                    "next_cursor": next_cursor,
+                }
+            ),
+            200,
+        )
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@garments_bp.get("/garments/catalog")
+def get_garment_catalog():
+    """Browse garments by any combination of filters, with facet counts per type, gender and style."""
+    filters, error_msg = _catalog_filters()
+    if error_msg:
+        return jsonify({"error": error_msg}), 400
+
+    try:
+        limit, cursor = parse_page_args()
+    except InvalidCursorError:
+        return jsonify({"error": "invalid cursor"}), 400
+
+    service = _get_garment_service()
+
+    try:
+        garments, next_cursor, facets = service.catalog_page(
+            filters, limit, cursor, creator_id=request.args.get("creator_id")
+        )
+        return (
+            jsonify(
+                {
+                    "status": "success",
+                    "count": len(garments),
+                    "total": facets.pop("total"),
+                    "garments": [g.to_dict() for g in garments],
+                    "facets": facets,
+                    "next_cursor": next_cursor,
                 }
             ),
             200,
@@ -413,6 +488,7 @@ def update_garment(garment_id):
             "material",
             "sleeve_type",
             "size_range",
+            "style",
         }
 
         updates = {k: v for k, v in payload.items() if k in allowed_fields}
@@ -0,0 +1,22 @@
+"""Routes for background job queue monitoring."""
+
+from flask import Blueprint, current_app, jsonify
+
+from api.routes.auth import role_required, token_required
+
+
+jobs_bp = Blueprint('jobs', __name__)
+
+
+@jobs_bp.get('/jobs/stats')
+@token_required
+@role_required('admin')
+def get_job_stats():
+	"""Return job counts per status; 503 when the backlog suggests no worker is draining it."""
+	stats = current_app.job_queue.stats()
+	healthy = (
+		stats['pending'] < current_app.config.get('JOB_QUEUE_ALERT_DEPTH', 1000)
+		and stats['oldest_due_seconds'] < current_app.config.get('JOB_QUEUE_ALERT_AGE_SECONDS', 300)
+	)
+	stats['healthy'] = healthy
+	return jsonify(stats), 200 if healthy else 503
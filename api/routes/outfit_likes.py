@@ -3,8 +3,8 @@
 from bson import ObjectId
 from flask import Blueprint, current_app, g, jsonify
 
-from api.routes.auth import token_required
-from api.services.like_service import LikeService
+from api.routes.auth import role_required, token_required
+from api.services.like_service import LikeService, current_like_service
 
 
 outfit_likes_bp = Blueprint('outfit_likes', __name__)
@@ -12,7 +12,7 @@ outfit_likes_bp = Blueprint('outfit_likes', __name__)
 
 def _get_like_service() -> LikeService:
 	"""Get or create like service instance."""
-	return LikeService(current_app.db)
+	return current_like_service()
 
 
 def _parse_object_id(value, label):
@@ -77,3 +77,14 @@ def unlike_outfit(outfit_id):
 	like_service = _get_like_service()
 	result, status_code = like_service.unlike_outfit(outfit_oid, user_id)
 	return jsonify(result), status_code
+
+
+@outfit_likes_bp.get('/outfits/likes/buffer/stats')
+@token_required
+@role_required('admin')
+def get_like_buffer_stats():
+	"""Return depth, flush counters and flush latency of this worker's like buffer."""
+	buffer = getattr(current_app, 'like_buffer', None)
+	if buffer is None:
+		return jsonify({'error': 'like write-behind not enabled'}), 404
+	return jsonify(buffer.stats()), 200
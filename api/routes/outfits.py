@@ -4,19 +4,25 @@ from flask import Blueprint, current_app, g, jsonify, request, send_file
 from datetime import datetime, timezone
 from api.models.comment import Comment
 from api.models.like import Like
+from api.models.garment.enums.gender import Gender
 from api.models.outfit import Outfit
-from api.routes.auth import token_required
-from api.services.thumbnail_service import ThumbnailService
+from api.routes.auth import optional_token_user_id, token_claims_required, token_required
+from api.services.image_variants import accepts_webp
+from api.services.thumbnail_service import ThumbnailService, current_thumbnail_service
+from api.services.like_service import current_like_service
+from api.services.outfit_search_service import OutfitSearchService
+from api.services.thumbnail_variants import THUMBNAIL_SIZES
+from api.services.trending_service import trending_service
 from io import BytesIO
 from api.services.outfit_service import OutfitService
+from api.services.pagination import InvalidCursorError, jsonify_page, parse_page_args
 
 outfits_bp = Blueprint('outfits', __name__)
 
 
 def _get_thumbnail_service() -> ThumbnailService:
 	"""Get or create thumbnail service instance."""
-	uploads_path = current_app.config.get('UPLOAD_PATH', 'uploads')
-	return ThumbnailService(current_app.db, uploads_path)
+	return current_thumbnail_service()
 
 
 def _get_outfit_service() -> OutfitService:
@@ -31,6 +37,18 @@ def _parse_object_id(value, label):
 		return None
 
 
+def _wants_inline_thumbnail() -> bool:
+	"""True when the client opted into base64 thumbnails with include=thumbnail."""
+	include = request.args.get('include') or ''
+	return 'thumbnail' in {part.strip() for part in include.split(',')}
+
+
+def _wants_expanded_garments() -> bool:
+	"""True when the client asked for garment documents with expand=garments."""
+	expand = request.args.get('expand') or ''
+	return 'garments' in {part.strip() for part in expand.split(',')}
+
+
 def _get_outfit_doc_or_404(outfit_id):
 	oid = _parse_object_id(outfit_id, 'outfit id')
 	if not oid:
@@ -45,19 +63,95 @@ def _get_outfit_doc_or_404(outfit_id):
 
 @outfits_bp.get('/outfits/published')
 def get_published_outfits():
-	limit = request.args.get('limit', 100, type=int)
-	skip = request.args.get('skip', 0, type=int)
+	try:
+		limit, cursor = parse_page_args()
+	except InvalidCursorError:
+		return jsonify({'error': 'invalid cursor'}), 400
+
 	service = _get_outfit_service()
-	result, status = service.list_published(limit=limit, skip=skip)
-	return jsonify(result), status
+	result, status = service.list_published(
+		limit=limit,
+		cursor=cursor,
+		include_thumbnail=_wants_inline_thumbnail(),
+		expand_garments=_wants_expanded_garments(),
+		viewer_id=optional_token_user_id(),
+	)
+	if status != 200:
+		return jsonify(result), status
+	return jsonify_page(result['outfits'], result['next_cursor']), status
+
+
+@outfits_bp.get('/outfits/trending')
+def get_trending_outfits():
+	"""Published outfits ranked by time-decayed likes and comments, refreshed periodically."""
+	try:
+		limit, cursor = parse_page_args()
+	except InvalidCursorError:
+		return jsonify({'error': 'invalid cursor'}), 400
+
+	outfits, next_cursor = trending_service(current_app).read(limit, cursor)
+	current_like_service().attach_viewer_engagement(outfits, optional_token_user_id())
+	return jsonify_page(outfits, next_cursor), 200
+
+
+@outfits_bp.get('/outfits/search')
+def search_outfits():
+	"""Search outfit names and descriptions, most relevant first.
+
+	Filters: gender, published (true/false) and author (user id). Anonymous
+	callers and other users' outfits only see published outfits.
+	"""
+	query = (request.args.get('q') or '').strip()
+	if not query:
+		return jsonify({'error': 'q is required'}), 400
+
+	gender = request.args.get('gender') or None
+	if gender and gender not in {g.value for g in Gender}:
+		return jsonify({'error': f"gender must be one of: {', '.join(g.value for g in Gender)}"}), 400
+
+	published = request.args.get('published')
+	if published not in (None, '', 'true', 'false'):
+		return jsonify({'error': 'published must be true or false'}), 400
+
+	try:
+		limit, cursor = parse_page_args()
+	except InvalidCursorError:
+		return jsonify({'error': 'invalid cursor'}), 400
+
+	viewer_id = optional_token_user_id()
+	outfits, next_cursor = OutfitSearchService(current_app.db).search(
+		query,
+		limit,
+		cursor,
+		viewer_id=str(viewer_id) if viewer_id else None,
+		gender=gender,
+		published={'true': True, 'false': False}.get(published),
+		author_id=request.args.get('author') or None,
+	)
+	current_like_service().attach_viewer_engagement(outfits, viewer_id)
+	return jsonify_page(outfits, next_cursor), 200
 
 
 @outfits_bp.get('/outfits')
 def list_outfits():
 	user_id = request.args.get('user_id')
+	try:
+		limit, cursor = parse_page_args()
+	except InvalidCursorError:
+		return jsonify({'error': 'invalid cursor'}), 400
+
 	service = _get_outfit_service()
-	result, status = service.list_by_user(user_id)
-	return jsonify(result), status
+	result, status = service.list_by_user(
+		user_id,
+		limit=limit,
+		cursor=cursor,
+		include_thumbnail=_wants_inline_thumbnail(),
+		expand_garments=_wants_expanded_garments(),
+		viewer_id=optional_token_user_id(),
+	)
+	if status != 200:
+		return jsonify(result), status
+	return jsonify_page(result['outfits'], result['next_cursor']), status
 
 
 @outfits_bp.post('/outfits')
@@ -71,10 +165,14 @@ def create_outfit():
 
 
 @outfits_bp.get('/outfits/<outfit_id>')
-@token_required
+@token_claims_required
 def get_outfit(outfit_id):
 	service = _get_outfit_service()
-	result, status = service.get_outfit(outfit_id)
+	result, status = service.get_outfit(
+		outfit_id,
+		include_thumbnail=_wants_inline_thumbnail(),
+		expand_garments=_wants_expanded_garments(),
+	)
 	return jsonify(result), status
 
 
@@ -97,19 +195,44 @@ def delete_outfit(outfit_id):
 
 @outfits_bp.get('/outfits/<outfit_id>/thumbnail')
 def get_outfit_thumbnail(outfit_id):
-	"""Get thumbnail image for an outfit."""
+	"""Get thumbnail image for an outfit.
+
+	thumbnail_url pins the content hash as ?v=<sha256>; when it matches, the
+	response is cacheable forever. Unversioned requests revalidate by ETag.
+	?size=small|medium|large selects a resized WebP/JPEG variant; until it
+	has been rendered the original is served with a short max-age instead.
+	"""
+	size = request.args.get('size') or None
+	if size is not None and size not in THUMBNAIL_SIZES:
+		return jsonify({'error': f"size must be one of: {', '.join(THUMBNAIL_SIZES)}"}), 400
+
 	try:
 		thumbnail_service = _get_thumbnail_service()
-		thumbnail_bytes = thumbnail_service.get_thumbnail(outfit_id)
+		thumbnail = thumbnail_service.get_thumbnail(
+			outfit_id,
+			size=size,
+			prefer_webp=accepts_webp(request.accept_mimetypes),
+		)
 		
-		if not thumbnail_bytes:
+		if not thumbnail:
 			return jsonify({'error': 'thumbnail not found'}), 404
-		
-		return send_file(
+
+		thumbnail_bytes, mimetype, digest, variant = thumbnail
+		immutable = request.args.get('v') == digest and (size is None or variant is not None)
+		response = send_file(
 			BytesIO(thumbnail_bytes),
-			mimetype='image/png',
+			mimetype=mimetype,
 			as_attachment=False,
-			download_name=f'{outfit_id}_thumbnail.png'
+			download_name=f'{outfit_id}_thumbnail.png',
+			etag=f'{digest}.{variant}' if variant else digest,
+			max_age=current_app.config.get('THUMBNAIL_IMMUTABLE_MAX_AGE_SECONDS', 31536000) if immutable else 60,
+			conditional=True,
 		)
+		response.cache_control.public = True
+		if immutable:
+			response.cache_control.immutable = True
+		if size is not None:
+			response.vary.add('Accept')
+		return response
 	except Exception as e:
 		return jsonify({'error': f'Failed to retrieve thumbnail: {str(e)}'}), 500
@@ -1,19 +1,39 @@
+import json
+
 from bson import ObjectId
-from flask import Blueprint, current_app, g, jsonify, request, send_file
+from flask import Blueprint, Response, current_app, g, jsonify, request
 from api.models.user import User
-from api.routes.auth import token_required
-from io import BytesIO
+from api.routes.auth import invalidate_cached_user, role_required, token_required
+from api.services.image_cache import ImageTooLargeError, ImageVariantError, send_cached_image
+from api.services.image_variants import parse_variant_args
+from api.services.pagination import InvalidCursorError, jsonify_page, paginate, parse_page_args
+from api.services.user_search_service import UserSearchService, name_search_fields
+from pymongo.errors import DuplicateKeyError
 import requests
 from requests.auth import HTTPBasicAuth
 
 users_bp = Blueprint('users', __name__)
 
+USER_CARD_FIELDS = ('id', 'name', 'profile_picture')
+
+
+def _get_user_search_service() -> UserSearchService:
+	"""Get or create user search service instance."""
+	return UserSearchService(current_app.db, getattr(current_app, 'user_search_cache', None))
+
 
 @users_bp.get('/users')
 @token_required
 def list_users():
-	users = current_app.db.users.find().sort('created_at', -1)
-	return jsonify([User.from_doc(u).to_dict() for u in users]), 200
+	try:
+		limit, cursor = parse_page_args()
+	except InvalidCursorError:
+		return jsonify({'error': 'invalid cursor'}), 400
+
+	users, next_cursor = paginate(
+		current_app.db.users, {}, limit, cursor, projection={'password_hash': 0},
+	)
+	return jsonify_page([User.from_doc(u).to_dict() for u in users], next_cursor), 200
 
 
 @users_bp.get('/users/me')
@@ -23,18 +43,64 @@ def get_current_user():
 	return jsonify(User.from_doc(g.current_user).to_dict()), 200
 
 
+@users_bp.get('/users/cache/stats')
+@token_required
+@role_required('admin')
+def get_user_cache_stats():
+	"""Return hit/miss counters of this worker's authenticated-user cache."""
+	cache = getattr(current_app, 'user_cache', None)
+	if cache is None:
+		return jsonify({'error': 'user cache not configured'}), 404
+	return jsonify(cache.stats()), 200
+
+
 @users_bp.get('/users/search')
 def search_users():
-	"""Search users by name with a small, safe result set."""
+	"""Autocomplete users by name prefix with a small, ranked result set."""
 	query = (request.args.get('q') or '').strip()
 	if not query:
 		return jsonify([]), 200
 
-	users = current_app.db.users.find(
-		{'name': {'$regex': query, '$options': 'i'}}
-	).sort('created_at', -1).limit(20)
+	limit = request.args.get('limit', 20, type=int)
+	return jsonify(_get_user_search_service().search(query, limit=limit)), 200
 
-	return jsonify([User.from_doc(u).to_dict() for u in users]), 200
+
+@users_bp.get('/users/batch')
+@token_required
+def get_users_batch():
+	"""Return name/avatar cards for many users in one round trip.
+
+	Ids come from ?ids=a,b,c (or repeated ids params). The response maps each
+	requested id, in request order, to its card, or to null when no such user exists.
+	"""
+	user_ids = []
+	for raw in request.args.getlist('ids'):
+		for user_id in raw.split(','):
+			user_id = user_id.strip()
+			if user_id and user_id not in user_ids:
+				user_ids.append(user_id)
+
+	if not user_ids:
+		return jsonify({'error': 'ids is required'}), 400
+
+	max_ids = current_app.config.get('USER_BATCH_MAX_IDS', 100)
+	if len(user_ids) > max_ids:
+		return jsonify({'error': f'at most {max_ids} ids are allowed'}), 400
+
+	invalid_ids = [user_id for user_id in user_ids if not ObjectId.is_valid(user_id)]
+	if invalid_ids:
+		return jsonify({'error': 'invalid user id', 'ids': invalid_ids}), 400
+
+	projection = {field: 1 for field in USER_CARD_FIELDS if field != 'id'}
+	users = current_app.db.users.find({'_id': {'$in': [ObjectId(uid) for uid in user_ids]}}, projection)
+	cards = {}
+	for user in users:
+		user_dict = User.from_doc(user).to_dict()
+		cards[user_dict['id']] = {field: user_dict[field] for field in USER_CARD_FIELDS}
+
+	# jsonify sorts object keys; dump directly so the map keeps request order.
+	body = json.dumps({user_id: cards.get(user_id) for user_id in user_ids})
+	return Response(body, mimetype='application/json', status=200)
 
 
 @users_bp.post('/users')
@@ -54,9 +120,14 @@ def create_user():
 		'bio': user.bio.strip(),
 		'birthday': user.birthday,
 		'created_at': user.created_at,
+		**name_search_fields(user.name.strip()),
 	}
 	
-	result = current_app.db.users.insert_one(user_doc)
+	try:
+		result = current_app.db.users.insert_one(user_doc)
+	except DuplicateKeyError:
+		return jsonify({'error': 'name or email already registered'}), 409
+	_get_user_search_service().invalidate([user_doc['name']])
 	created = current_app.db.users.find_one({'_id': result.inserted_id})
 	return jsonify(User.from_doc(created).to_dict()), 201
 
@@ -89,9 +160,18 @@ def update_user(user_id):
 	if not update_fields:
 		return jsonify({'error': 'nothing to update'}), 400
 
-	result = current_app.db.users.update_one({'_id': oid}, {'$set': update_fields})
-	if result.matched_count == 0:
+	if 'name' in update_fields:
+		update_fields.update(name_search_fields(update_fields['name']))
+
+	try:
+		previous = current_app.db.users.find_one_and_update({'_id': oid}, {'$set': update_fields}, {'name': 1})
+	except DuplicateKeyError:
+		return jsonify({'error': 'name or email already registered'}), 409
+	invalidate_cached_user(oid)
+	if previous is None:
 		return jsonify({'error': 'user not found'}), 404
+	if 'name' in update_fields:
+		_get_user_search_service().invalidate([previous.get('name'), update_fields['name']])
 
 	user = current_app.db.users.find_one({'_id': oid})
 	return jsonify(User.from_doc(user).to_dict()), 200
@@ -105,22 +185,37 @@ def delete_user(user_id):
 	except Exception:
 		return jsonify({'error': 'invalid user id'}), 400
 
-	result = current_app.db.users.delete_one({'_id': oid})
-	if result.deleted_count == 0:
+	deleted = current_app.db.users.find_one_and_delete({'_id': oid}, {'name': 1})
+	invalidate_cached_user(oid)
+	if deleted is None:
 		return jsonify({'error': 'user not found'}), 404
+	_get_user_search_service().invalidate([deleted.get('name')])
 
 	return jsonify({'status': 'deleted'}), 200
 
 
 @users_bp.get('/users/<user_id>/profile-picture')
 def get_user_profile_picture(user_id):
-	"""Serve profile picture from NextCloud, bypassing CORS restrictions."""
+	"""Serve profile picture from NextCloud through the disk cache, bypassing CORS restrictions.
+
+	Optional w, h, fit (cover, contain, fill) and format (auto, jpeg, png, webp)
+	query parameters return a resized variant; format=auto picks WebP when the
+	Accept header lists it.
+	"""
 	try:
 		oid = ObjectId(user_id)
 	except Exception:
 		return jsonify({'error': 'invalid user id'}), 400
 
-	user = current_app.db.users.find_one({'_id': oid})
+	spec, spec_error = parse_variant_args(
+		request.args,
+		request.accept_mimetypes,
+		max_dimension=current_app.config.get('IMAGE_VARIANT_MAX_DIMENSION', 2048),
+	)
+	if spec_error:
+		return jsonify({'error': spec_error}), 400
+
+	user = current_app.db.users.find_one({'_id': oid}, {'profile_picture': 1, 'profile_picture_version': 1})
 	if not user or not user.get('profile_picture'):
 		return jsonify({'error': 'profile picture not found'}), 404
 
@@ -129,20 +224,26 @@ def get_user_profile_picture(user_id):
 		return jsonify({'error': 'cloud service not available'}), 500
 
 	try:
-		response = requests.get(
+		image, _ = current_app.image_proxy.get_variant(
 			user.get('profile_picture'),
+			spec,
 			auth=HTTPBasicAuth(cloud.nextcloud_user, cloud.nextcloud_pass),
-			timeout=30
+			quality=current_app.config.get('IMAGE_VARIANT_QUALITY', 82),
+			version=user.get('profile_picture_version'),
 		)
-		if response.status_code != 200:
+		if not image:
 			return jsonify({'error': 'failed to fetch profile picture'}), 500
 
-		content_type = response.headers.get('Content-Type', 'image/jpeg')
-		return send_file(
-			BytesIO(response.content),
-			mimetype=content_type,
-			download_name=f"profile_{user_id}.jpg"
+		return send_cached_image(
+			image,
+			f"profile_{user_id}.{spec.extension if spec else 'jpg'}",
+			current_app.config.get('PROFILE_PICTURE_MAX_AGE_SECONDS', 300),
+			vary_accept=bool(spec and spec.negotiated),
 		)
+	except ImageTooLargeError:
+		return jsonify({'error': 'profile picture is too large to resize'}), 413
+	except ImageVariantError:
+		return jsonify({'error': 'profile picture is not a supported image'}), 415
 	except requests.exceptions.Timeout:
 		return jsonify({'error': 'download timeout'}), 504
 	except requests.exceptions.RequestException as e:
@@ -1,11 +1,13 @@
 from datetime import datetime, timezone
 
 from bson import ObjectId
-from flask import Blueprint, current_app, g, jsonify
+from flask import Blueprint, current_app, g, jsonify, request
 
 from api.models.outfit import Outfit
 from api.models.wardrobe import Wardrobe
-from api.routes.auth import token_required
+from api.routes.auth import token_claims_required, token_required
+from api.services.outfit_service import outfit_projection
+from api.services.thumbnail_service import current_thumbnail_service
 
 wardrobes_bp = Blueprint('wardrobes', __name__)
 
@@ -34,16 +36,24 @@ def _get_or_create_wardrobe(user_id: str):
 
 
 @wardrobes_bp.get('/wardrobes/me')
-@token_required
+@token_claims_required
 def get_my_wardrobe():
     user_id = str(g.current_user.get('_id'))
     wardrobe_doc = _get_or_create_wardrobe(user_id)
 
+    include = {part.strip() for part in (request.args.get('include') or '').split(',')}
+    include_thumbnail = 'thumbnail' in include
+
     outfit_object_ids = [oid for oid in (wardrobe_doc.get('outfit_ids') or []) if isinstance(oid, ObjectId)]
     outfits = []
     if outfit_object_ids:
-        outfit_docs = current_app.db.outfits.find({'_id': {'$in': outfit_object_ids}}).sort('created_at', -1)
-        outfits = [Outfit.from_doc(outfit_doc).to_dict() for outfit_doc in outfit_docs]
+        outfit_docs = current_app.db.outfits.find(
+            {'_id': {'$in': outfit_object_ids}},
+            outfit_projection(include_thumbnail),
+        ).sort('created_at', -1)
+        outfits = [Outfit.from_doc(outfit_doc).to_dict(include_thumbnail=include_thumbnail) for outfit_doc in outfit_docs]
+        if include_thumbnail:
+            current_thumbnail_service().fill_inline_thumbnails(outfits)
 
     wardrobe = Wardrobe.from_doc(wardrobe_doc)
     return jsonify({'wardrobe': wardrobe.to_dict(), 'outfits': outfits}), 200
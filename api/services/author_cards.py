@@ -0,0 +1,35 @@
+"""Author cards joined onto outfit listings."""
+
+from typing import Any, Dict, Iterable, List
+
+from bson import ObjectId
+
+
+AUTHOR_CARD_PROJECTION = {'name': 1, 'profile_picture': 1}
+
+
+def load_author_cards(db, user_ids: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+    """Load name/avatar cards for string or ObjectId user ids with one indexed $in on users._id.
+
+    Outfits store user_id as a string while users._id is an ObjectId, so ids
+    are converted here rather than joined with a type-mismatched $lookup.
+    """
+    object_ids = {ObjectId(str(uid)) for uid in user_ids if uid and ObjectId.is_valid(str(uid))}
+    if not object_ids:
+        return {}
+
+    return {
+        str(user['_id']): {
+            'name': user.get('name'),
+            'profile_picture': user.get('profile_picture'),
+        }
+        for user in db.users.find({'_id': {'$in': list(object_ids)}}, AUTHOR_CARD_PROJECTION)
+    }
+
+
+def attach_author_cards(db, outfits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Set an 'author' card on each serialized outfit, in place."""
+    cards = load_author_cards(db, (outfit.get('user_id') for outfit in outfits))
+    for outfit in outfits:
+        outfit['author'] = cards.get(str(outfit.get('user_id'))) or {'name': None, 'profile_picture': None}
+    return outfits
@@ -0,0 +1,144 @@
+"""Job kinds run by worker.py and the helpers that queue them."""
+
+from typing import Any, Callable, Dict, List, Optional
+
+from bson import ObjectId
+from flask import current_app
+
+from api.services.counter_service import CounterService
+from api.services.job_queue import PartialBatchError
+from api.services.thumbnail_service import ThumbnailService
+from api.services.thumbnail_variants import VARIANTS_JOB
+from api.services.timeline_service import TimelineService
+from api.services.trending_service import trending_service
+
+
+OUTFIT_CASCADE_DELETE = 'outfit.cascade_delete'
+TIMELINE_SYNC = 'timeline.sync'
+TRENDING_REFRESH = 'trending.refresh'
+COUNTER_RECONCILE = 'counters.reconcile'
+
+
+def enqueue_job(kind: str, payload: Dict[str, Any], dedupe_key: Optional[str] = None) -> bool:
+    """Queue a job on the app's JobQueue (best-effort).
+
+    Returns:
+        False when the job could not be queued; the caller's write has
+        already succeeded, so this is logged rather than raised.
+    """
+    try:
+        current_app.job_queue.enqueue(kind, payload, dedupe_key=dedupe_key)
+        return True
+    except Exception:
+        current_app.logger.exception('Failed to queue %s job', kind)
+        return False
+
+
+def cascade_outfit_deletes(app, payloads: List[Dict[str, Any]]) -> None:
+    """Remove everything that referenced a batch of deleted outfits.
+
+    Every collection, including the search postings, is cleaned with one
+    indexed $in for the whole batch.
+    The wardrobe pull only visits wardrobes that contain one of the outfits.
+    Thumbnail references are released last and one at a time. A failure
+    there is logged instead of retrying the batch, which would release the
+    same reference twice.
+    """
+    db = app.db
+    outfit_ids = [ObjectId(p['outfit_id']) for p in payloads if ObjectId.is_valid(p.get('outfit_id'))]
+    if not outfit_ids:
+        return
+
+    db.timelines.delete_many({'outfit_id': {'$in': outfit_ids}})
+    db.trending.delete_many({'_id': {'$in': outfit_ids}})
+    db.engagement_buckets.delete_many({'outfit_id': {'$in': outfit_ids}})
+    db.likes.delete_many({'outfit_id': {'$in': outfit_ids}})
+    db.comments.delete_many({'outfit_id': {'$in': outfit_ids}})
+    db.outfit_terms.delete_many({'outfit_id': {'$in': outfit_ids}})
+    db.wardrobes.update_many(
+        {'outfit_ids': {'$in': outfit_ids}},
+        {'$pull': {'outfit_ids': {'$in': outfit_ids}}},
+    )
+
+    thumbnails = ThumbnailService(db, app.thumbnail_store, app.config.get('UPLOAD_PATH', 'uploads'))
+    for payload in payloads:
+        try:
+            thumbnails.delete_thumbnail(payload['outfit_id'], payload.get('thumbnail_hash'))
+        except Exception:
+            app.logger.exception('Failed to release thumbnail of deleted outfit %s', payload.get('outfit_id'))
+
+
+def sync_timelines(app, payloads: List[Dict[str, Any]]) -> None:
+    """Fan published outfits out to follower timelines, or pull unpublished ones.
+
+    The outfit is re-read so a job always applies its current state.
+    Retried and out-of-order jobs therefore converge.
+    """
+    timelines = TimelineService(
+        app.db,
+        fanout_max_followers=app.config.get('TIMELINE_FANOUT_MAX_FOLLOWERS', 10000),
+        max_entries=app.config.get('TIMELINE_MAX_ENTRIES', 500),
+    )
+    outfit_ids = list({ObjectId(p['outfit_id']) for p in payloads if ObjectId.is_valid(p.get('outfit_id'))})
+    outfits = {
+        doc['_id']: doc
+        for doc in app.db.outfits.find(
+            {'_id': {'$in': outfit_ids}}, {'user_id': 1, 'created_at': 1, 'published': 1}
+        )
+    }
+    for outfit_id in outfit_ids:
+        outfit = outfits.get(outfit_id)
+        if outfit and outfit.get('published'):
+            timelines.fan_out(outfit)
+        else:
+            timelines.retract(outfit_id)
+
+
+def generate_thumbnail_variants(app, payloads: List[Dict[str, Any]]) -> None:
+    """Render small/medium/large variants; digests that already have them are skipped.
+
+    A digest that fails is logged and only its jobs are retried, so one bad
+    image does not re-run the rest of the batch.
+    """
+    failed = []
+    for digest in {p.get('digest') for p in payloads if p.get('digest')}:
+        try:
+            app.thumbnail_variants.generate(digest)
+        except Exception:
+            app.logger.exception('Failed to render thumbnail variants of %s', digest)
+            failed.append(digest)
+    if failed:
+        raise PartialBatchError([p for p in payloads if p.get('digest') in failed])
+
+
+def refresh_trending(app, payloads: List[Dict[str, Any]]) -> None:
+    """Recompute the trending ranking once, however many refresh jobs were claimed."""
+    trending_service(app).refresh()
+
+
+def reconcile_counters(app, payloads: List[Dict[str, Any]]) -> None:
+    """Recount drifted user and outfit counters once, however many jobs were claimed."""
+    result = CounterService(app.db).reconcile(app.config.get('COUNTER_RECONCILE_BATCH_SIZE', 500))
+    if result['users'] or result['outfits']:
+        app.logger.info('Repaired drifted counters: %s', result)
+
+
+def periodic_jobs(app) -> Dict[str, int]:
+    """Interval in seconds of each enabled periodic job kind; 0 disables a kind."""
+    intervals = {
+        TRENDING_REFRESH: app.config.get('TRENDING_REFRESH_INTERVAL_SECONDS', 300),
+        COUNTER_RECONCILE: app.config.get('COUNTER_RECONCILE_INTERVAL_SECONDS', 3600),
+    }
+    return {kind: interval for kind, interval in intervals.items() if interval > 0}
+
+
+def job_handlers(app) -> Dict[str, Callable[[List[Dict[str, Any]]], None]]:
+    """Handlers for JobQueue.run_batch, bound to app."""
+    handlers = {
+        OUTFIT_CASCADE_DELETE: cascade_outfit_deletes,
+        TIMELINE_SYNC: sync_timelines,
+        VARIANTS_JOB: generate_thumbnail_variants,
+        TRENDING_REFRESH: refresh_trending,
+        COUNTER_RECONCILE: reconcile_counters,
+    }
+    return {kind: (lambda payloads, handler=handler: handler(app, payloads)) for kind, handler in handlers.items()}
@@ -4,6 +4,8 @@ from typing import Optional, Dict, Any, Tuple
 from datetime import datetime, timezone
 from bson import ObjectId
 from api.models.comment import Comment
+from api.services.counter_service import CounterService
+from api.services.trending_service import TrendingService
 
 
 class CommentService:
@@ -17,6 +19,8 @@ class CommentService:
             db: MongoDB database instance
         """
         self.db = db
+        self.counters = CounterService(db)
+        self.trending = TrendingService(db)
 
     MAX_COMMENT_LENGTH = 1000
 
@@ -103,6 +107,8 @@ class CommentService:
             }
 
             result = self.db.comments.insert_one(comment_doc)
+            self.counters.increment_outfit(outfit_id, 'comment_count', 1)
+            self.trending.record(outfit_id, 'comments', 1)
             created = self.db.comments.find_one({'_id': result.inserted_id})
             comment_dict = Comment.from_doc(created).to_dict()
             
@@ -217,8 +223,11 @@ class CommentService:
             if not is_owner and not is_admin:
                 return {'error': 'forbidden'}, 403
 
-            # Delete comment
-            self.db.comments.delete_one({'_id': comment_id})
+            # Delete comment; the deleted document dates the trending decrement
+            deleted = self.db.comments.find_one_and_delete({'_id': comment_id})
+            if deleted:
+                self.counters.increment_outfit(outfit_id, 'comment_count', -1)
+                self.trending.record(outfit_id, 'comments', -1, when=deleted.get('created_at'))
             
             return {'status': 'deleted', 'message': 'Comment deleted successfully'}, 200
 
@@ -227,7 +236,10 @@ class CommentService:
 
     def get_comment_count(self, outfit_id: ObjectId) -> int:
         """Get the number of comments on an outfit.
-        
+
+        Reads the denormalized comment_count, counting comments only for
+        outfits that do not carry the counter yet.
+
         Args:
             outfit_id: ObjectId of the outfit
             
@@ -235,6 +247,9 @@ class CommentService:
             Number of comments
         """
         try:
+            outfit = self.db.outfits.find_one({'_id': outfit_id}, {'comment_count': 1})
+            if outfit and outfit.get('comment_count') is not None:
+                return max(outfit['comment_count'], 0)
             return self.db.comments.count_documents({'outfit_id': outfit_id})
         except Exception:
             return 0
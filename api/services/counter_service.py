@@ -0,0 +1,126 @@
+"""Denormalized social counters on user and outfit documents."""
+
+from typing import Any, Dict, Iterable, List
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+
+USER_COUNTER_FIELDS = ('follower_count', 'following_count', 'outfit_count')
+OUTFIT_COUNTER_FIELDS = ('like_count', 'comment_count')
+
+
+def _as_object_id(value: Any):
+    if isinstance(value, ObjectId):
+        return value
+    return ObjectId(value) if value and ObjectId.is_valid(str(value)) else None
+
+
+class CounterService:
+    """Maintain follower/following/outfit counts on users and like/comment counts on outfits.
+
+    Writers adjust counters with atomic $inc next to the write they describe.
+    Because the two writes are not transactional, reconcile() recounts the
+    source collections in batches and repairs any drift.
+    """
+
+    def __init__(self, db):
+        """
+        Initialize CounterService.
+
+        Args:
+            db: MongoDB database instance
+        """
+        self.db = db
+
+    def increment_user(self, user_id: Any, field: str, delta: int = 1) -> None:
+        """Atomically add delta to a user counter; user_id may be a string or ObjectId."""
+        oid = _as_object_id(user_id)
+        if oid is not None:
+            self.db.users.update_one({'_id': oid}, {'$inc': {field: delta}})
+
+    def increment_outfit(self, outfit_id: Any, field: str, delta: int = 1) -> None:
+        """Atomically add delta to an outfit counter."""
+        oid = _as_object_id(outfit_id)
+        if oid is not None:
+            self.db.outfits.update_one({'_id': oid}, {'$inc': {field: delta}})
+
+    def reconcile(self, batch_size: int = 500) -> Dict[str, int]:
+        """Recount every counter and fix documents that drifted.
+
+        Returns:
+            Number of repaired users and outfits
+        """
+        return {
+            'users': self.reconcile_users(batch_size),
+            'outfits': self.reconcile_outfits(batch_size),
+        }
+
+    def reconcile_users(self, batch_size: int = 500) -> int:
+        """Repair user counters in batches of batch_size users."""
+        repaired = 0
+        fields = {field: 1 for field in USER_COUNTER_FIELDS}
+        for batch in self._batches(self.db.users, fields, batch_size):
+            ids = [str(doc['_id']) for doc in batch]
+            actual = {
+                'follower_count': self._group_counts(self.db.follows, 'followed_id', ids),
+                'following_count': self._group_counts(self.db.follows, 'follower_id', ids),
+                'outfit_count': self._group_counts(self.db.outfits, 'user_id', ids),
+            }
+            repaired += self._repair(self.db.users, batch, actual, key=str)
+        return repaired
+
+    def reconcile_outfits(self, batch_size: int = 500) -> int:
+        """Repair outfit counters in batches of batch_size outfits."""
+        repaired = 0
+        fields = {field: 1 for field in OUTFIT_COUNTER_FIELDS}
+        for batch in self._batches(self.db.outfits, fields, batch_size):
+            ids = [doc['_id'] for doc in batch]
+            actual = {
+                'like_count': self._group_counts(self.db.likes, 'outfit_id', ids),
+                'comment_count': self._group_counts(self.db.comments, 'outfit_id', ids),
+            }
+            repaired += self._repair(self.db.outfits, batch, actual, key=lambda oid: oid)
+        return repaired
+
+    @staticmethod
+    def _batches(collection, projection: Dict[str, int], batch_size: int) -> Iterable[List[Dict[str, Any]]]:
+        """Walk a collection in _id order, one batch per query."""
+        last_id = None
+        while True:
+            query = {'_id': {'$gt': last_id}} if last_id is not None else {}
+            batch = list(collection.find(query, projection).sort('_id', 1).limit(batch_size))
+            if not batch:
+                return
+            yield batch
+            last_id = batch[-1]['_id']
+
+    @staticmethod
+    def _group_counts(collection, field: str, values: List[Any]) -> Dict[Any, int]:
+        pipeline = [
+            {'$match': {field: {'$in': values}}},
+            {'$group': {'_id': f'${field}', 'count': {'$sum': 1}}},
+        ]
+        return {row['_id']: row['count'] for row in collection.aggregate(pipeline)}
+
+    @staticmethod
+    def _repair(collection, batch, actual: Dict[str, Dict[Any, int]], key) -> int:
+        """Write corrected counts, skipping documents whose counter moved since it was read."""
+        operations = []
+        for doc in batch:
+            corrected = {}
+            for field, counts in actual.items():
+                expected = counts.get(key(doc['_id']), 0)
+                if doc.get(field) != expected:
+                    corrected[field] = expected
+            if not corrected:
+                continue
+            # Matching on the stored values keeps a concurrent $inc from being
+            # overwritten with a stale recount; the next run picks it up.
+            match = {'_id': doc['_id'], **{field: doc.get(field) for field in corrected}}
+            operations.append(UpdateOne(match, {'$set': corrected}))
+
+        if not operations:
+            return 0
+        return collection.bulk_write(operations, ordered=False).modified_count
+
@@ -0,0 +1,186 @@
+"""Compact in-memory follow graph for friend-of-friend suggestions."""
+
+import heapq
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+
+class FollowGraph:
+    """Directed follow graph with user ids remapped to dense integers.
+
+    Each user id string is stored once. Out-edges are kept as one unsigned
+    int array per node, which is a small fraction of the memory a dict of
+    string sets would need for the same edges.
+    """
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.following: List[array] = []
+        self.edge_count = 0
+
+    def _node(self, user_id: str) -> int:
+        node = self.index.get(user_id)
+        if node is None:
+            node = len(self.ids)
+            self.index[user_id] = node
+            self.ids.append(user_id)
+            self.following.append(array('I'))
+        return node
+
+    def add_edge(self, follower_id: str, followed_id: str, check_existing: bool = True) -> None:
+        """Add one edge; check_existing=False skips the scan of the follower's edges."""
+        edges = self.following[self._node(follower_id)]
+        target = self._node(followed_id)
+        if not check_existing or target not in edges:
+            edges.append(target)
+            self.edge_count += 1
+
+    def remove_edge(self, follower_id: str, followed_id: str) -> None:
+        follower, target = self.index.get(follower_id), self.index.get(followed_id)
+        if follower is None or target is None:
+            return
+        edges = self.following[follower]
+        try:
+            edges.remove(target)
+            self.edge_count -= 1
+        except ValueError:
+            pass
+
+    def suggest(self, user_id: str, limit: int = 20, time_budget_seconds: float = 0.05) -> List[Tuple[str, int]]:
+        """Rank users followed by the people user_id follows, by how many of them follow each.
+
+        Counting stops once the time budget is spent, so very dense
+        neighbourhoods return a best-effort ranking instead of a slow answer.
+
+        Returns:
+            List of (user_id, mutual count) pairs, best first
+        """
+        node = self.index.get(user_id)
+        if node is None:
+            return []
+
+        deadline = time.monotonic() + time_budget_seconds
+        followed = self.following[node]
+        excluded = set(followed)
+        excluded.add(node)
+
+        counts: Dict[int, int] = {}
+        for position, friend in enumerate(followed):
+            for candidate in self.following[friend]:
+                if candidate not in excluded:
+                    counts[candidate] = counts.get(candidate, 0) + 1
+            if position % 32 == 31 and time.monotonic() > deadline:
+                break
+
+        best = heapq.nlargest(limit, counts.items(), key=lambda item: (item[1], -item[0]))
+        return [(self.ids[candidate], mutual) for candidate, mutual in best]
+
+
+class FollowGraphIndex:
+    """Owns the FollowGraph of this worker and keeps it fresh.
+
+    start() builds the graph from the follows collection in a background
+    thread; until that first build finishes suggest() returns no
+    suggestions instead of blocking a request on it. The graph is rebuilt
+    in the background every refresh_seconds. follow_user and unfollow_user
+    apply their edge changes incrementally. Changes seen while a rebuild is running are
+    replayed onto the new graph before it is swapped in. Other workers pick
+    up a change at their next rebuild.
+    """
+
+    def __init__(self, db, refresh_seconds: int = 600):
+        """
+        Initialize FollowGraphIndex.
+
+        Args:
+            db: MongoDB database instance
+            refresh_seconds: Age after which the graph is rebuilt from Mongo
+        """
+        self.db = db
+        self.refresh_seconds = refresh_seconds
+        self._graph: Optional[FollowGraph] = None
+        self._built_at = 0.0
+        self._lock = threading.RLock()
+        self._build_lock = threading.Lock()
+        self._pending: Optional[List[Tuple[bool, str, str]]] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'FollowGraphIndex':
+        """Build (or rebuild) the graph in a background thread unless one is already running."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return self
+            self._thread = threading.Thread(target=self._rebuild_quietly, name='follow-graph-rebuild', daemon=True)
+            self._thread.start()
+        return self
+
+    def graph(self) -> Optional[FollowGraph]:
+        """Return the current graph, or None until the first build finishes.
+
+        A missing or stale graph starts a background rebuild.
+        """
+        graph = self._graph
+        if graph is None or (self.refresh_seconds > 0 and time.monotonic() - self._built_at > self.refresh_seconds):
+            self.start()
+        return graph
+
+    def rebuild(self) -> None:
+        """Build a fresh graph from the follows collection and swap it in."""
+        if not self._build_lock.acquire(blocking=self._graph is None):
+            return
+        try:
+            with self._lock:
+                self._pending = []
+
+            graph = FollowGraph()
+            # follows is unique on (follower_id, followed_id), so no edge repeats.
+            follows = self.db.follows.find({}, {'follower_id': 1, 'followed_id': 1, '_id': 0})
+            for follow in follows:
+                if follow.get('follower_id') and follow.get('followed_id'):
+                    graph.add_edge(follow['follower_id'], follow['followed_id'], check_existing=False)
+
+            with self._lock:
+                for added, follower_id, followed_id in self._pending:
+                    if added:
+                        graph.add_edge(follower_id, followed_id)
+                    else:
+                        graph.remove_edge(follower_id, followed_id)
+                self._pending = None
+                self._graph = graph
+                self._built_at = time.monotonic()
+        finally:
+            self._build_lock.release()
+
+    def _rebuild_quietly(self) -> None:
+        try:
+            self.rebuild()
+        except Exception:
+            with self._lock:
+                self._pending = None
+
+    def add_follow(self, follower_id: str, followed_id: str) -> None:
+        self._apply(True, follower_id, followed_id)
+
+    def remove_follow(self, follower_id: str, followed_id: str) -> None:
+        self._apply(False, follower_id, followed_id)
+
+    def _apply(self, added: bool, follower_id: str, followed_id: str) -> None:
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((added, follower_id, followed_id))
+            if self._graph is None:
+                return
+            if added:
+                self._graph.add_edge(follower_id, followed_id)
+            else:
+                self._graph.remove_edge(follower_id, followed_id)
+
+    def suggest(self, user_id: str, limit: int = 20, time_budget_seconds: float = 0.05) -> List[Tuple[str, int]]:
+        graph = self.graph()
+        if graph is None:
+            return []
+        with self._lock:
+            return graph.suggest(user_id, limit=limit, time_budget_seconds=time_budget_seconds)
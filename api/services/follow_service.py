@@ -0,0 +1,93 @@
+"""Service for follow relationship lookups and maintenance."""
+
+from typing import Dict, List
+
+from pymongo import DeleteOne, UpdateOne
+
+
+class FollowService:
+    """Service for follow relationship lookups and maintenance."""
+
+    def __init__(self, db):
+        """
+        Initialize FollowService.
+
+        Args:
+            db: MongoDB database instance
+        """
+        self.db = db
+
+    def is_following_many(self, follower_id: str, target_ids: List[str]) -> Dict[str, bool]:
+        """Answer "does follower_id follow X" for many targets with one query.
+
+        The $in runs on the unique (follower_id, followed_id) index.
+
+        Args:
+            follower_id: String id of the following user
+            target_ids: String ids of the users to check
+
+        Returns:
+            Dict mapping every target id to True or False, in target_ids order
+        """
+        if not target_ids:
+            return {}
+
+        followed = {
+            doc.get('followed_id')
+            for doc in self.db.follows.find(
+                {'follower_id': follower_id, 'followed_id': {'$in': list(target_ids)}},
+                {'followed_id': 1, '_id': 0},
+            )
+        }
+        return {target_id: target_id in followed for target_id in target_ids}
+
+    def migrate_legacy_following_ids(self, batch_size: int = 500) -> int:
+        """Rewrite legacy follow documents that store the target as following_id.
+
+        Each document gets followed_id and loses following_id. A legacy
+        document that duplicates an existing (follower_id, followed_id) pair is
+        deleted instead, since the unique index would reject the rewrite.
+        Run once per database with `python maintenance.py migrate-follows`.
+
+        Returns:
+            Number of migrated or removed legacy documents
+        """
+        migrated = 0
+        while True:
+            batch = list(
+                self.db.follows.find(
+                    {'following_id': {'$exists': True}},
+                    {'follower_id': 1, 'followed_id': 1, 'following_id': 1},
+                ).limit(batch_size)
+            )
+            if not batch:
+                return migrated
+
+            existing_pairs = {
+                (doc.get('follower_id'), doc.get('followed_id'))
+                for doc in self.db.follows.find(
+                    {
+                        '$or': [
+                            {'follower_id': doc.get('follower_id'), 'followed_id': doc.get('following_id')}
+                            for doc in batch
+                        ],
+                    },
+                    {'follower_id': 1, 'followed_id': 1},
+                )
+            }
+
+            operations = []
+            for doc in batch:
+                target_id = doc.get('followed_id') or doc.get('following_id')
+                pair = (doc.get('follower_id'), target_id)
+                if not doc.get('followed_id') and pair in existing_pairs:
+                    operations.append(DeleteOne({'_id': doc['_id']}))
+                    continue
+                existing_pairs.add(pair)
+                operations.append(UpdateOne(
+                    {'_id': doc['_id']},
+                    {'$set': {'followed_id': target_id}, '$unset': {'following_id': ''}},
+                ))
+
+            self.db.follows.bulk_write(operations, ordered=False)
+            migrated += len(operations)
@@ -0,0 +1,142 @@
+"""Precomputed facet counts for the garment catalog."""
+
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo import UpdateOne
+
+
+# Fields a garment row is bucketed by; every combination gets one facet row.
+FACET_KEY_FIELDS = ('type', 'gender', 'style', 'is_custom')
+# Fields whose per-value counts are returned alongside catalog pages.
+FACET_FIELDS = ('type', 'gender', 'style')
+
+
+def facet_values(garment: Dict[str, Any]) -> Dict[str, Any]:
+    """The facet key of a garment document (style may be None)."""
+    return {
+        'type': garment.get('type'),
+        'gender': garment.get('gender'),
+        'style': garment.get('style'),
+        'is_custom': bool(garment.get('is_custom')),
+    }
+
+
+def _row_id(values: Dict[str, Any], user_id: Optional[str] = None) -> str:
+    key = '|'.join('' if values[field] is None else str(values[field]) for field in FACET_KEY_FIELDS)
+    return f'user:{user_id}|{key}' if user_id else key
+
+
+class GarmentFacetService:
+    """Maintain and read the garment_facets table.
+
+    The table holds one global row (user_id None) per (type, gender,
+    style, is_custom) combination with the number of garments in it, plus
+    the same rows per creator keyed by user_id. GarmentService adjusts the
+    global and the creator row with $inc next to every insert, update and
+    delete, so a catalog request, creator-scoped or not, reads a few dozen
+    facet rows instead of grouping the garments collection. rebuild()
+    recounts the table from scratch for writes that bypass GarmentService
+    (seed.py) and to repair drift; run it once with
+    `python maintenance.py rebuild-garment-facets` on a table written
+    before per-creator rows existed.
+    """
+
+    def __init__(self, db):
+        """
+        Initialize GarmentFacetService.
+
+        Args:
+            db: MongoDB database instance
+        """
+        self.db = db
+        self.collection = db.garment_facets
+
+    def adjust(self, garment: Dict[str, Any], delta: int) -> None:
+        """Add delta to the global and the creator facet row of one garment."""
+        values = facet_values(garment)
+        if not values['type']:
+            return
+        owners = [None, garment['user_id']] if garment.get('user_id') else [None]
+        self.collection.bulk_write([
+            UpdateOne(
+                {'_id': _row_id(values, user_id)},
+                {'$inc': {'count': delta}, '$setOnInsert': {**values, 'user_id': user_id}},
+                upsert=True,
+            )
+            for user_id in owners
+        ], ordered=False)
+
+    def move(self, before: Dict[str, Any], after: Dict[str, Any]) -> None:
+        """Move one garment between facet rows after an update changed its facet fields or creator."""
+        if facet_values(before) != facet_values(after) or before.get('user_id') != after.get('user_id'):
+            self.adjust(before, -1)
+            self.adjust(after, 1)
+
+    def counts(self, filters: Dict[str, Any], creator_id: Optional[str] = None) -> Dict[str, Any]:
+        """Facet counts for a catalog query.
+
+        Each facet is counted with every filter applied except its own, so a
+        client can show how many garments selecting another value would
+        return. Creator-scoped queries read that creator's rows.
+
+        Returns:
+            Dict with 'total' and one {value: count} dict per FACET_FIELDS entry
+        """
+        rows = self.collection.find({'user_id': creator_id or None, 'count': {'$gt': 0}})
+        return _summarize(rows, filters)
+
+    def rebuild(self) -> int:
+        """Recount every global and per-creator facet row from the garments collection.
+
+        Returns:
+            Number of facet rows written
+        """
+        totals: Dict[str, Dict[str, Any]] = {}
+        for row in self._group_rows():
+            values = {field: row[field] for field in FACET_KEY_FIELDS}
+            for user_id in ([None, row['user_id']] if row['user_id'] else [None]):
+                total = totals.setdefault(_row_id(values, user_id), {**values, 'user_id': user_id, 'count': 0})
+                total['count'] += row['count']
+        for row_id, row in totals.items():
+            self.collection.replace_one({'_id': row_id}, row, upsert=True)
+        self.collection.delete_many({'_id': {'$nin': list(totals)}})
+        return len(totals)
+
+    def _group_rows(self) -> List[Dict[str, Any]]:
+        group_fields = ('user_id', 'type', 'gender', 'style')
+        rows = self.db.garments.aggregate([
+            {'$group': {
+                '_id': {field: f'${field}' for field in group_fields},
+                'custom': {'$sum': {'$cond': [{'$eq': ['$is_custom', True]}, 1, 0]}},
+                'count': {'$sum': 1},
+            }},
+        ])
+        split = []
+        for row in rows:
+            key = {field: row['_id'].get(field) for field in group_fields}
+            if not key['type']:
+                continue
+            for is_custom, count in ((True, row['custom']), (False, row['count'] - row['custom'])):
+                if count:
+                    split.append({**key, 'is_custom': is_custom, 'count': count})
+        return split
+
+
+def _summarize(rows: Iterable[Dict[str, Any]], filters: Dict[str, Any]) -> Dict[str, Any]:
+    """Fold facet rows into the total and per-field counts for filters."""
+    rows = list(rows)
+    result: Dict[str, Any] = {
+        'total': sum(row['count'] for row in rows if _matches(row, filters)),
+    }
+    for field in FACET_FIELDS:
+        others = {key: value for key, value in filters.items() if key != field}
+        counts: Dict[str, int] = {}
+        for row in rows:
+            if row.get(field) is not None and _matches(row, others):
+                counts[row[field]] = counts.get(row[field], 0) + row['count']
+        result[field] = {value: count for value, count in sorted(counts.items()) if count > 0}
+    return result
+
+
+def _matches(row: Dict[str, Any], filters: Dict[str, Any]) -> bool:
+    return all(row.get(field) == value for field, value in filters.items())
@@ -1,8 +1,15 @@
 """Service for managing garments in the database."""
 
-from typing import List, Optional, Dict, Any
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from bson import ObjectId
+from pymongo import ReturnDocument
 from api.models.garment import Garment
+from api.services.garment_facets import FACET_KEY_FIELDS, GarmentFacetService
+from api.services.pagination import paginate
+
+
+# Filters accepted by catalog_page; creator_id maps to the user_id field.
+CATALOG_FILTERS = ("type", "gender", "style", "is_custom")
 
 
 class GarmentService:
@@ -17,6 +24,7 @@ class GarmentService:
         """
         self.db = db
         self.collection = db.garments
+        self.facets = GarmentFacetService(db)
 
     def create_garment(self, garment: Garment) -> str:
         """
@@ -30,6 +38,7 @@ class GarmentService:
         """
         garment_dict = garment.to_dict()
         result = self.collection.insert_one(garment_dict)
+        self.facets.adjust(garment_dict, 1)
         return str(result.inserted_id)
 
     def get_garment(self, garment_id: str) -> Optional[Garment]:
@@ -51,6 +60,43 @@ class GarmentService:
             pass
         return None
 
+    def get_garments_by_ids(self, garment_ids: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+        """
+        Resolve many garment references with a single query.
+
+        Outfits reference garments either by ObjectId string or by the seed
+        data's string ``id`` field, so both are matched in one $or of two $in
+        clauses.
+
+        Args:
+            garment_ids: Garment references as stored on outfits
+
+        Returns:
+            Dict mapping every matched reference to the garment's to_dict()
+        """
+        refs = {str(gid) for gid in garment_ids if gid}
+        if not refs:
+            return {}
+
+        object_ids = [ObjectId(ref) for ref in refs if ObjectId.is_valid(ref)]
+        # $type repeats the partial filter of the garment_ref_id index, so
+        # this branch of the $or can use it instead of scanning.
+        clauses: List[Dict[str, Any]] = [{"id": {"$in": list(refs), "$type": "string"}}]
+        if object_ids:
+            clauses.append({"_id": {"$in": object_ids}})
+
+        resolved: Dict[str, Dict[str, Any]] = {}
+        for doc in self.collection.find({"$or": clauses}):
+            doc["_id"] = str(doc["_id"])
+            try:
+                garment = Garment.from_dict(doc).to_dict()
+            except ValueError:
+                continue
+            for key in (doc["_id"], doc.get("id")):
+                if key in refs:
+                    resolved[key] = garment
+        return resolved
+
     def get_garments_by_type(
         self, garment_type: str, gender: Optional[str] = None
     ) -> List[Garment]:
@@ -122,10 +168,20 @@ class GarmentService:
             True if update was successful, False otherwise
         """
         try:
-            result = self.collection.update_one(
-                {"_id": ObjectId(garment_id)}, {"$set": updates}
+            if not any(field in updates for field in FACET_KEY_FIELDS):
+                result = self.collection.update_one(
+                    {"_id": ObjectId(garment_id)}, {"$set": updates}
+                )
+                return result.modified_count > 0
+            before = self.collection.find_one_and_update(
+                {"_id": ObjectId(garment_id)},
+                {"$set": updates},
+                return_document=ReturnDocument.BEFORE,
             )
-            return result.modified_count > 0
+            if before is None:
+                return False
+            self.facets.move(before, {**before, **updates})
+            return True
         except Exception:
             return False
 
@@ -140,8 +196,11 @@ class GarmentService:
             True if deletion was successful, False otherwise
         """
         try:
-            result = self.collection.delete_one({"_id": ObjectId(garment_id)})
-            return result.deleted_count > 0
+            deleted = self.collection.find_one_and_delete({"_id": ObjectId(garment_id)})
+            if deleted is None:
+                return False
+            self.facets.adjust(deleted, -1)
+            return True
         except Exception:
             return False
 
@@ -161,3 +220,55 @@ class GarmentService:
             doc["_id"] = str(doc["_id"])
             garments.append(Garment.from_dict(doc))
         return garments
+
+    def list_garments_page(
+        self, query: Dict[str, Any], limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[Garment], Optional[str]]:
+        """
+        Get one page of garments, newest first.
+
+        Args:
+            query: MongoDB query dictionary
+            limit: Page size
+            cursor: Cursor returned with the previous page
+
+        Returns:
+            Tuple of (garments, next_cursor or None on the last page)
+        """
+        docs, next_cursor = paginate(self.collection, query, limit, cursor)
+        garments = []
+        for doc in docs:
+            doc["_id"] = str(doc["_id"])
+            garments.append(Garment.from_dict(doc))
+        return garments, next_cursor
+
+    def catalog_page(
+        self,
+        filters: Dict[str, Any],
+        limit: int,
+        cursor: Optional[str] = None,
+        creator_id: Optional[str] = None,
+    ) -> Tuple[List[Garment], Optional[str], Dict[str, Any]]:
+        """
+        Get one page of the garment catalog with facet counts.
+
+        Any combination of type, gender, style and is_custom can be given;
+        the compound (..., created_at, _id) indexes created in run.py keep
+        each combination an index scan. Facet counts come from the
+        garment_facets table rather than grouping the collection.
+
+        Args:
+            filters: Equality filters keyed by CATALOG_FILTERS fields
+            limit: Page size
+            cursor: Cursor returned with the previous page
+            creator_id: Optional creator/user ID to restrict the catalog to
+
+        Returns:
+            Tuple of (garments, next_cursor or None, facet counts)
+        """
+        query = {field: filters[field] for field in CATALOG_FILTERS if filters.get(field) is not None}
+        facets = self.facets.counts(query, creator_id=creator_id)
+        if creator_id:
+            query["user_id"] = creator_id
+        garments, next_cursor = self.list_garments_page(query, limit, cursor)
+        return garments, next_cursor, facets
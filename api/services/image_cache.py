@@ -0,0 +1,312 @@
+"""Disk-backed cache for images proxied from cloud storage."""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from io import BytesIO
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from flask import send_file
+from PIL import Image
+
+from api.services.image_variants import VariantSpec, render_variant
+
+
+class ImageVariantError(Exception):
+    """Raised when a source cannot be decoded as an image to render a variant."""
+
+
+class ImageTooLargeError(ImageVariantError):
+    """Raised when a source decodes to more pixels than Pillow's decompression bomb limit."""
+
+
+class CachedImage:
+    """An image held in the disk cache."""
+
+    def __init__(self, content: bytes, meta: Dict[str, Any]):
+        self.content = content
+        self.meta = meta
+
+    @property
+    def content_type(self) -> str:
+        return self.meta.get('content_type') or 'application/octet-stream'
+
+    @property
+    def etag(self) -> str:
+        return self.meta.get('etag')
+
+    @property
+    def last_modified(self) -> Optional[datetime]:
+        stored_at = self.meta.get('stored_at')
+        return datetime.fromtimestamp(stored_at, tz=timezone.utc) if stored_at else None
+
+
+class DiskImageCache:
+    """Size-bounded LRU cache of image bytes on local disk.
+
+    Entries are files named by the SHA-256 of their key, with a JSON sidecar
+    holding metadata. Files are written atomically, so every gunicorn worker on
+    a host can share one cache directory. Recency is tracked through file mtimes
+    and eviction trims the least recently used files once the directory grows
+    past max_bytes.
+    """
+
+    EVICT_TO_RATIO = 0.9
+
+    def __init__(self, root: str, max_bytes: int = 256 * 1024 * 1024):
+        """
+        Initialize DiskImageCache.
+
+        Args:
+            root: Directory holding cached files
+            max_bytes: Upper bound for the total size of cached image bytes
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._approx_bytes: Optional[int] = None
+        os.makedirs(self.root, exist_ok=True)
+
+    def _paths(self, key: str) -> Tuple[str, str]:
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        directory = os.path.join(self.root, digest[:2])
+        return os.path.join(directory, f'{digest}.bin'), os.path.join(directory, f'{digest}.json')
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def get(self, key: str) -> Optional[CachedImage]:
+        """Return the cached image for key, or None."""
+        data_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(data_path, 'rb') as f:
+                content = f.read()
+            os.utime(data_path)
+        except (OSError, ValueError):
+            return None
+        return CachedImage(content, meta)
+
+    def put(self, key: str, content: bytes, meta: Optional[Dict[str, Any]] = None) -> CachedImage:
+        """Store image bytes under key and return the cached entry."""
+        meta = dict(meta or {})
+        meta.update({
+            'key': key,
+            'size': len(content),
+            'etag': hashlib.sha256(content).hexdigest(),
+            'stored_at': time.time(),
+            'validated_at': time.time(),
+        })
+
+        data_path, meta_path = self._paths(key)
+        self._write_atomic(data_path, content)
+        self._write_atomic(meta_path, json.dumps(meta).encode('utf-8'))
+        self._track_and_evict(len(content))
+        return CachedImage(content, meta)
+
+    def touch_validated(self, entry: CachedImage) -> None:
+        """Record that the upstream confirmed entry is still current."""
+        entry.meta['validated_at'] = time.time()
+        _, meta_path = self._paths(entry.meta['key'])
+        try:
+            self._write_atomic(meta_path, json.dumps(entry.meta).encode('utf-8'))
+        except OSError:
+            pass
+
+    def invalidate(self, key: Optional[str]) -> None:
+        """Remove the entry for key if present."""
+        if not key:
+            return
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _track_and_evict(self, added_bytes: int) -> None:
+        with self._lock:
+            if self._approx_bytes is None:
+                self._approx_bytes = sum(size for _, size, _ in self._scan())
+            else:
+                self._approx_bytes += added_bytes
+
+            if self._approx_bytes <= self.max_bytes:
+                return
+
+            entries = sorted(self._scan(), key=lambda item: item[2])
+            total = sum(size for _, size, _ in entries)
+            target = self.max_bytes * self.EVICT_TO_RATIO
+            for data_path, size, _ in entries:
+                if total <= target:
+                    break
+                for path in (data_path, data_path[:-len('.bin')] + '.json'):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                total -= size
+            self._approx_bytes = total
+
+    def _scan(self):
+        """Yield (data_path, size, mtime) for every cached file."""
+        for directory, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if not filename.endswith('.bin'):
+                    continue
+                path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+
+class ImageProxy:
+    """Fetch images from cloud storage through a DiskImageCache.
+
+    Cached entries are served without contacting the upstream until they are
+    older than revalidate_seconds; after that a conditional GET (If-None-Match /
+    If-Modified-Since) refreshes them, and a 304 keeps the cached bytes. A
+    pooled requests.Session reuses upstream connections.
+    """
+
+    def __init__(self, cache: DiskImageCache, revalidate_seconds: int = 3600, timeout: int = 30):
+        """
+        Initialize ImageProxy.
+
+        Args:
+            cache: Disk cache holding fetched images
+            revalidate_seconds: Age after which a cached image is revalidated upstream
+            timeout: Upstream request timeout in seconds
+        """
+        self.cache = cache
+        self.revalidate_seconds = revalidate_seconds
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    @staticmethod
+    def cache_key(url: str, version: Optional[str] = None) -> str:
+        """Cache key of url; a version lets an overwritten upstream path get a fresh key on every host."""
+        return f'{url}#v={version}' if version else url
+
+    def get(self, url: str, auth=None, version: Optional[str] = None) -> Tuple[Optional[CachedImage], Optional[int]]:
+        """Return (cached image, None) or (None, upstream status code) on failure.
+
+        Args:
+            url: Upstream image URL
+            auth: Optional requests auth for the upstream
+            version: Identifies the upload behind url when the upstream path is reused
+
+        Raises:
+            requests.exceptions.RequestException: If the upstream is unreachable
+                and nothing is cached for url
+        """
+        key = self.cache_key(url, version)
+        entry = self.cache.get(key)
+        if entry and time.time() - entry.meta.get('validated_at', 0) < self.revalidate_seconds:
+            return entry, None
+
+        headers = {}
+        if entry:
+            if entry.meta.get('upstream_etag'):
+                headers['If-None-Match'] = entry.meta['upstream_etag']
+            if entry.meta.get('upstream_last_modified'):
+                headers['If-Modified-Since'] = entry.meta['upstream_last_modified']
+
+        try:
+            response = self.session.get(url, auth=auth, headers=headers, timeout=self.timeout)
+        except requests.exceptions.RequestException:
+            if entry:
+                return entry, None
+            raise
+
+        if response.status_code == 304 and entry:
+            self.cache.touch_validated(entry)
+            return entry, None
+
+        if response.status_code != 200:
+            if entry:
+                return entry, None
+            return None, response.status_code
+
+        entry = self.cache.put(key, response.content, {
+            'content_type': response.headers.get('Content-Type', 'image/jpeg'),
+            'upstream_etag': response.headers.get('ETag'),
+            'upstream_last_modified': response.headers.get('Last-Modified')
+                or format_datetime(datetime.now(timezone.utc), usegmt=True),
+        })
+        return entry, None
+
+    def get_variant(
+        self, url: str, spec: Optional[VariantSpec], auth=None, quality: int = 82, version: Optional[str] = None
+    ) -> Tuple[Optional[CachedImage], Optional[int]]:
+        """Return the image at url rendered according to spec (the original when spec is None).
+
+        Each variant is rendered once and then served from the disk cache. Its
+        key includes the source ETag, so replacing the original orphans old
+        variants for LRU eviction.
+
+        Raises:
+            ImageVariantError: If the source is not a decodable image
+            ImageTooLargeError: If the source exceeds Pillow's pixel limit
+        """
+        source, upstream_status = self.get(url, auth=auth, version=version)
+        if source is None or spec is None:
+            return source, upstream_status
+
+        key = spec.cache_key(self.cache_key(url, version), source.etag)
+        variant = self.cache.get(key)
+        if variant:
+            return variant, None
+
+        try:
+            content = render_variant(source.content, spec, quality=quality)
+        except Image.DecompressionBombError as e:
+            raise ImageTooLargeError(str(e))
+        except (OSError, ValueError) as e:
+            raise ImageVariantError(str(e))
+        return self.cache.put(key, content, {'content_type': spec.mimetype}), None
+
+    def invalidate(self, url: Optional[str]) -> None:
+        """Drop the cached image for url."""
+        self.cache.invalidate(url)
+
+
+def send_cached_image(
+    image: CachedImage,
+    download_name: str,
+    max_age: int,
+    mimetype: Optional[str] = None,
+    vary_accept: bool = False,
+):
+    """Build a conditional response (ETag/Last-Modified, 304 on match) for a cached image."""
+    response = send_file(
+        BytesIO(image.content),
+        mimetype=mimetype or image.content_type,
+        download_name=download_name,
+        etag=image.etag,
+        last_modified=image.last_modified,
+        max_age=max_age,
+        conditional=True,
+    )
+    response.cache_control.public = True
+    if vary_accept:
+        response.vary.add('Accept')
+    return response
@@ -0,0 +1,123 @@
+"""Resized / re-encoded image variants rendered with Pillow."""
+
+from io import BytesIO
+from typing import Optional, Tuple
+
+from PIL import Image, ImageOps
+
+
+VALID_FITS = ('cover', 'contain', 'fill')
+OUTPUT_FORMATS = {
+    'jpeg': ('JPEG', 'image/jpeg'),
+    'png': ('PNG', 'image/png'),
+    'webp': ('WEBP', 'image/webp'),
+}
+FORMAT_ALIASES = {'jpg': 'jpeg'}
+# Edge lengths a variant can have. Requested sizes snap up to one of them, so
+# each image has a handful of cacheable variants instead of one per pixel size.
+VARIANT_DIMENSIONS = (64, 128, 256, 512, 1024, 2048)
+
+
+class VariantSpec:
+    """Requested output size, fit mode and format of an image variant."""
+
+    def __init__(self, width: Optional[int], height: Optional[int], fit: str, fmt: str, negotiated: bool):
+        self.width = width
+        self.height = height
+        self.fit = fit
+        self.fmt = fmt
+        self.negotiated = negotiated  # True when fmt was picked from the Accept header
+
+    @property
+    def mimetype(self) -> str:
+        return OUTPUT_FORMATS[self.fmt][1]
+
+    @property
+    def extension(self) -> str:
+        return 'jpg' if self.fmt == 'jpeg' else self.fmt
+
+    def cache_key(self, source_key: str, source_etag: str) -> str:
+        """Key variants by the source bytes so a changed original never serves old variants."""
+        return f"{source_key}#{source_etag}:w={self.width or ''}:h={self.height or ''}:fit={self.fit}:fmt={self.fmt}"
+
+
+def accepts_webp(accept_mimetypes) -> bool:
+    """True only when the client names image/webp explicitly; wildcards are not trusted."""
+    return any(value == 'image/webp' and quality > 0 for value, quality in (accept_mimetypes or []))
+
+
+def snap_dimension(value: int, max_dimension: int = 2048) -> int:
+    """The smallest allowed variant edge >= value, capped at the largest one <= max_dimension."""
+    allowed = [size for size in VARIANT_DIMENSIONS if size <= max_dimension] or [VARIANT_DIMENSIONS[0]]
+    return next((size for size in allowed if size >= value), allowed[-1])
+
+
+def parse_variant_args(args, accept_mimetypes, max_dimension: int = 2048) -> Tuple[Optional[VariantSpec], Optional[str]]:
+    """Parse w/h/fit/format query parameters; w and h snap to VARIANT_DIMENSIONS.
+
+    Returns:
+        (spec, None), (None, None) when no variant was requested, or (None, error message)
+    """
+    if not any(args.get(name) for name in ('w', 'h', 'fit', 'format')):
+        return None, None
+
+    dimensions = []
+    for name in ('w', 'h'):
+        raw = args.get(name)
+        if raw in (None, ''):
+            dimensions.append(None)
+            continue
+        try:
+            value = int(raw)
+        except (TypeError, ValueError):
+            return None, f'{name} must be an integer'
+        if value <= 0:
+            return None, f'{name} must be positive'
+        dimensions.append(snap_dimension(value, max_dimension))
+
+    fit = (args.get('fit') or 'cover').lower()
+    if fit not in VALID_FITS:
+        return None, f"fit must be one of: {', '.join(VALID_FITS)}"
+
+    fmt = (args.get('format') or 'auto').lower()
+    fmt = FORMAT_ALIASES.get(fmt, fmt)
+    negotiated = fmt == 'auto'
+    if negotiated:
+        fmt = 'webp' if accepts_webp(accept_mimetypes) else 'jpeg'
+    if fmt not in OUTPUT_FORMATS:
+        return None, f"format must be one of: auto, {', '.join(OUTPUT_FORMATS)}"
+
+    return VariantSpec(dimensions[0], dimensions[1], fit, fmt, negotiated), None
+
+
+def render_variant(content: bytes, spec: VariantSpec, quality: int = 82) -> bytes:
+    """Resize and re-encode image bytes according to spec."""
+    with Image.open(BytesIO(content)) as source:
+        image = ImageOps.exif_transpose(source)
+        width, height = spec.width, spec.height
+
+        if width and height:
+            if spec.fit == 'cover':
+                image = ImageOps.fit(image, (width, height), Image.LANCZOS)
+            elif spec.fit == 'fill':
+                image = image.resize((width, height), Image.LANCZOS)
+            else:
+                image = image.copy()
+                image.thumbnail((width, height), Image.LANCZOS)
+        elif width or height:
+            # A single dimension keeps the aspect ratio and never upscales.
+            image = image.copy()
+            image.thumbnail((width or image.width, height or image.height), Image.LANCZOS)
+
+        pil_format, _ = OUTPUT_FORMATS[spec.fmt]
+        if pil_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        elif pil_format == 'WEBP' and image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+        out_buffer = BytesIO()
+        save_kwargs = {'optimize': True} if pil_format == 'PNG' else {'quality': quality}
+        if pil_format == 'JPEG':
+            save_kwargs['optimize'] = True
+        image.save(out_buffer, format=pil_format, **save_kwargs)
+        return out_buffer.getvalue()
@@ -0,0 +1,231 @@
+"""Durable background jobs stored in MongoDB."""
+
+import logging
+import os
+import random
+import socket
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from pymongo import ReturnDocument
+
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+RUNNING = 'running'
+FAILED = 'failed'
+
+
+class PartialBatchError(Exception):
+    """Raised by a handler when only some payloads of its batch failed.
+
+    run_batch retries the jobs whose payload is in failed_payloads and
+    completes the others.
+    """
+
+    def __init__(self, failed_payloads: List[Dict[str, Any]], message: str = ''):
+        super().__init__(message or f'{len(failed_payloads)} payloads failed')
+        self.failed_payloads = failed_payloads
+
+
+class JobQueue:
+    """A Mongo-backed job queue with leases, retries and exponential backoff.
+
+    enqueue() inserts a pending job document, so work survives restarts of
+    both the web process and the worker. A worker claims due jobs by
+    flipping them to running with a lease; jobs whose lease expires (a
+    crashed worker) become claimable again. Handlers receive every claimed
+    job of one kind together, so a batch of cascades costs one $in per
+    collection. Failed batches are retried after base_backoff_seconds *
+    2**(attempts - 1), capped at max_backoff_seconds, until max_attempts,
+    after which they stay in the collection with status 'failed'.
+    """
+
+    def __init__(
+        self,
+        db,
+        max_attempts: int = 5,
+        base_backoff_seconds: float = 5.0,
+        max_backoff_seconds: float = 600.0,
+        lease_seconds: float = 300.0,
+    ):
+        """
+        Initialize JobQueue.
+
+        Args:
+            db: MongoDB database instance
+            max_attempts: Attempts before a job is parked as failed
+            base_backoff_seconds: Delay before the first retry
+            max_backoff_seconds: Upper bound of the retry delay
+            lease_seconds: How long a claimed job is reserved for its worker
+        """
+        self.db = db
+        self.collection = db.jobs
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_backoff_seconds = float(base_backoff_seconds)
+        self.max_backoff_seconds = float(max_backoff_seconds)
+        self.lease_seconds = float(lease_seconds)
+
+    def enqueue(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        delay_seconds: float = 0,
+        dedupe_key: Optional[str] = None,
+    ) -> None:
+        """Queue a job of kind with payload.
+
+        With dedupe_key, a job with the same key that is still pending or
+        running absorbs the new one instead of queueing a duplicate.
+        """
+        now = datetime.now(timezone.utc)
+        job = {
+            'kind': kind,
+            'payload': payload,
+            'status': PENDING,
+            'attempts': 0,
+            'run_at': now + timedelta(seconds=delay_seconds),
+            'created_at': now,
+        }
+        if dedupe_key is None:
+            self.collection.insert_one(job)
+            return
+        self.collection.update_one(
+            {'dedupe_key': dedupe_key, 'status': {'$in': [PENDING, RUNNING]}},
+            {'$setOnInsert': {**job, 'dedupe_key': dedupe_key}},
+            upsert=True,
+        )
+
+    def schedule(self, kind: str, interval_seconds: float) -> None:
+        """Keep one pending or running job of kind queued, due interval_seconds from now.
+
+        Workers call this periodically. The dedupe key means a job that is
+        already queued or running absorbs the call, so the handler runs
+        about once per interval across every worker.
+        """
+        self.enqueue(kind, {}, delay_seconds=interval_seconds, dedupe_key=f'periodic:{kind}')
+
+    def claim(self, worker_id: str, kinds: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """Lease the oldest due job, or return None when nothing is due."""
+        now = datetime.now(timezone.utc)
+        query: Dict[str, Any] = {
+            '$or': [
+                {'status': PENDING, 'run_at': {'$lte': now}},
+                {'status': RUNNING, 'locked_until': {'$lt': now}},
+            ]
+        }
+        if kinds:
+            query['kind'] = {'$in': kinds}
+        return self.collection.find_one_and_update(
+            query,
+            {
+                '$set': {
+                    'status': RUNNING,
+                    'locked_by': worker_id,
+                    'locked_until': now + timedelta(seconds=self.lease_seconds),
+                },
+                '$inc': {'attempts': 1},
+            },
+            sort=[('run_at', 1), ('_id', 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def complete(self, jobs: List[Dict[str, Any]]) -> None:
+        """Remove finished jobs."""
+        if jobs:
+            self.collection.delete_many({'_id': {'$in': [job['_id'] for job in jobs]}})
+
+    def fail(self, job: Dict[str, Any], error: str) -> None:
+        """Schedule a retry with backoff, or park the job once it is out of attempts."""
+        attempts = job.get('attempts') or 1
+        update: Dict[str, Any] = {'last_error': error[:2000], 'locked_by': None, 'locked_until': None}
+        if attempts >= self.max_attempts:
+            update['status'] = FAILED
+        else:
+            delay = min(self.base_backoff_seconds * 2 ** (attempts - 1), self.max_backoff_seconds)
+            delay *= random.uniform(0.8, 1.2)
+            update['status'] = PENDING
+            update['run_at'] = datetime.now(timezone.utc) + timedelta(seconds=delay)
+        self.collection.update_one({'_id': job['_id']}, {'$set': update})
+
+    def run_batch(
+        self,
+        handlers: Dict[str, Callable[[List[Dict[str, Any]]], None]],
+        worker_id: Optional[str] = None,
+        batch_size: int = 50,
+    ) -> int:
+        """Claim up to batch_size due jobs and run them grouped by kind.
+
+        Each handler gets the payloads of all claimed jobs of its kind. When
+        it raises, every job of that group is retried, except that a
+        PartialBatchError only retries the jobs of its failed payloads.
+
+        Returns:
+            Number of jobs claimed
+        """
+        worker_id = worker_id or default_worker_id()
+        claimed: List[Dict[str, Any]] = []
+        while len(claimed) < batch_size:
+            job = self.claim(worker_id, kinds=list(handlers))
+            if job is None:
+                break
+            claimed.append(job)
+
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for job in claimed:
+            groups.setdefault(job['kind'], []).append(job)
+
+        for kind, jobs in groups.items():
+            try:
+                handlers[kind]([job.get('payload') or {} for job in jobs])
+            except PartialBatchError as err:
+                failed = [job for job in jobs if (job.get('payload') or {}) in err.failed_payloads]
+                logger.warning('Job batch %s partially failed (%d of %d jobs)', kind, len(failed), len(jobs))
+                for job in failed:
+                    self.fail(job, f'{type(err).__name__}: {err}')
+                self.complete([job for job in jobs if job not in failed])
+            except Exception as err:
+                logger.exception('Job batch %s failed (%d jobs)', kind, len(jobs))
+                for job in jobs:
+                    self.fail(job, f'{type(err).__name__}: {err}')
+            else:
+                self.complete(jobs)
+        return len(claimed)
+
+    def stats(self) -> Dict[str, Any]:
+        """Number of jobs per status and how long the oldest due job has waited.
+
+        A growing oldest_due_seconds means no worker is draining the queue.
+        """
+        counts: Dict[str, Any] = {PENDING: 0, RUNNING: 0, FAILED: 0}
+        for row in self.collection.aggregate([{'$group': {'_id': '$status', 'count': {'$sum': 1}}}]):
+            counts[row['_id']] = row['count']
+        now = datetime.now(timezone.utc)
+        oldest = self.collection.find_one(
+            {'status': PENDING, 'run_at': {'$lte': now}}, {'run_at': 1}, sort=[('run_at', 1)]
+        )
+        oldest_due_seconds = 0.0
+        if oldest:
+            run_at = oldest['run_at']
+            if run_at.tzinfo is None:
+                run_at = run_at.replace(tzinfo=timezone.utc)
+            oldest_due_seconds = max((now - run_at).total_seconds(), 0.0)
+        counts['oldest_due_seconds'] = oldest_due_seconds
+        return counts
+
+    def retry_failed(self) -> int:
+        """Give parked jobs a fresh set of attempts.
+
+        Returns:
+            Number of jobs requeued
+        """
+        result = self.collection.update_many(
+            {'status': FAILED},
+            {'$set': {'status': PENDING, 'attempts': 0, 'run_at': datetime.now(timezone.utc)}},
+        )
+        return result.modified_count
+
+
+def default_worker_id() -> str:
+    return f'{socket.gethostname()}:{os.getpid()}'
@@ -0,0 +1,241 @@
+"""Write-behind buffering of like/unlike toggles."""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import DeleteOne, UpdateOne
+
+from api.services.trending_service import TrendingService
+
+
+logger = logging.getLogger(__name__)
+
+
+class LikeBuffer:
+    """Coalesce like/unlike toggles in memory and flush them in bulk.
+
+    submit() records the latest desired state of one (outfit, user) pair
+    and returns at once; repeated toggles of the same pair collapse into a
+    single pending entry. A daemon thread flushes every
+    flush_interval_seconds, and sooner once flush_size pairs are pending.
+    A flush reads which pairs are already liked with one $in query, drops
+    toggles that would not change anything, and applies the rest with one
+    unordered bulk_write of upserts and deletes. The like_count and
+    trending deltas are then applied once per outfit. The buffer holds at
+    most max_pending pairs; a submit that would exceed it flushes inline,
+    so a burst slows callers down instead of growing memory.
+
+    Crash semantics:
+      * Toggles are acknowledged before they are durable. Pending toggles
+        are lost if the process dies before a flush, which bounds the loss
+        to flush_interval_seconds or max_pending pairs. stop() flushes on
+        a clean shutdown.
+      * A flush is idempotent. Likes are upserted and deleted by their
+        unique (outfit_id, user_id) key, so replaying a batch after a
+        failed or partial bulk_write converges to the same likes.
+      * When bulk_write raises, the batch is put back for the next flush
+        unless a newer toggle of the same pair arrived meanwhile. The
+        like_count of a partially applied batch can drift; the periodic
+        CounterService.reconcile repairs it.
+    """
+
+    def __init__(
+        self,
+        db,
+        max_pending: int = 10000,
+        flush_size: int = 500,
+        flush_interval_seconds: float = 1.0,
+    ):
+        """
+        Initialize LikeBuffer.
+
+        Args:
+            db: MongoDB database instance
+            max_pending: Most (outfit, user) pairs held before submit flushes inline
+            flush_size: Pending pairs that trigger an early background flush
+            flush_interval_seconds: Longest time a toggle waits before being flushed
+        """
+        self.db = db
+        self.max_pending = max(1, int(max_pending))
+        self.flush_size = max(1, min(int(flush_size), self.max_pending))
+        self.flush_interval_seconds = float(flush_interval_seconds)
+        self.trending = TrendingService(db)
+        self._pending: 'OrderedDict[Tuple[ObjectId, ObjectId], Tuple[bool, datetime]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.submitted = 0
+        self.coalesced = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.written = 0
+        self.skipped = 0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self._total_flush_seconds = 0.0
+
+    def submit(self, outfit_id: ObjectId, user_id: ObjectId, liked: bool) -> None:
+        """Record that user_id now likes (or no longer likes) outfit_id."""
+        key = (outfit_id, user_id)
+        with self._lock:
+            self.submitted += 1
+            full = key not in self._pending and len(self._pending) >= self.max_pending
+        if full:
+            self.flush()
+        with self._lock:
+            if key in self._pending:
+                self.coalesced += 1
+                self._pending.move_to_end(key)
+            self._pending[key] = (liked, datetime.now(timezone.utc))
+            depth = len(self._pending)
+        if depth >= self.flush_size:
+            self._wake.set()
+
+    def pending_state(self, outfit_id: ObjectId, user_id: ObjectId) -> Optional[bool]:
+        """The buffered state of one pair, or None when nothing is pending for it."""
+        with self._lock:
+            entry = self._pending.get((outfit_id, user_id))
+        return entry[0] if entry else None
+
+    def flush(self) -> int:
+        """Write every pending toggle to Mongo.
+
+        Returns:
+            Number of like documents inserted or deleted
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, OrderedDict()
+            if not batch:
+                return 0
+
+            started = time.monotonic()
+            try:
+                written = self._apply(batch)
+            except Exception:
+                logger.exception('Like buffer flush failed (%d pairs)', len(batch))
+                with self._lock:
+                    self.failed_flushes += 1
+                    for key, entry in batch.items():
+                        if key not in self._pending:
+                            self._pending[key] = entry
+                return 0
+            finally:
+                self._record_latency(time.monotonic() - started)
+
+            with self._lock:
+                self.flushes += 1
+                self.written += written
+                self.skipped += len(batch) - written
+            return written
+
+    def _apply(self, batch: 'OrderedDict[Tuple[ObjectId, ObjectId], Tuple[bool, datetime]]') -> int:
+        outfit_ids = list({outfit_id for outfit_id, _ in batch})
+        user_ids = list({user_id for _, user_id in batch})
+        # Outfits deleted since the toggle must not get their likes back.
+        live = {doc['_id'] for doc in self.db.outfits.find({'_id': {'$in': outfit_ids}}, {'_id': 1})}
+        # created_at of each existing like, to date the trending decrement of an unlike.
+        existing = {
+            (doc['outfit_id'], doc['user_id']): doc.get('created_at')
+            for doc in self.db.likes.find(
+                {'outfit_id': {'$in': outfit_ids}, 'user_id': {'$in': user_ids}},
+                {'outfit_id': 1, 'user_id': 1, 'created_at': 1, '_id': 0},
+            )
+        }
+
+        # Upserts go first so upserted_ids indexes line up with inserts.
+        ops = []
+        deletes = []
+        inserts = []
+        deltas: Dict[ObjectId, int] = {}
+        tallies: Dict[Tuple[ObjectId, datetime], int] = {}
+        for (outfit_id, user_id), (liked, at) in batch.items():
+            key_filter = {'outfit_id': outfit_id, 'user_id': user_id}
+            if liked and outfit_id in live and (outfit_id, user_id) not in existing:
+                inserts.append((len(ops), outfit_id, at))
+                ops.append(UpdateOne(key_filter, {'$setOnInsert': {'created_at': at}}, upsert=True))
+            elif not liked and (outfit_id, user_id) in existing:
+                deltas[outfit_id] = deltas.get(outfit_id, 0) - 1
+                bucket = TrendingService.bucket_start(existing[(outfit_id, user_id)] or at)
+                tallies[(outfit_id, bucket)] = tallies.get((outfit_id, bucket), 0) - 1
+                deletes.append(DeleteOne(key_filter))
+        ops.extend(deletes)
+        if not ops:
+            return 0
+
+        result = self.db.likes.bulk_write(ops, ordered=False)
+        # Another writer may have inserted the same like since the read above;
+        # only upserts that created a document count.
+        upserted = result.upserted_ids or {}
+        for index, outfit_id, at in inserts:
+            if index in upserted:
+                deltas[outfit_id] = deltas.get(outfit_id, 0) + 1
+                bucket = TrendingService.bucket_start(at)
+                tallies[(outfit_id, bucket)] = tallies.get((outfit_id, bucket), 0) + 1
+
+        counter_ops = [
+            UpdateOne({'_id': outfit_id}, {'$inc': {'like_count': delta}})
+            for outfit_id, delta in deltas.items() if delta
+        ]
+        if counter_ops:
+            self.db.outfits.bulk_write(counter_ops, ordered=False)
+        for (outfit_id, bucket), delta in tallies.items():
+            if delta:
+                self.trending.record(outfit_id, 'likes', delta, when=bucket)
+        return len(upserted) + result.deleted_count
+
+    def _record_latency(self, seconds: float) -> None:
+        with self._lock:
+            self.last_flush_seconds = seconds
+            self.max_flush_seconds = max(self.max_flush_seconds, seconds)
+            self._total_flush_seconds += seconds
+
+    def start(self) -> 'LikeBuffer':
+        """Start the background flusher thread."""
+        def run():
+            while not self._stop.is_set():
+                self._wake.wait(self.flush_interval_seconds)
+                self._wake.clear()
+                try:
+                    self.flush()
+                except Exception:
+                    logger.exception('Like buffer flusher failed')
+
+        self._thread = threading.Thread(target=run, name='like-buffer-flusher', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the flusher and write whatever is still pending."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval_seconds + 5)
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return buffer depth, toggle/flush counters and flush latency."""
+        with self._lock:
+            attempts = self.flushes + self.failed_flushes
+            return {
+                'depth': len(self._pending),
+                'max_pending': self.max_pending,
+                'flush_size': self.flush_size,
+                'flush_interval_seconds': self.flush_interval_seconds,
+                'submitted': self.submitted,
+                'coalesced': self.coalesced,
+                'flushes': self.flushes,
+                'failed_flushes': self.failed_flushes,
+                'written': self.written,
+                'skipped': self.skipped,
+                'last_flush_seconds': self.last_flush_seconds,
+                'max_flush_seconds': self.max_flush_seconds,
+                'avg_flush_seconds': (self._total_flush_seconds / attempts) if attempts else 0.0,
+            }
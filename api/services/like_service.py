@@ -1,23 +1,69 @@
 """Service for managing outfit likes."""
 
-from typing import Dict, Any, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 from datetime import datetime, timezone
 from bson import ObjectId
+from flask import current_app
 from pymongo.errors import DuplicateKeyError
 from api.models.like import Like
+from api.services.counter_service import CounterService
+from api.services.like_buffer import LikeBuffer
+from api.services.trending_service import TrendingService
 
 
 class LikeService:
-    """Service for managing outfit likes."""
+    """Service for managing outfit likes.
 
-    def __init__(self, db):
+    With a LikeBuffer (write-behind mode) like/unlike only record the
+    toggle and answer 202; the buffer writes likes, counters and trending
+    tallies in bulk shortly after. Without one every call writes through.
+    """
+
+    def __init__(self, db, buffer: Optional[LikeBuffer] = None):
         """
         Initialize LikeService.
 
         Args:
             db: MongoDB database instance
+            buffer: Optional LikeBuffer enabling write-behind like/unlike
         """
         self.db = db
+        self.buffer = buffer
+        self.counters = CounterService(db)
+        self.trending = TrendingService(db)
+
+    def liked_outfit_ids(self, user_id: ObjectId, outfit_ids: Iterable[Any]) -> Set[str]:
+        """Return which of outfit_ids user_id has liked, with one $in on the likes index."""
+        object_ids = [ObjectId(str(oid)) for oid in outfit_ids if oid and ObjectId.is_valid(str(oid))]
+        if not object_ids:
+            return set()
+        likes = self.db.likes.find(
+            {'outfit_id': {'$in': object_ids}, 'user_id': user_id},
+            {'outfit_id': 1, '_id': 0},
+        )
+        liked = {str(like['outfit_id']) for like in likes}
+        if self.buffer is not None:
+            for oid in object_ids:
+                state = self.buffer.pending_state(oid, user_id)
+                if state is True:
+                    liked.add(str(oid))
+                elif state is False:
+                    liked.discard(str(oid))
+        return liked
+
+    def attach_viewer_engagement(
+        self, outfits: List[Dict[str, Any]], viewer_id: Optional[ObjectId]
+    ) -> List[Dict[str, Any]]:
+        """Set liked_by_me on serialized outfits, in place.
+
+        like_count and comment_count already come from the counters kept on
+        each outfit document, so only the viewer's own likes need a query.
+        Anonymous viewers get liked_by_me = False without touching Mongo.
+        """
+        liked = self.liked_outfit_ids(viewer_id, (o.get('id') for o in outfits)) if viewer_id else set()
+        for outfit in outfits:
+            outfit['liked_by_me'] = outfit.get('id') in liked
+        return outfits
 
     def get_outfit_likes(self, outfit_id: ObjectId) -> Tuple[Dict[str, Any], int]:
         """Get all likes for an outfit.
@@ -45,6 +91,8 @@ class LikeService:
 
     def like_outfit(self, outfit_id: ObjectId, user_id: ObjectId) -> Tuple[Dict[str, Any], int]:
         """Like an outfit. If already liked, return existing like.
+
+        In write-behind mode the like is queued and acknowledged with 202.
         
         Args:
             outfit_id: ObjectId of the outfit
@@ -53,6 +101,10 @@ class LikeService:
         Returns:
             Tuple of (response_dict, status_code)
         """
+        if self.buffer is not None:
+            self.buffer.submit(outfit_id, user_id, True)
+            return {'status': 'accepted', 'outfit_id': str(outfit_id), 'user_id': str(user_id)}, 202
+
         try:
             like_doc = {
                 'outfit_id': outfit_id,
@@ -61,9 +113,11 @@ class LikeService:
             }
 
             try:
-                result = self.db.likes.insert_one(like_doc)
-                created = self.db.likes.find_one({'_id': result.inserted_id})
-                return Like.from_doc(created).to_dict(), 201
+                self.db.likes.insert_one(like_doc)
+                self.counters.increment_outfit(outfit_id, 'like_count', 1)
+                self.trending.record(outfit_id, 'likes', 1)
+                # insert_one set like_doc['_id']; no need to read the like back.
+                return Like.from_doc(like_doc).to_dict(), 201
             except DuplicateKeyError:
                 # Already liked - return existing like with 200 status
                 existing = self.db.likes.find_one({
@@ -77,6 +131,9 @@ class LikeService:
 
     def unlike_outfit(self, outfit_id: ObjectId, user_id: ObjectId) -> Tuple[Dict[str, Any], int]:
         """Unlike an outfit.
+
+        In write-behind mode the unlike is queued and acknowledged with 202,
+        whether or not the like exists.
         
         Args:
             outfit_id: ObjectId of the outfit
@@ -85,15 +142,22 @@ class LikeService:
         Returns:
             Tuple of (response_dict, status_code)
         """
+        if self.buffer is not None:
+            self.buffer.submit(outfit_id, user_id, False)
+            return {'status': 'accepted', 'outfit_id': str(outfit_id), 'user_id': str(user_id)}, 202
+
         try:
-            result = self.db.likes.delete_one({
+            deleted = self.db.likes.find_one_and_delete({
                 'outfit_id': outfit_id,
                 'user_id': user_id
             })
 
-            if result.deleted_count == 0:
+            if deleted is None:
                 return {'error': 'like not found'}, 404
 
+            self.counters.increment_outfit(outfit_id, 'like_count', -1)
+            # Cancel the like in the (decayed) bucket it was counted in.
+            self.trending.record(outfit_id, 'likes', -1, when=deleted.get('created_at'))
             return {'status': 'unliked', 'message': 'Successfully unliked outfit'}, 200
 
         except Exception as e:
@@ -109,6 +173,10 @@ class LikeService:
         Returns:
             True if liked, False otherwise
         """
+        if self.buffer is not None:
+            state = self.buffer.pending_state(outfit_id, user_id)
+            if state is not None:
+                return state
         try:
             like = self.db.likes.find_one({
                 'outfit_id': outfit_id,
@@ -120,7 +188,10 @@ class LikeService:
 
     def get_like_count(self, outfit_id: ObjectId) -> int:
         """Get the number of likes for an outfit.
-        
+
+        Reads the denormalized like_count, counting likes only for outfits
+        that do not carry the counter yet.
+
         Args:
             outfit_id: ObjectId of the outfit
             
@@ -128,6 +199,14 @@ class LikeService:
             Number of likes
         """
         try:
+            outfit = self.db.outfits.find_one({'_id': outfit_id}, {'like_count': 1})
+            if outfit and outfit.get('like_count') is not None:
+                return max(outfit['like_count'], 0)
             return self.db.likes.count_documents({'outfit_id': outfit_id})
         except Exception:
             return 0
+
+
+def current_like_service() -> LikeService:
+    """LikeService bound to the app's database and, when enabled, its like buffer."""
+    return LikeService(current_app.db, buffer=getattr(current_app, 'like_buffer', None))
@@ -0,0 +1,193 @@
+"""Full-text outfit search over an inverted index of name/description terms."""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from api.models.outfit import Outfit
+from api.services.author_cards import attach_author_cards
+from api.services.pagination import decode_cursor, encode_cursor
+from api.services.user_search_service import normalize_name
+
+
+NAME_WEIGHT = 3
+DESCRIPTION_WEIGHT = 1
+MAX_QUERY_TERMS = 8
+# Highest-weight postings read per query term; bounds the work of common terms.
+MAX_CANDIDATES_PER_TERM = 1000
+STOP_WORDS = frozenset({'a', 'an', 'and', 'the', 'of', 'for', 'with', 'in', 'on', 'to', 'my'})
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split normalized text into distinct search terms, dropping stop words and single letters."""
+    terms = []
+    for term in re.split(r'[^\w]+', normalize_name(text)):
+        if len(term) > 1 and term not in STOP_WORDS and term not in terms:
+            terms.append(term)
+    return terms
+
+
+class OutfitSearchService:
+    """Ranked outfit search backed by the outfit_terms collection.
+
+    Each outfit has one posting per distinct term of its name and
+    description. A posting carries the term's weight (name terms count
+    NAME_WEIGHT, description terms DESCRIPTION_WEIGHT) and copies of the
+    fields search filters on. A query reads at most MAX_CANDIDATES_PER_TERM
+    of the heaviest postings of each term through the (term, weight)
+    index and sums the weights per outfit, so outfits matching more terms,
+    or matching in the name, rank first. For very common terms ranking is
+    therefore over the best candidates rather than every match.
+    Postings are rewritten whenever an outfit is created or updated, and
+    dropped by the outfit delete cascade.
+    """
+
+    PAGE_PROJECTION = {'thumbnail': 0}
+
+    def __init__(self, db):
+        """
+        Initialize OutfitSearchService.
+
+        Args:
+            db: MongoDB database instance
+        """
+        self.db = db
+
+    def index_outfit(self, outfit_doc: Dict[str, Any]) -> None:
+        """Replace the postings of one outfit from its current document.
+
+        Postings are upserted on the unique (outfit_id, term) index and
+        terms the outfit no longer has are deleted afterwards, so
+        concurrent or repeated calls never leave duplicate postings.
+        """
+        outfit_id = outfit_doc['_id']
+        weights: Dict[str, int] = {}
+        for term in tokenize(outfit_doc.get('name')):
+            weights[term] = weights.get(term, 0) + NAME_WEIGHT
+        for term in tokenize(outfit_doc.get('description', outfit_doc.get('bio'))):
+            weights[term] = weights.get(term, 0) + DESCRIPTION_WEIGHT
+
+        if weights:
+            gender = outfit_doc.get('gender')
+            fields = {
+                'published': bool(outfit_doc.get('published')),
+                'user_id': outfit_doc.get('user_id'),
+                'gender': getattr(gender, 'value', gender),
+            }
+            ops = [
+                UpdateOne(
+                    {'outfit_id': outfit_id, 'term': term},
+                    {'$set': {'weight': weight, **fields}},
+                    upsert=True,
+                )
+                for term, weight in weights.items()
+            ]
+            try:
+                self.db.outfit_terms.bulk_write(ops, ordered=False)
+            except BulkWriteError:
+                # A concurrent indexer inserted some of the same (outfit_id, term)
+                # keys first; the retry updates them instead.
+                self.db.outfit_terms.bulk_write(ops, ordered=False)
+        self.db.outfit_terms.delete_many({'outfit_id': outfit_id, 'term': {'$nin': list(weights)}})
+        self.db.outfits.update_one({'_id': outfit_id}, {'$set': {'search_indexed': True}})
+
+    def search(
+        self,
+        query: str,
+        limit: int,
+        cursor: Optional[str] = None,
+        viewer_id: Optional[str] = None,
+        gender: Optional[str] = None,
+        published: Optional[bool] = None,
+        author_id: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Return one page of outfits matching query, most relevant first.
+
+        Other users' outfits are only returned when published; the viewer's
+        own drafts are searchable too.
+
+        Returns:
+            Tuple of (outfit dicts with an author card and relevance, next_cursor or None)
+        """
+        terms = tokenize(query)[:MAX_QUERY_TERMS]
+        if not terms:
+            return [], None
+
+        match: Dict[str, Any] = {}
+        if gender:
+            match['gender'] = gender
+        if author_id:
+            match['user_id'] = author_id
+        if published is not None:
+            match['published'] = published
+        if viewer_id:
+            match['$or'] = [{'published': True}, {'user_id': viewer_id}]
+        elif published is False:
+            return [], None
+        else:
+            match['published'] = True
+
+        relevance: Dict[ObjectId, int] = {}
+        for term in terms:
+            postings = (
+                self.db.outfit_terms.find({'term': term, **match}, {'outfit_id': 1, 'weight': 1, '_id': 0})
+                .sort('weight', -1)
+                .limit(MAX_CANDIDATES_PER_TERM)
+            )
+            for posting in postings:
+                relevance[posting['outfit_id']] = relevance.get(posting['outfit_id'], 0) + posting['weight']
+
+        ranked = [{'_id': outfit_id, 'relevance': score} for outfit_id, score in relevance.items()]
+        if cursor:
+            after_relevance, after_id = decode_cursor(cursor)
+            ranked = [
+                hit for hit in ranked
+                if (hit['relevance'], hit['_id']) < (after_relevance, after_id)
+            ]
+        ranked.sort(key=lambda hit: (hit['relevance'], hit['_id']), reverse=True)
+        ranked = ranked[:limit + 1]
+
+        next_cursor = None
+        if len(ranked) > limit:
+            ranked = ranked[:limit]
+            next_cursor = encode_cursor(ranked[-1]['relevance'], ranked[-1]['_id'])
+
+        outfits = {
+            doc['_id']: doc
+            for doc in self.db.outfits.find({'_id': {'$in': [hit['_id'] for hit in ranked]}}, self.PAGE_PROJECTION)
+        }
+        items = []
+        for hit in ranked:
+            if hit['_id'] in outfits:
+                outfit_dict = Outfit.from_doc(outfits[hit['_id']]).to_dict()
+                outfit_dict['relevance'] = hit['relevance']
+                items.append(outfit_dict)
+        return attach_author_cards(self.db, items), next_cursor
+
+    def backfill(self, batch_size: int = 500, rebuild: bool = False) -> int:
+        """Index outfits created before search existed.
+
+        With rebuild, every posting is dropped and every outfit reindexed.
+
+        Returns:
+            Number of outfits indexed
+        """
+        if rebuild:
+            self.db.outfit_terms.delete_many({})
+            self.db.outfits.update_many({'search_indexed': True}, {'$unset': {'search_indexed': ''}})
+        indexed = 0
+        while True:
+            batch = list(
+                self.db.outfits.find(
+                    {'search_indexed': {'$ne': True}},
+                    {'name': 1, 'description': 1, 'bio': 1, 'published': 1, 'user_id': 1, 'gender': 1},
+                ).limit(batch_size)
+            )
+            if not batch:
+                return indexed
+            for doc in batch:
+                self.index_outfit(doc)
+            indexed += len(batch)
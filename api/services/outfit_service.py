@@ -4,6 +4,22 @@ from bson import ObjectId
 from flask import current_app
 
 from api.models.outfit import Outfit
+from api.services.author_cards import attach_author_cards
+from api.services.background_jobs import OUTFIT_CASCADE_DELETE, TIMELINE_SYNC, enqueue_job
+from api.services.counter_service import CounterService
+from api.services.garment_service import GarmentService
+from api.services.like_service import current_like_service
+from api.services.outfit_search_service import OutfitSearchService
+from api.services.pagination import paginate
+from api.services.thumbnail_service import ThumbnailService, current_thumbnail_service
+
+
+GARMENT_SLOTS = ("shirt", "pants", "skirt", "accessory")
+
+
+def outfit_projection(include_thumbnail: bool = False) -> Optional[Dict[str, int]]:
+    """Projection for outfit reads; the inline base64 thumbnail is left in Mongo unless requested."""
+    return None if include_thumbnail else {"thumbnail": 0}
 
 
 class OutfitService:
@@ -12,64 +28,138 @@ class OutfitService:
     def __init__(self, db):
         self.db = db
 
-    def list_published(self, limit: int = 100, skip: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+    def _thumbnails(self) -> ThumbnailService:
+        return current_thumbnail_service()
+
+    def _inline_thumbnails(self, outfits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Fill data-URL thumbnails for include=thumbnail clients."""
+        return self._thumbnails().fill_inline_thumbnails(outfits)
+
+    def expand_garments(self, outfits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Set a 'garments' map of slot -> garment dict on serialized outfits, in place.
+
+        Every slot id on the page is resolved with one query; unknown ids map to None.
+        """
+        garments = GarmentService(self.db).get_garments_by_ids(
+            outfit.get(slot) for outfit in outfits for slot in GARMENT_SLOTS
+        )
+        for outfit in outfits:
+            outfit["garments"] = {
+                slot: garments.get(str(outfit[slot])) if outfit.get(slot) else None
+                for slot in GARMENT_SLOTS
+            }
+        return outfits
+
+    def _sync_timelines(self, outfit_doc: Dict[str, Any]) -> None:
+        """Queue fan-out of a published outfit to follower timelines, or removal of an unpublished one."""
+        enqueue_job(TIMELINE_SYNC, {"outfit_id": str(outfit_doc["_id"])})
+
+    def _index_for_search(self, outfit_doc: Dict[str, Any]) -> None:
+        """Rewrite the outfit's search postings (best-effort; backfill() catches misses)."""
+        try:
+            OutfitSearchService(self.db).index_outfit(outfit_doc)
+        except Exception:
+            current_app.logger.exception("Failed to index outfit for search")
+
+    def _invalidate_published_feed(self) -> None:
+        """Drop cached published-feed pages after a published outfit changed (best-effort)."""
+        cache = getattr(current_app, "published_feed_cache", None)
+        if cache is None:
+            return
+        try:
+            cache.invalidate()
+        except Exception:
+            current_app.logger.exception("Failed to invalidate published feed cache")
+
+    def backfill_thumbnail_flags(self) -> int:
+        """Set has_thumbnail on outfits written before the flag existed."""
+        missing = {"has_thumbnail": {"$exists": False}}
+        with_thumbnail = self.db.outfits.update_many(
+            {**missing, "thumbnail": {"$nin": [None, ""]}}, {"$set": {"has_thumbnail": True}}
+        )
+        without_thumbnail = self.db.outfits.update_many(missing, {"$set": {"has_thumbnail": False}})
+        return with_thumbnail.modified_count + without_thumbnail.modified_count
+
+    def list_published(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        include_thumbnail: bool = False,
+        expand_garments: bool = False,
+        viewer_id: Optional[ObjectId] = None,
+    ) -> Tuple[Dict[str, Any], int]:
+        """List published outfits newest first with author cards and liked_by_me.
+
+        Pages walk the (published, created_at, _id) index by keyset cursor, so
+        every page costs the same regardless of depth. Authors are joined
+        with one $in on users._id rather than a $lookup of the string user_id
+        against ObjectId _id, which never matched. The first pages are served
+        from the app's PublishedFeedCache when one is configured.
+        """
+        cache = getattr(current_app, "published_feed_cache", None)
+        if cache is None or include_thumbnail:
+            result, status = self._list_published_page(limit, cursor, include_thumbnail)
+        else:
+            result, status = cache.get_or_compute(limit, cursor, lambda: self._list_published_page(limit, cursor))
+        if status != 200:
+            return result, status
+
+        # Cached pages are shared, so per-request enrichment works on copies.
+        outfits = [dict(o) for o in result["outfits"]]
+        if expand_garments:
+            self.expand_garments(outfits)
+        current_like_service().attach_viewer_engagement(outfits, viewer_id)
+        return {**result, "outfits": outfits}, status
+
+    def _list_published_page(
+        self, limit: int, cursor: Optional[str], include_thumbnail: bool = False
+    ) -> Tuple[Dict[str, Any], int]:
         try:
-            limit = min(abs(limit), 100) if limit > 0 else 100
-            skip = max(0, skip)
-
-            pipeline = [
-                {"$match": {"published": True}},
-                {"$sort": {"created_at": -1}},
-                {"$skip": skip},
-                {"$limit": limit},
-                {
-                    "$lookup": {
-                        "from": "users",
-                        "localField": "user_id",
-                        "foreignField": "_id",
-                        "as": "user_data",
-                    }
-                },
-                {"$addFields": {"user": {"$arrayElemAt": ["$user_data", 0]}}},
-                {
-                    "$project": {
-                        "_id": 1,
-                        "name": 1,
-                        "gender": 1,
-                        "description": {"$ifNull": ["$description", "$bio"]},
-                        "shirt": 1,
-                        "pants": 1,
-                        "skirt": 1,
-                        "accessory": 1,
-                        "thumbnail": 1,
-                        "user_id": 1,
-                        "published": 1,
-                        "created_at": 1,
-                        "user_name": "$user.name",
-                        "user_profile_pic": "$user.profile_picture",
-                    }
-                },
-            ]
-
-            results = list(self.db.outfits.aggregate(pipeline))
+            docs, next_cursor = paginate(
+                self.db.outfits, {"published": True}, limit, cursor,
+                projection=outfit_projection(include_thumbnail),
+            )
 
             outfits: List[Dict[str, Any]] = []
-            for doc in results:
+            for doc in docs:
                 user_id = doc.get("user_id")
-                outfit_dict = Outfit.from_doc(doc).to_dict()
+                outfit_dict = Outfit.from_doc(doc).to_dict(include_thumbnail=include_thumbnail)
                 outfit_dict["userId"] = str(user_id) if user_id else None
                 outfits.append(outfit_dict)
+            attach_author_cards(self.db, outfits)
+            if include_thumbnail:
+                self._inline_thumbnails(outfits)
 
-            return outfits, 200
-        except Exception as e:
+            return {"outfits": outfits, "next_cursor": next_cursor}, 200
+        except Exception:
             current_app.logger.exception("Failed to list published outfits")
             return {"error": "Failed to retrieve published outfits"}, 500
 
-    def list_by_user(self, user_id: Optional[str] = None) -> Tuple[List[Dict[str, Any]], int]:
+    def list_by_user(
+        self,
+        user_id: Optional[str] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        include_thumbnail: bool = False,
+        expand_garments: bool = False,
+        viewer_id: Optional[ObjectId] = None,
+    ) -> Tuple[Dict[str, Any], int]:
         try:
             query = {"user_id": user_id} if user_id else {}
-            outfits = list(self.db.outfits.find(query).sort("created_at", -1))
-            return [Outfit.from_doc(o).to_dict() for o in outfits], 200
+            outfits, next_cursor = paginate(
+                self.db.outfits, query, limit, cursor,
+                projection=outfit_projection(include_thumbnail),
+            )
+            outfit_dicts = [Outfit.from_doc(o).to_dict(include_thumbnail=include_thumbnail) for o in outfits]
+            if include_thumbnail:
+                self._inline_thumbnails(outfit_dicts)
+            if expand_garments:
+                self.expand_garments(outfit_dicts)
+            current_like_service().attach_viewer_engagement(outfit_dicts, viewer_id)
+            return {
+                "outfits": outfit_dicts,
+                "next_cursor": next_cursor,
+            }, 200
         except Exception:
             current_app.logger.exception("Failed to list outfits by user")
             return {"error": "Failed to list outfits"}, 500
@@ -92,27 +182,28 @@ class OutfitService:
                 "skirt": outfit.skirt,
                 "accessory": outfit.accessory,
                 "published": outfit.published,
-                "thumbnail": outfit.thumbnail,
+                "has_thumbnail": False,
                 "created_at": outfit.created_at,
+                "like_count": 0,
+                "comment_count": 0,
             }
 
             result = self.db.outfits.insert_one(outfit_doc)
+            CounterService(self.db).increment_user(user_id, "outfit_count", 1)
             outfit_id = str(result.inserted_id)
 
-            # Generate file-based thumbnail if provided
+            # Move the thumbnail into the content-addressed store if provided
             if payload.get("thumbnail"):
                 try:
-                    uploads_path = current_app.config.get("UPLOAD_PATH", "uploads")
-                    from api.services.thumbnail_service import ThumbnailService
-
-                    thumbnail_service = ThumbnailService(self.db, uploads_path)
-                    thumbnail_service.generate_thumbnail(
-                        outfit_id, payload.get("thumbnail"), outfit.name
-                    )
+                    self._thumbnails().store_thumbnail(outfit_id, payload.get("thumbnail"))
                 except Exception:
-                    current_app.logger.exception("Failed to generate file-based thumbnail")
+                    current_app.logger.exception("Failed to store outfit thumbnail")
 
-            created = self.db.outfits.find_one({"_id": result.inserted_id})
+            created = self.db.outfits.find_one({"_id": result.inserted_id}, outfit_projection())
+            self._index_for_search(created)
+            if created.get("published"):
+                self._sync_timelines(created)
+                self._invalidate_published_feed()
             outfit_dict = Outfit.from_doc(created).to_dict()
 
             return outfit_dict, 201
@@ -120,18 +211,25 @@ class OutfitService:
             current_app.logger.exception("Failed to create outfit")
             return {"error": "Server error creating outfit"}, 500
 
-    def get_outfit(self, outfit_id: str) -> Tuple[Dict[str, Any], int]:
+    def get_outfit(
+        self, outfit_id: str, include_thumbnail: bool = False, expand_garments: bool = False
+    ) -> Tuple[Dict[str, Any], int]:
         oid = None
         try:
             oid = ObjectId(outfit_id)
         except Exception:
             return {"error": "invalid outfit id"}, 400
 
-        outfit = self.db.outfits.find_one({"_id": oid})
+        outfit = self.db.outfits.find_one({"_id": oid}, outfit_projection(include_thumbnail))
         if not outfit:
             return {"error": "outfit not found"}, 404
 
-        return Outfit.from_doc(outfit).to_dict(), 200
+        outfit_dict = Outfit.from_doc(outfit).to_dict(include_thumbnail=include_thumbnail)
+        if include_thumbnail:
+            self._inline_thumbnails([outfit_dict])
+        if expand_garments:
+            self.expand_garments([outfit_dict])
+        return outfit_dict, 200
 
     def update_outfit(self, outfit_id: str, payload: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
         try:
@@ -150,24 +248,31 @@ class OutfitService:
         if not update_fields:
             return {"error": "nothing to update"}, 400
 
-        # Handle thumbnail file update if thumbnail is being updated
-        if "thumbnail" in update_fields and update_fields["thumbnail"]:
-            try:
-                uploads_path = current_app.config.get("UPLOAD_PATH", "uploads")
-                from api.services.thumbnail_service import ThumbnailService
-                
-                thumbnail_service = ThumbnailService(self.db, uploads_path)
-                thumbnail_service.generate_thumbnail(
-                    outfit_id, update_fields["thumbnail"], payload.get("name")
-                )
-            except Exception:
-                current_app.logger.exception("Failed to update file-based thumbnail")
-
-        result = self.db.outfits.update_one({"_id": oid}, {"$set": update_fields})
-        if result.matched_count == 0:
+        thumbnail_update = update_fields.pop("thumbnail", None) if "thumbnail" in update_fields else False
+        if update_fields:
+            result = self.db.outfits.update_one({"_id": oid}, {"$set": update_fields})
+            if result.matched_count == 0:
+                return {"error": "outfit not found"}, 404
+        elif not self.db.outfits.find_one({"_id": oid}, {"_id": 1}):
             return {"error": "outfit not found"}, 404
 
-        updated = self.db.outfits.find_one({"_id": oid})
+        # Thumbnail bytes go to the content-addressed store, never onto the document
+        if thumbnail_update is not False:
+            try:
+                if thumbnail_update:
+                    self._thumbnails().store_thumbnail(outfit_id, thumbnail_update)
+                else:
+                    self._thumbnails().clear_thumbnail(outfit_id)
+            except Exception:
+                current_app.logger.exception("Failed to update outfit thumbnail")
+
+        updated = self.db.outfits.find_one({"_id": oid}, outfit_projection())
+        if update_fields:
+            self._index_for_search(updated)
+        if "published" in update_fields:
+            self._sync_timelines(updated)
+        if updated.get("published") or "published" in update_fields:
+            self._invalidate_published_feed()
         return Outfit.from_doc(updated).to_dict(), 200
 
     def delete_outfit(self, outfit_id: str) -> Tuple[Dict[str, Any], int]:
@@ -176,26 +281,18 @@ class OutfitService:
         except Exception:
             return {"error": "invalid outfit id"}, 400
 
-        result = self.db.outfits.delete_one({"_id": oid})
-        if result.deleted_count == 0:
+        deleted = self.db.outfits.find_one_and_delete(
+            {"_id": oid}, {"user_id": 1, "thumbnail_hash": 1, "published": 1}
+        )
+        if not deleted:
             return {"error": "outfit not found"}, 404
+        if deleted.get("published"):
+            self._invalidate_published_feed()
 
-        # cascade deletes/cleanup
-        try:
-            self.db.likes.delete_many({"outfit_id": oid})
-            self.db.comments.delete_many({"outfit_id": oid})
-            self.db.wardrobes.update_many({}, {"$pull": {"outfit_ids": oid}})
-        except Exception:
-            current_app.logger.exception("Failed to perform cascade cleanup for outfit delete")
-
-        # Delete associated thumbnail (best-effort)
-        try:
-            uploads_path = current_app.config.get("UPLOAD_PATH", "uploads")
-            from api.services.thumbnail_service import ThumbnailService
+        CounterService(self.db).increment_user(deleted.get("user_id"), "outfit_count", -1)
 
-            thumbnail_service = ThumbnailService(self.db, uploads_path)
-            thumbnail_service.delete_thumbnail(outfit_id)
-        except Exception:
-            current_app.logger.exception("Failed to delete thumbnail for outfit")
+        # Likes, comments, wardrobe entries, timelines and the thumbnail are
+        # cleaned up by worker.py, so deleting costs the same at any data volume.
+        enqueue_job(OUTFIT_CASCADE_DELETE, {"outfit_id": outfit_id, "thumbnail_hash": deleted.get("thumbnail_hash")})
 
         return {"status": "deleted"}, 200
@@ -0,0 +1,122 @@
+"""Keyset (cursor) pagination over (sort field, _id)."""
+
+import base64
+import binascii
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId, json_util
+from flask import current_app, jsonify, request
+
+
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a client sends a cursor this server did not issue."""
+
+
+def encode_cursor(sort_value: Any, doc_id: Any) -> str:
+    """Encode the position after a document as an opaque, URL-safe token."""
+    raw = json_util.dumps([sort_value, doc_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, Any]:
+    """Decode a token produced by encode_cursor into (sort_value, _id)."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, doc_id = json_util.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError, binascii.Error):
+        raise InvalidCursorError('invalid cursor')
+
+    if not isinstance(doc_id, (ObjectId, str)):
+        raise InvalidCursorError('invalid cursor')
+    return sort_value, doc_id
+
+
+def cursor_filter(sort_field: str, cursor: str, id_field: str = '_id') -> Dict[str, Any]:
+    """Build the filter selecting documents after the cursor in (sort_field desc, id_field desc) order.
+
+    Documents missing sort_field sort last in descending order, so they are
+    reachable after every non-null position.
+    """
+    sort_value, doc_id = decode_cursor(cursor)
+    if sort_value is None:
+        return {sort_field: None, id_field: {'$lt': doc_id}}
+
+    return {
+        '$or': [
+            {sort_field: {'$lt': sort_value}},
+            {sort_field: sort_value, id_field: {'$lt': doc_id}},
+            {sort_field: None},
+        ]
+    }
+
+
+def paginate(
+    collection,
+    query: Dict[str, Any],
+    limit: int,
+    cursor: Optional[str] = None,
+    sort_field: str = 'created_at',
+    projection: Optional[Dict[str, Any]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Fetch one page of documents newest first.
+
+    Args:
+        collection: PyMongo collection
+        query: Base filter
+        limit: Page size
+        cursor: Token returned as next_cursor by the previous page
+        sort_field: Field sorted descending, with _id as tie-breaker
+        projection: Optional projection; sort_field is always kept
+
+    Returns:
+        Tuple of (documents, next_cursor or None when this is the last page)
+    """
+    if cursor:
+        query = {'$and': [query, cursor_filter(sort_field, cursor)]} if query else cursor_filter(sort_field, cursor)
+
+    if projection and not any(value == 0 for value in projection.values()):
+        projection = {**projection, sort_field: 1}
+
+    docs = list(
+        collection.find(query, projection)
+        .sort([(sort_field, -1), ('_id', -1)])
+        .limit(limit + 1)
+    )
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        next_cursor = encode_cursor(last.get(sort_field), last.get('_id'))
+    return docs, next_cursor
+
+
+def parse_page_args() -> Tuple[int, Optional[str]]:
+    """Read limit/cursor from the query string, clamping limit to PAGINATION_MAX_LIMIT.
+
+    Raises:
+        InvalidCursorError: If the cursor cannot be decoded
+    """
+    default_limit = current_app.config.get('PAGINATION_DEFAULT_LIMIT', 50)
+    max_limit = current_app.config.get('PAGINATION_MAX_LIMIT', 100)
+
+    limit = request.args.get('limit', default_limit, type=int)
+    if limit is None or limit <= 0:
+        limit = default_limit
+    limit = min(limit, max_limit)
+
+    cursor = request.args.get('cursor') or None
+    if cursor:
+        decode_cursor(cursor)
+    return limit, cursor
+
+
+def jsonify_page(items: List[Any], next_cursor: Optional[str]):
+    """Serialize a page returned as a bare JSON array, exposing next_cursor as a header."""
+    response = jsonify(items)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return response
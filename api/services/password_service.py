@@ -0,0 +1,109 @@
+"""Service for hashing and verifying passwords off the request thread."""
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+DEFAULT_HASH_METHOD = 'pbkdf2:sha256:600000'
+
+
+class HashingUnavailableError(Exception):
+    """Raised when the hashing executor is saturated or not responding."""
+
+
+def _hash_password(password: str, method: str) -> str:
+    return generate_password_hash(password, method=method)
+
+
+def _verify_password(password_hash: str, password: str) -> bool:
+    return check_password_hash(password_hash, password)
+
+
+class PasswordHasher:
+    """Run PBKDF2/scrypt work in a bounded process pool.
+
+    At most ``max_workers`` hashes run at once and at most ``max_pending``
+    more may wait for a slot; anything beyond that is rejected with
+    HashingUnavailableError so the caller can answer 503 instead of piling
+    up blocked worker threads. With ``max_workers=0`` hashing runs inline.
+    """
+
+    def __init__(
+        self,
+        method: str = DEFAULT_HASH_METHOD,
+        max_workers: int = 2,
+        max_pending: int = 16,
+        timeout_seconds: float = 10.0,
+    ):
+        """
+        Initialize PasswordHasher.
+
+        Args:
+            method: Werkzeug hash method including work factor, e.g. 'pbkdf2:sha256:600000'
+            max_workers: Number of hashing processes (0 hashes inline)
+            max_pending: Number of hashing calls allowed to wait for a free process
+            timeout_seconds: Maximum time to wait for a single hashing call
+        """
+        self.method = method or DEFAULT_HASH_METHOD
+        self.max_workers = max(0, int(max_workers))
+        self.max_pending = max(0, int(max_pending))
+        self.timeout_seconds = timeout_seconds
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_pending or 1)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_pid: Optional[int] = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Create the pool lazily so each forked gunicorn worker owns its own."""
+        with self._executor_lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def _reset_executor(self) -> None:
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._executor_pid = None
+
+    def _run(self, func, *args):
+        if self.max_workers == 0:
+            return func(*args)
+
+        if not self._slots.acquire(blocking=False):
+            raise HashingUnavailableError('password hashing queue is full')
+
+        try:
+            future = self._get_executor().submit(func, *args)
+            return future.result(timeout=self.timeout_seconds)
+        except FutureTimeoutError:
+            raise HashingUnavailableError('password hashing timed out')
+        except BrokenProcessPool:
+            self._reset_executor()
+            raise HashingUnavailableError('password hashing pool is unavailable')
+        finally:
+            self._slots.release()
+
+    def hash_password(self, password: str) -> str:
+        """Hash a password with the configured method and work factor."""
+        return self._run(_hash_password, password, self.method)
+
+    def verify_password(self, password_hash: Optional[str], password: str) -> bool:
+        """Verify a password against a stored hash."""
+        if not password_hash:
+            return False
+        return self._run(_verify_password, password_hash, password)
+
+    def needs_rehash(self, password_hash: Optional[str]) -> bool:
+        """Return True when a stored hash was made with different parameters."""
+        if not password_hash or '$' not in password_hash:
+            return False
+        return password_hash.split('$', 1)[0] != self.method
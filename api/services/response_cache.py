@@ -0,0 +1,232 @@
+"""Response cache for the first pages of the published feed."""
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+from api.services.cache import TTLCache
+
+
+logger = logging.getLogger(__name__)
+
+class MongoResponseCache:
+    """Response entries shared by every worker through a Mongo collection.
+
+    Entries carry an expires_at that readers check themselves; a TTL index on
+    the same field lets Mongo purge them in the background. Lease documents
+    in the same collection let one worker compute a missing entry while the
+    others wait for it.
+    """
+
+    def __init__(self, collection, ttl_seconds: float = 10.0, lease_seconds: float = 5.0):
+        """
+        Initialize MongoResponseCache.
+
+        Args:
+            collection: Collection holding entries, e.g. db.response_cache
+            ttl_seconds: Lifetime of an entry in seconds
+            lease_seconds: How long a worker may hold the right to compute an entry
+        """
+        self.collection = collection
+        self.ttl_seconds = float(ttl_seconds)
+        self.lease_seconds = float(lease_seconds)
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self.collection.find_one(
+            {'_id': key, 'expires_at': {'$gt': datetime.now(timezone.utc)}}, {'value': 1}
+        )
+        return entry.get('value') if entry else None
+
+    def set(self, key: str, namespace: str, value: Any) -> None:
+        self.collection.replace_one(
+            {'_id': key},
+            {
+                'namespace': namespace,
+                'value': value,
+                'expires_at': datetime.now(timezone.utc) + timedelta(seconds=self.ttl_seconds),
+            },
+            upsert=True,
+        )
+
+    def acquire_lease(self, key: str, namespace: str) -> bool:
+        """Claim the right to compute key; False while another worker holds it."""
+        lease_id = f'lease:{key}'
+        now = datetime.now(timezone.utc)
+        # A crashed holder's lease is taken over once it has expired.
+        self.collection.delete_one({'_id': lease_id, 'expires_at': {'$lte': now}})
+        try:
+            self.collection.insert_one({
+                '_id': lease_id,
+                'namespace': namespace,
+                'expires_at': now + timedelta(seconds=self.lease_seconds),
+            })
+            return True
+        except DuplicateKeyError:
+            return False
+
+    def release_lease(self, key: str) -> None:
+        self.collection.delete_one({'_id': f'lease:{key}'})
+
+    def clear(self, namespace: str) -> None:
+        self.collection.delete_many({'namespace': namespace})
+
+
+class PublishedFeedCache:
+    """Caches serialized pages of /outfits/published for anonymous-identical responses.
+
+    Only the first max_pages pages are cached, keyed by (limit, cursor). The
+    first page is the one with no cursor; a cursor counts as shallow once a
+    cached page has handed it out as next_cursor. Lookups go through a
+    per-process TTLCache first and the optional shared backend second.
+    Concurrent misses for the same key in one process wait for a single
+    computation; with a shared backend a lease extends that across workers.
+
+    invalidate() clears this process and the shared backend. Other workers'
+    in-process entries expire within ttl_seconds, so the TTL should stay short.
+    """
+
+    NAMESPACE = 'published_feed'
+
+    def __init__(
+        self,
+        max_pages: int = 3,
+        ttl_seconds: float = 10.0,
+        max_size: int = 256,
+        shared: Optional[MongoResponseCache] = None,
+    ):
+        """
+        Initialize PublishedFeedCache.
+
+        Args:
+            max_pages: Number of leading pages cached per page size
+            ttl_seconds: Lifetime of an in-process entry in seconds
+            max_size: Maximum number of in-process entries
+            shared: Optional backend shared by all workers
+        """
+        self.max_pages = max(0, int(max_pages))
+        self.local = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self.shared = shared
+        self._lock = threading.Lock()
+        self._inflight: Dict[Tuple[int, Optional[str]], threading.Event] = {}
+        self._depths: Dict[Tuple[int, str], int] = {}
+        self._generation = 0
+        self.wait_seconds = shared.lease_seconds if shared is not None else 5.0
+
+    def _shared_key(self, limit: int, cursor: Optional[str]) -> str:
+        return f'{self.NAMESPACE}:{limit}:{cursor or ""}'
+
+    def _depth(self, limit: int, cursor: Optional[str]) -> Optional[int]:
+        if not cursor:
+            return 0
+        with self._lock:
+            return self._depths.get((limit, cursor))
+
+    def get_or_compute(
+        self, limit: int, cursor: Optional[str], compute: Callable[[], Tuple[Dict[str, Any], int]]
+    ) -> Tuple[Dict[str, Any], int]:
+        """Return the cached page for (limit, cursor), computing it at most once on a miss.
+
+        compute returns (payload, status) like the service methods; only
+        payloads with status 200 are cached.
+        """
+        depth = self._depth(limit, cursor)
+        if depth is None or depth >= self.max_pages:
+            return compute()
+
+        key = (limit, cursor)
+        while True:
+            entry = self.local.get(key)
+            if entry is not None:
+                return entry['payload'], 200
+
+            with self._lock:
+                waiting = self._inflight.get(key)
+                if waiting is None:
+                    done = threading.Event()
+                    self._inflight[key] = done
+                    generation = self._generation
+            if waiting is None:
+                break
+            if not waiting.wait(timeout=self.wait_seconds):
+                return compute()
+
+        shared_key = self._shared_key(limit, cursor)
+        leased = False
+        try:
+            entry, leased = self._load_shared(shared_key)
+            if entry is None:
+                payload, status = compute()
+                if status != 200:
+                    return payload, status
+                entry = {'payload': payload, 'depth': depth}
+                if self.shared is not None and not self._invalidated_since(generation):
+                    try:
+                        self.shared.set(shared_key, self.NAMESPACE, entry)
+                    except Exception:
+                        logger.exception('Failed to write shared feed cache entry %s', shared_key)
+            self._store_local(key, entry, generation)
+            return entry['payload'], 200
+        finally:
+            if leased:
+                try:
+                    self.shared.release_lease(shared_key)
+                except Exception:
+                    # The lease still expires after lease_seconds.
+                    logger.exception('Failed to release feed cache lease %s', shared_key)
+            with self._lock:
+                self._inflight.pop(key, None)
+            done.set()
+
+    def _load_shared(self, shared_key: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """Read the shared entry, waiting briefly while another worker computes it.
+
+        Returns:
+            (entry or None, whether this worker now holds the lease)
+        """
+        if self.shared is None:
+            return None, False
+        try:
+            deadline = time.monotonic() + self.shared.lease_seconds
+            while True:
+                entry = self.shared.get(shared_key)
+                if entry is not None:
+                    return entry, False
+                if self.shared.acquire_lease(shared_key, self.NAMESPACE):
+                    return None, True
+                if time.monotonic() > deadline:
+                    return None, False
+                time.sleep(0.05)
+        except Exception:
+            # A shared backend outage degrades to the in-process cache.
+            return None, False
+
+    def _invalidated_since(self, generation: int) -> bool:
+        with self._lock:
+            return generation != self._generation
+
+    def _store_local(self, key: Tuple[int, Optional[str]], entry: Dict[str, Any], generation: int) -> None:
+        limit, _ = key
+        next_cursor = entry['payload'].get('next_cursor')
+        with self._lock:
+            if generation != self._generation:
+                # Invalidated while computing; the page may already be stale.
+                return
+            if next_cursor and entry['depth'] + 1 < self.max_pages:
+                self._depths[(limit, next_cursor)] = entry['depth'] + 1
+        self.local.set(key, entry)
+
+    def invalidate(self) -> None:
+        """Forget every cached page after a published outfit changed."""
+        with self._lock:
+            self._generation += 1
+            self._depths.clear()
+        self.local.clear()
+        if self.shared is not None:
+            self.shared.clear(self.NAMESPACE)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.local.stats()
@@ -1,148 +1,338 @@
-"""Service for generating and managing outfit thumbnails."""
+"""Service for storing and serving outfit thumbnails."""
 
 import os
 import base64
+import hashlib
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from flask import current_app
+from pymongo import ReturnDocument
+
+from api.services.thumbnail_store import ThumbnailStore
+from api.services.thumbnail_variants import THUMBNAIL_SIZES, VARIANTS_JOB, variant_key
+
+
+def sniff_image_type(data: bytes) -> str:
+    """Guess the mimetype of thumbnail bytes from their magic number."""
+    if data.startswith(b'\x89PNG'):
+        return 'image/png'
+    if data.startswith(b'\xff\xd8'):
+        return 'image/jpeg'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'application/octet-stream'
 
 
 class ThumbnailService:
-    """Service for managing outfit thumbnails."""
+    """Service for managing outfit thumbnails.
 
-    def __init__(self, db, uploads_base_path: str):
+    Thumbnail bytes live in a content-addressed ThumbnailStore under their
+    SHA-256 digest; outfits only carry thumbnail_hash. Identical images are
+    stored once, and the thumbnail_blobs collection reference-counts each
+    digest so a blob is removed when no outfit uses it anymore. Resized
+    small/medium/large variants are rendered per digest by a background
+    job queued after the original is stored.
+    """
+
+    def __init__(
+        self,
+        db,
+        store: ThumbnailStore,
+        uploads_base_path: Optional[str] = None,
+        jobs=None,
+    ):
         """
         Initialize ThumbnailService.
-        
+
         Args:
             db: MongoDB database instance
-            uploads_base_path: Base path for uploads directory
+            store: Content-addressed blob store holding thumbnail bytes
+            uploads_base_path: Base path of the uploads directory, used to read
+                thumbnails written by the previous file-per-outfit layout
+            jobs: JobQueue that variant rendering is queued on; None skips variants
         """
         self.db = db
-        self.uploads_base_path = uploads_base_path
-        self.thumbnails_dir = os.path.join(uploads_base_path, 'thumbnails')
-        self._ensure_directory(self.thumbnails_dir)
+        self.store = store
+        self.legacy_dir = os.path.join(uploads_base_path, 'thumbnails') if uploads_base_path else None
+        self.jobs = jobs
 
     @staticmethod
-    def _ensure_directory(directory_path: str) -> None:
-        """Create directory if it doesn't exist."""
-        os.makedirs(directory_path, exist_ok=True)
+    def decode_thumbnail(thumbnail_data: str) -> bytes:
+        """Decode a base64 thumbnail, with or without a data URL prefix."""
+        if isinstance(thumbnail_data, str) and thumbnail_data.startswith('data:'):
+            thumbnail_data = thumbnail_data.split(',', 1)[1]
+        return base64.b64decode(thumbnail_data)
 
-    def generate_thumbnail(
-        self,
-        outfit_id: str,
-        thumbnail_data: str,
-        outfit_name: str
-    ) -> str:
+    def store_thumbnail(self, outfit_id: str, thumbnail_data: str) -> str:
         """
-        Save outfit thumbnail received from frontend and store in database.
-        
+        Store a thumbnail received from the frontend and attach it to an outfit.
+
         Args:
             outfit_id: ID of the outfit
-            thumbnail_data: Base64 encoded thumbnail image from frontend PNG/data URL
-            outfit_name: Name of the outfit for file naming
-            
+            thumbnail_data: Base64 encoded thumbnail image, optionally as a data URL
+
         Returns:
-            Thumbnail URL path for the outfit
+            SHA-256 digest of the stored thumbnail
         """
+        data = self.decode_thumbnail(thumbnail_data)
+        digest = self._retain(data)
+
+        previous = self.db.outfits.find_one_and_update(
+            {'_id': ObjectId(outfit_id)},
+            {
+                '$set': {'thumbnail_hash': digest, 'has_thumbnail': True},
+                '$unset': {'thumbnail': ''},
+            },
+            projection={'thumbnail_hash': 1},
+        )
+        if previous is None:
+            self.release(digest)
+        else:
+            if previous.get('thumbnail_hash'):
+                self.release(previous['thumbnail_hash'])
+            self._schedule_variants(digest)
+        return digest
+
+    def _schedule_variants(self, digest: str) -> None:
+        if self.jobs is None:
+            return
         try:
-            # Extract base64 data if it comes with data URI prefix
-            if isinstance(thumbnail_data, str) and thumbnail_data.startswith('data:'):
-                # Extract the base64 part after the comma
-                thumbnail_data = thumbnail_data.split(',')[1]
-            
-            # Generate filename
-            thumbnail_filename = f"{outfit_id}_thumbnail.png"
-            thumbnail_path = os.path.join(self.thumbnails_dir, thumbnail_filename)
-            
-            # Decode and save thumbnail file
-            thumbnail_bytes = base64.b64decode(thumbnail_data)
-            with open(thumbnail_path, 'wb') as f:
-                f.write(thumbnail_bytes)
-            
-            # Save thumbnail reference in database
-            self.db.outfit_thumbnails.update_one(
-                {'outfit_id': outfit_id},
-                {
-                    '$set': {
-                        'outfit_id': outfit_id,
-                        'filename': thumbnail_filename,
-                        'outfit_name': outfit_name,
-                        'updated_at': datetime.now(timezone.utc),
-                    },
-                    '$setOnInsert': {
-                        'created_at': datetime.now(timezone.utc),
-                    }
+            self.jobs.enqueue(VARIANTS_JOB, {'digest': digest}, dedupe_key=f'{VARIANTS_JOB}:{digest}')
+        except Exception:
+            # Variants are an optimisation; the original is always servable.
+            current_app.logger.exception('Failed to queue thumbnail variants for %s', digest)
+
+    def clear_thumbnail(self, outfit_id: str) -> None:
+        """Detach the thumbnail from an outfit."""
+        previous = self.db.outfits.find_one_and_update(
+            {'_id': ObjectId(outfit_id)},
+            {'$set': {'has_thumbnail': False}, '$unset': {'thumbnail_hash': '', 'thumbnail': ''}},
+            projection={'thumbnail_hash': 1},
+        )
+        if previous and previous.get('thumbnail_hash'):
+            self.release(previous['thumbnail_hash'])
+
+    def _retain(self, data: bytes) -> str:
+        """Add a reference to a blob, writing its bytes when this call created it.
+
+        The reference is taken first, so only the request whose upsert
+        created the blob document writes to the store; concurrent uploads of
+        the same bytes just count. A failed write drops the reference again.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        result = self.db.thumbnail_blobs.update_one(
+            {'_id': digest},
+            {
+                '$inc': {'ref_count': 1},
+                '$setOnInsert': {
+                    'size': len(data),
+                    'content_type': sniff_image_type(data),
+                    'created_at': datetime.now(timezone.utc),
                 },
-                upsert=True
-            )
-            
-            # Return the URL path to access the thumbnail
-            return f"/api/outfits/{outfit_id}/thumbnail"
-            
-        except Exception as e:
-            raise Exception(f"Failed to generate thumbnail: {str(e)}")
-
-    def get_thumbnail(self, outfit_id: str) -> Optional[bytes]:
+            },
+            upsert=True,
+        )
+        if result.upserted_id is not None:
+            try:
+                self.store.put(digest, data)
+            except Exception:
+                self.release(digest)
+                raise
+        return digest
+
+    def release(self, digest: str) -> None:
+        """Drop one reference to a blob, deleting it once unreferenced.
+
+        The bytes are deleted only after a conditional delete_one still saw
+        ref_count <= 0. A _retain between that delete and the store delete
+        recreates the row but finds the bytes still stored and skips its
+        put, so the row is re-checked afterwards: when the digest is
+        referenced again the original is put back and its variants are
+        queued for rendering again.
+        """
+        blob = self.db.thumbnail_blobs.find_one_and_update(
+            {'_id': digest},
+            {'$inc': {'ref_count': -1}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if blob is None or blob.get('ref_count', 0) > 0:
+            return
+        if not self.db.thumbnail_blobs.delete_one({'_id': digest, 'ref_count': {'$lte': 0}}).deleted_count:
+            return
+
+        data = self.store.get(digest)
+        self.store.delete(digest)
+        for name in blob.get('variants') or []:
+            size, fmt = name.split('.')
+            self.store.delete(variant_key(digest, size, fmt))
+
+        if data is not None and self.db.thumbnail_blobs.find_one_and_update(
+            {'_id': digest}, {'$unset': {'variants': ''}}, projection={'_id': 1}
+        ):
+            self.store.put(digest, data)
+            self._schedule_variants(digest)
+
+    def get_thumbnail(
+        self, outfit_id: str, size: Optional[str] = None, prefer_webp: bool = False
+    ) -> Optional[Tuple[bytes, str, str, Optional[str]]]:
         """
         Retrieve thumbnail image bytes for an outfit.
-        
+
+        Outfits not yet moved by migrate_inline_thumbnails fall back to the
+        inline base64 data or the legacy per-outfit file. A requested size is
+        served once its variants exist; until then the original is returned
+        and rendering is queued.
+
         Args:
             outfit_id: ID of the outfit
-            
+            size: One of THUMBNAIL_SIZES, or None for the original
+            prefer_webp: Serve the WebP variant instead of JPEG
+
         Returns:
-            Image bytes or None if not found
+            Tuple of (image bytes, mimetype, SHA-256 digest of the original,
+            served variant name such as 'small.webp' or None) or None if not found
         """
-        try:
-            # Find thumbnail reference in database
-            thumb_doc = self.db.outfit_thumbnails.find_one({'outfit_id': outfit_id})
-            if not thumb_doc:
-                return None
-            
-            filename = thumb_doc.get('filename')
-            thumbnail_path = os.path.join(self.thumbnails_dir, filename)
-            
-            # Read and return thumbnail file
-            if os.path.exists(thumbnail_path):
-                with open(thumbnail_path, 'rb') as f:
-                    return f.read()
-            
+        if not ObjectId.is_valid(outfit_id):
             return None
-            
-        except Exception as e:
-            print(f"Error retrieving thumbnail: {str(e)}")
+
+        outfit = self.db.outfits.find_one({'_id': ObjectId(outfit_id)}, {'thumbnail_hash': 1, 'thumbnail': 1})
+        if not outfit:
             return None
 
-    def delete_thumbnail(self, outfit_id: str) -> bool:
+        if size in THUMBNAIL_SIZES and outfit.get('thumbnail_hash'):
+            variant = self._get_variant(outfit['thumbnail_hash'], size, 'webp' if prefer_webp else 'jpeg')
+            if variant is not None:
+                return variant
+
+        data = None
+        if outfit.get('thumbnail_hash'):
+            data = self.store.get(outfit['thumbnail_hash'])
+        elif outfit.get('thumbnail'):
+            data = self.decode_thumbnail(outfit['thumbnail'])
+        else:
+            data = self._read_legacy_file(outfit_id)
+
+        if data is None:
+            return None
+        return data, sniff_image_type(data), outfit.get('thumbnail_hash') or hashlib.sha256(data).hexdigest(), None
+
+    def _get_variant(self, digest: str, size: str, fmt: str) -> Optional[Tuple[bytes, str, str, Optional[str]]]:
+        name = f'{size}.{fmt}'
+        blob = self.db.thumbnail_blobs.find_one({'_id': digest}, {'variants': 1})
+        if blob is None:
+            return None
+        if name not in (blob.get('variants') or []):
+            # Originals stored before variants existed are rendered on first request.
+            self._schedule_variants(digest)
+            return None
+        data = self.store.get(variant_key(digest, size, fmt))
+        if data is None:
+            return None
+        return data, sniff_image_type(data), digest, name
+
+    def fill_inline_thumbnails(self, outfits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Set 'thumbnail' to a data URL on serialized outfits whose bytes live in the store.
+
+        Only used for clients that opt into inline thumbnails with include=thumbnail.
+        """
+        missing = [ObjectId(o['id']) for o in outfits if not o.get('thumbnail') and o.get('thumbnail_url')]
+        if not missing:
+            return outfits
+
+        hashes = {
+            str(doc['_id']): doc.get('thumbnail_hash')
+            for doc in self.db.outfits.find({'_id': {'$in': missing}}, {'thumbnail_hash': 1})
+        }
+        for outfit in outfits:
+            digest = hashes.get(outfit.get('id'))
+            data = self.store.get(digest) if digest else None
+            if data is not None:
+                outfit['thumbnail'] = f"data:{sniff_image_type(data)};base64,{base64.b64encode(data).decode('ascii')}"
+        return outfits
+
+    def delete_thumbnail(self, outfit_id: str, thumbnail_hash: Optional[str] = None) -> bool:
         """
-        Delete thumbnail for an outfit.
-        
+        Release the thumbnail of a deleted outfit.
+
         Args:
             outfit_id: ID of the outfit
-            
+            thumbnail_hash: Digest the outfit referenced, if any
+
         Returns:
-            True if deleted, False otherwise
+            True if anything was released, False otherwise
         """
+        released = False
+        if thumbnail_hash:
+            self.release(thumbnail_hash)
+            released = True
+
+        legacy_doc = self.db.outfit_thumbnails.find_one_and_delete({'outfit_id': outfit_id})
+        if legacy_doc and self.legacy_dir:
+            try:
+                os.remove(os.path.join(self.legacy_dir, legacy_doc.get('filename')))
+            except (OSError, TypeError):
+                pass
+            released = True
+        return released
+
+    def migrate_inline_thumbnails(self, batch_size: int = 200) -> int:
+        """Move inline and legacy file thumbnails into the store, batch by batch.
+
+        Returns:
+            Number of outfits migrated
+        """
+        migrated = 0
+        last_id = None
+        while True:
+            query: Dict[str, Any] = {'thumbnail': {'$nin': [None, '']}}
+            if last_id is not None:
+                query['_id'] = {'$gt': last_id}
+            batch = list(self.db.outfits.find(query, {'thumbnail': 1}).sort('_id', 1).limit(batch_size))
+            if not batch:
+                break
+            for doc in batch:
+                self.store_thumbnail(str(doc['_id']), doc['thumbnail'])
+                self.delete_thumbnail(str(doc['_id']))
+                migrated += 1
+            last_id = batch[-1]['_id']
+
+        for legacy_doc in list(self.db.outfit_thumbnails.find({}, {'outfit_id': 1})):
+            outfit_id = legacy_doc.get('outfit_id')
+            data = self._read_legacy_file(outfit_id)
+            if data is not None and ObjectId.is_valid(outfit_id) and self.db.outfits.find_one(
+                {'_id': ObjectId(outfit_id), 'thumbnail_hash': {'$exists': False}}, {'_id': 1}
+            ):
+                self.store_thumbnail(outfit_id, base64.b64encode(data).decode('ascii'))
+                migrated += 1
+            self.delete_thumbnail(outfit_id)
+        return migrated
+
+    def _read_legacy_file(self, outfit_id: str) -> Optional[bytes]:
+        if not self.legacy_dir:
+            return None
+        legacy_doc = self.db.outfit_thumbnails.find_one({'outfit_id': outfit_id})
+        if not legacy_doc or not legacy_doc.get('filename'):
+            return None
         try:
-            thumb_doc = self.db.outfit_thumbnails.find_one({'outfit_id': outfit_id})
-            if not thumb_doc:
-                return False
-            
-            filename = thumb_doc.get('filename')
-            thumbnail_path = os.path.join(self.thumbnails_dir, filename)
-            
-            # Delete file
-            if os.path.exists(thumbnail_path):
-                os.remove(thumbnail_path)
-            
-            # Delete database reference
-            self.db.outfit_thumbnails.delete_one({'outfit_id': outfit_id})
-            
-            return True
-            
-        except Exception as e:
-            print(f"Error deleting thumbnail: {str(e)}")
-            return False
+            with open(os.path.join(self.legacy_dir, legacy_doc['filename']), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
 
     def thumbnail_exists(self, outfit_id: str) -> bool:
         """Check if thumbnail exists for an outfit."""
-        return self.db.outfit_thumbnails.count_documents({'outfit_id': outfit_id}) > 0
+        if not ObjectId.is_valid(outfit_id):
+            return False
+        return self.db.outfits.count_documents({'_id': ObjectId(outfit_id), 'has_thumbnail': True}) > 0
+
+
+def current_thumbnail_service() -> ThumbnailService:
+    """ThumbnailService bound to the app's database and configured thumbnail store."""
+    return ThumbnailService(
+        current_app.db,
+        current_app.thumbnail_store,
+        current_app.config.get('UPLOAD_PATH', 'uploads'),
+        jobs=getattr(current_app, 'job_queue', None),
+    )
@@ -0,0 +1,157 @@
+"""Content-addressed blob stores for outfit thumbnails."""
+
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from typing import Optional
+
+import requests
+from requests.auth import HTTPBasicAuth
+
+
+class ThumbnailStore(ABC):
+    """Stores immutable thumbnail bytes under their SHA-256 hex digest.
+
+    Because a digest always names the same bytes, writes are idempotent and
+    any node can serve any thumbnail once a shared backend is configured.
+    """
+
+    @abstractmethod
+    def put(self, digest: str, data: bytes) -> None:
+        """Store data under digest; a no-op when it is already stored."""
+
+    @abstractmethod
+    def get(self, digest: str) -> Optional[bytes]:
+        """Return the bytes stored under digest, or None."""
+
+    @abstractmethod
+    def delete(self, digest: str) -> None:
+        """Remove digest; a no-op when it is not stored."""
+
+
+class LocalThumbnailStore(ThumbnailStore):
+    """Thumbnails on the local filesystem; only suitable for a single host or a shared volume."""
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def put(self, digest: str, data: bytes) -> None:
+        path = self._path(digest)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def get(self, digest: str) -> Optional[bytes]:
+        try:
+            with open(self._path(digest), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def delete(self, digest: str) -> None:
+        try:
+            os.remove(self._path(digest))
+        except OSError:
+            pass
+
+
+class GridFSThumbnailStore(ThumbnailStore):
+    """Thumbnails in a GridFS bucket of the application database."""
+
+    def __init__(self, db, bucket_name: str = 'thumbnails'):
+        self.db = db
+        self.bucket_name = bucket_name
+        self._bucket = None
+
+    @property
+    def bucket(self):
+        # Created on first use so app start-up does not depend on GridFS.
+        if self._bucket is None:
+            import gridfs
+
+            self._bucket = gridfs.GridFSBucket(self.db, bucket_name=self.bucket_name)
+        return self._bucket
+
+    def put(self, digest: str, data: bytes) -> None:
+        if self.db[f'{self.bucket_name}.files'].find_one({'filename': digest}, {'_id': 1}):
+            return
+        self.bucket.upload_from_stream(digest, data)
+
+    def get(self, digest: str) -> Optional[bytes]:
+        import gridfs
+
+        try:
+            return self.bucket.open_download_stream_by_name(digest).read()
+        except gridfs.errors.NoFile:
+            return None
+
+    def delete(self, digest: str) -> None:
+        for grid_file in self.db[f'{self.bucket_name}.files'].find({'filename': digest}, {'_id': 1}):
+            self.bucket.delete(grid_file['_id'])
+
+
+class NextCloudThumbnailStore(ThumbnailStore):
+    """Thumbnails in a NextCloud (WebDAV) folder, shared by every node."""
+
+    def __init__(self, base_url: str, user: str, password: str, folder: str = 'thumbnails', timeout: int = 30):
+        self.base_url = base_url if base_url.endswith('/') else f'{base_url}/'
+        self.folder = folder.strip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.auth = HTTPBasicAuth(user, password)
+        self._folder_ready = False
+
+    def _url(self, digest: str) -> str:
+        return f'{self.base_url}{self.folder}/{digest}'
+
+    def _ensure_folder(self) -> None:
+        if self._folder_ready:
+            return
+        response = self.session.request('MKCOL', f'{self.base_url}{self.folder}/', timeout=self.timeout)
+        if response.status_code not in (201, 405):
+            raise IOError(f'Failed to create cloud folder {self.folder}: {response.status_code}')
+        self._folder_ready = True
+
+    def put(self, digest: str, data: bytes) -> None:
+        self._ensure_folder()
+        response = self.session.put(self._url(digest), data=data, timeout=self.timeout)
+        if response.status_code not in (201, 204):
+            raise IOError(f'NextCloud error storing thumbnail: {response.status_code}')
+
+    def get(self, digest: str) -> Optional[bytes]:
+        response = self.session.get(self._url(digest), timeout=self.timeout)
+        if response.status_code != 200:
+            return None
+        return response.content
+
+    def delete(self, digest: str) -> None:
+        self.session.delete(self._url(digest), timeout=self.timeout)
+
+
+def create_thumbnail_store(config, db) -> ThumbnailStore:
+    """Build the backend selected by THUMBNAIL_STORE_BACKEND (local, gridfs or nextcloud)."""
+    backend = (config.get('THUMBNAIL_STORE_BACKEND') or 'gridfs').lower()
+    if backend == 'local':
+        return LocalThumbnailStore(config.get('THUMBNAIL_STORE_DIR') or os.path.join('uploads', 'thumbnail_store'))
+    if backend == 'nextcloud':
+        return NextCloudThumbnailStore(
+            config.get('NEXTCLOUD_URL'),
+            config.get('NEXTCLOUD_USER'),
+            config.get('NEXTCLOUD_PASS'),
+        )
+    if backend == 'gridfs':
+        return GridFSThumbnailStore(db)
+    raise ValueError(f'Unknown THUMBNAIL_STORE_BACKEND: {backend}')
@@ -0,0 +1,81 @@
+"""Small/medium/large thumbnail variants rendered off the request thread."""
+
+from typing import Dict
+
+from api.services.image_variants import VariantSpec, render_variant
+
+
+VARIANTS_JOB = 'thumbnail.variants'
+
+# Longest edge in pixels of each named variant.
+THUMBNAIL_SIZES = {
+    'small': 160,
+    'medium': 480,
+    'large': 960,
+}
+VARIANT_FORMATS = ('webp', 'jpeg')
+
+
+def variant_key(digest: str, size: str, fmt: str) -> str:
+    """Store key of a variant; derived from the original's digest, so it is immutable too."""
+    return f'{digest}.{size}.{fmt}'
+
+
+def render_thumbnail_variants(data: bytes, quality: int = 82) -> Dict[str, bytes]:
+    """Render every size in every format, keyed by '<size>.<fmt>'."""
+    rendered = {}
+    for size, edge in THUMBNAIL_SIZES.items():
+        for fmt in VARIANT_FORMATS:
+            spec = VariantSpec(edge, edge, 'contain', fmt, negotiated=False)
+            rendered[f'{size}.{fmt}'] = render_variant(data, spec, quality=quality)
+    return rendered
+
+
+class ThumbnailVariantRenderer:
+    """Render and store the variants of stored originals.
+
+    Rendering runs in worker.py as VARIANTS_JOB jobs, never on the request
+    thread; ThumbnailService queues one job per new digest.
+    """
+
+    def __init__(self, db, store, quality: int = 82):
+        """
+        Initialize ThumbnailVariantRenderer.
+
+        Args:
+            db: MongoDB database instance
+            store: ThumbnailStore holding originals and variants
+            quality: WebP/JPEG encoder quality
+        """
+        self.db = db
+        self.store = store
+        self.quality = quality
+
+    def generate(self, digest: str) -> bool:
+        """Render and store the variants of one original unless they already exist.
+
+        Returns:
+            True if variants were written
+        """
+        blob = self.db.thumbnail_blobs.find_one({'_id': digest}, {'variants': 1})
+        if blob is None or blob.get('variants'):
+            return False
+        data = self.store.get(digest)
+        if data is None:
+            return False
+
+        rendered = render_thumbnail_variants(data, quality=self.quality)
+        for name, variant in rendered.items():
+            size, fmt = name.split('.')
+            self.store.put(variant_key(digest, size, fmt), variant)
+
+        result = self.db.thumbnail_blobs.update_one(
+            {'_id': digest}, {'$set': {'variants': sorted(rendered)}}
+        )
+        if not result.matched_count:
+            # The last reference was released while rendering.
+            for name in rendered:
+                size, fmt = name.split('.')
+                self.store.delete(variant_key(digest, size, fmt))
+            return False
+        return True
@@ -0,0 +1,211 @@
+"""Materialized "people I follow" timelines."""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from api.models.outfit import Outfit
+from api.services.author_cards import attach_author_cards
+from api.services.like_service import current_like_service
+from api.services.pagination import cursor_filter, encode_cursor
+
+
+class TimelineService:
+    """Fan published outfits out to follower timelines and read them back.
+
+    Publishing writes one small entry per follower into the timelines
+    collection, so reading a timeline is one indexed range scan. Authors with
+    more than fanout_max_followers followers are skipped at write time.
+    Their outfits are merged in at read time from the outfits
+    (user_id, created_at) index instead. Timelines keep at most max_entries
+    entries; every write trims the timelines it touched, so followers who
+    never open the feed stay capped too.
+    """
+
+    FANOUT_BATCH_SIZE = 1000
+    FOLLOW_BACKFILL_LIMIT = 20
+
+    def __init__(self, db, fanout_max_followers: int = 10000, max_entries: int = 500):
+        """
+        Initialize TimelineService.
+
+        Args:
+            db: MongoDB database instance
+            fanout_max_followers: Follower count above which an author is merged at read time
+            max_entries: Number of entries kept per timeline
+        """
+        self.db = db
+        self.fanout_max_followers = fanout_max_followers
+        self.max_entries = max_entries
+
+    def is_fanout_author(self, author_id: str) -> bool:
+        """True when author_id's outfits are pushed to follower timelines."""
+        if not ObjectId.is_valid(str(author_id)):
+            return False
+        author = self.db.users.find_one({'_id': ObjectId(author_id)}, {'follower_count': 1})
+        if author is None:
+            return False
+        return (author.get('follower_count') or 0) <= self.fanout_max_followers
+
+    def fan_out(self, outfit_doc: Dict[str, Any]) -> int:
+        """Insert a published outfit into the timeline of every follower of its author.
+
+        Returns:
+            Number of follower timelines written
+        """
+        author_id = outfit_doc.get('user_id')
+        if not outfit_doc.get('published') or not self.is_fanout_author(author_id):
+            return 0
+
+        written = 0
+        owners: List[str] = []
+        followers = self.db.follows.find({'followed_id': author_id}, {'follower_id': 1, '_id': 0})
+        for follow in followers:
+            owners.append(follow.get('follower_id'))
+            if len(owners) >= self.FANOUT_BATCH_SIZE:
+                written += self._write_entries(owners, outfit_doc)
+                owners = []
+        if owners:
+            written += self._write_entries(owners, outfit_doc)
+        return written
+
+    def _write_entries(self, owner_ids: List[str], outfit_doc: Dict[str, Any]) -> int:
+        """Upsert one outfit into a batch of timelines and cap each of them."""
+        written = self._write([self._entry_upsert(owner_id, outfit_doc) for owner_id in owner_ids])
+        for owner_id in owner_ids:
+            self._trim(owner_id)
+        return written
+
+    def retract(self, outfit_id: ObjectId) -> None:
+        """Remove an unpublished or deleted outfit from every timeline."""
+        self.db.timelines.delete_many({'outfit_id': outfit_id})
+
+    def on_follow(self, follower_id: str, author_id: str) -> None:
+        """Seed a new follower's timeline with the author's most recent published outfits."""
+        if not self.is_fanout_author(author_id):
+            return
+        recent = self.db.outfits.find(
+            {'user_id': author_id, 'published': True},
+            {'user_id': 1, 'created_at': 1, 'published': 1},
+        ).sort([('created_at', -1), ('_id', -1)]).limit(self.FOLLOW_BACKFILL_LIMIT)
+        self._write([self._entry_upsert(follower_id, doc) for doc in recent])
+        self._trim(follower_id)
+
+    def on_unfollow(self, follower_id: str, author_id: str) -> None:
+        """Drop an unfollowed author's outfits from the follower's timeline."""
+        self.db.timelines.delete_many({'owner_id': follower_id, 'author_id': author_id})
+
+    def read(
+        self, owner_id: str, limit: int, cursor: Optional[str] = None, include_thumbnail: bool = False
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Return one page of hydrated outfits, newest first.
+
+        Returns:
+            Tuple of (outfit dicts with an author card and liked_by_me, next_cursor or None)
+        """
+        entry_query: Dict[str, Any] = {'owner_id': owner_id}
+        if cursor:
+            entry_query = {'$and': [entry_query, cursor_filter('created_at', cursor, id_field='outfit_id')]}
+        candidates = [
+            (entry.get('created_at'), entry['outfit_id'])
+            for entry in self.db.timelines.find(entry_query, {'created_at': 1, 'outfit_id': 1})
+            .sort([('created_at', -1), ('outfit_id', -1)])
+            .limit(limit + 1)
+        ]
+
+        merged_authors = self._merged_authors(owner_id)
+        if merged_authors:
+            outfit_query: Dict[str, Any] = {'user_id': {'$in': merged_authors}, 'published': True}
+            if cursor:
+                outfit_query = {'$and': [outfit_query, cursor_filter('created_at', cursor)]}
+            candidates.extend(
+                (doc.get('created_at'), doc['_id'])
+                for doc in self.db.outfits.find(outfit_query, {'created_at': 1})
+                .sort([('created_at', -1), ('_id', -1)])
+                .limit(limit + 1)
+            )
+            # An author can cross the fan-out threshold after entries were written.
+            candidates = list({outfit_id: (created_at, outfit_id) for created_at, outfit_id in candidates}.values())
+            candidates.sort(key=lambda item: (item[0] is not None, item[0], item[1]), reverse=True)
+
+        next_cursor = None
+        if len(candidates) > limit:
+            candidates = candidates[:limit]
+            next_cursor = encode_cursor(*candidates[-1])
+
+        outfits = self._hydrate([outfit_id for _, outfit_id in candidates], include_thumbnail)
+        current_like_service().attach_viewer_engagement(outfits, ObjectId(owner_id))
+        return outfits, next_cursor
+
+    def _merged_authors(self, owner_id: str) -> List[str]:
+        """Followed authors too large for fan-out, read at request time."""
+        large_authors = [
+            str(user['_id'])
+            for user in self.db.users.find(
+                {'follower_count': {'$gt': self.fanout_max_followers}}, {'_id': 1}
+            )
+        ]
+        if not large_authors:
+            return []
+        return [
+            follow.get('followed_id')
+            for follow in self.db.follows.find(
+                {'follower_id': owner_id, 'followed_id': {'$in': large_authors}},
+                {'followed_id': 1, '_id': 0},
+            )
+        ]
+
+    def _hydrate(self, outfit_ids: List[ObjectId], include_thumbnail: bool = False) -> List[Dict[str, Any]]:
+        """Load outfits and author cards with one $in query each, keeping order."""
+        if not outfit_ids:
+            return []
+
+        outfits = {
+            doc['_id']: doc
+            for doc in self.db.outfits.find(
+                {'_id': {'$in': outfit_ids}, 'published': True},
+                None if include_thumbnail else {'thumbnail': 0},
+            )
+        }
+        items = [
+            Outfit.from_doc(outfits[oid]).to_dict(include_thumbnail=include_thumbnail)
+            for oid in outfit_ids if oid in outfits
+        ]
+        return attach_author_cards(self.db, items)
+
+    def _trim(self, owner_id: str) -> None:
+        """Delete entries beyond max_entries from one timeline; a no-op below the cap."""
+        boundary = list(
+            self.db.timelines.find({'owner_id': owner_id}, {'created_at': 1, 'outfit_id': 1})
+            .sort([('created_at', -1), ('outfit_id', -1)])
+            .skip(self.max_entries)
+            .limit(1)
+        )
+        if not boundary:
+            return
+        first_dropped = boundary[0]
+        self.db.timelines.delete_many({
+            'owner_id': owner_id,
+            '$or': [
+                {'created_at': {'$lt': first_dropped.get('created_at')}},
+                {'created_at': first_dropped.get('created_at'), 'outfit_id': {'$lte': first_dropped['outfit_id']}},
+            ],
+        })
+
+    @staticmethod
+    def _entry_upsert(owner_id: str, outfit_doc: Dict[str, Any]) -> UpdateOne:
+        return UpdateOne(
+            {'owner_id': owner_id, 'outfit_id': outfit_doc['_id']},
+            {'$setOnInsert': {
+                'author_id': outfit_doc.get('user_id'),
+                'created_at': outfit_doc.get('created_at'),
+            }},
+            upsert=True,
+        )
+
+    def _write(self, operations: List[UpdateOne]) -> int:
+        if not operations:
+            return 0
+        self.db.timelines.bulk_write(operations, ordered=False)
+        return len(operations)
@@ -0,0 +1,175 @@
+"""Trending outfits ranked by time-decayed engagement."""
+
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from api.models.outfit import Outfit
+from api.services.author_cards import attach_author_cards
+from api.services.pagination import cursor_filter, encode_cursor
+
+
+class TrendingService:
+    """Keep per-outfit engagement tallies and materialize a trending ranking.
+
+    Likes and comments increment a counter in the engagement_buckets
+    document for their outfit and hour, so writes never touch the likes or
+    comments collections again. refresh() folds the buckets inside the
+    window into one score per outfit, with each bucket decayed by its age:
+
+        score = sum((likes + comment_weight * comments) * 0.5 ** (age / half_life))
+
+    Scores go into the trending collection, which is paged through its
+    (score, _id) index.
+    """
+
+    BUCKET_SECONDS = 3600
+    WRITE_BATCH_SIZE = 1000
+
+    def __init__(
+        self,
+        db,
+        half_life_hours: float = 24.0,
+        window_hours: float = 168.0,
+        comment_weight: float = 2.0,
+    ):
+        """
+        Initialize TrendingService.
+
+        Args:
+            db: MongoDB database instance
+            half_life_hours: Age at which a bucket counts half as much
+            window_hours: Buckets older than this are ignored and purged
+            comment_weight: How many likes one comment is worth
+        """
+        self.db = db
+        self.half_life_seconds = half_life_hours * 3600
+        self.window = timedelta(hours=window_hours)
+        self.comment_weight = comment_weight
+
+    @classmethod
+    def bucket_start(cls, when: datetime) -> datetime:
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        epoch = int(when.timestamp())
+        return datetime.fromtimestamp(epoch - epoch % cls.BUCKET_SECONDS, tz=timezone.utc)
+
+    def record(self, outfit_id: ObjectId, field: str, delta: int, when: Optional[datetime] = None) -> None:
+        """Add delta to the 'likes' or 'comments' tally of the bucket containing when.
+
+        Removals pass the created_at of the like or comment they cancel, so
+        the decrement decays exactly like the increment did. Tallies older
+        than the window are no longer scored and are skipped.
+        """
+        now = datetime.now(timezone.utc)
+        when = when or now
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        if when < now - self.window:
+            return
+        bucket = self.bucket_start(when)
+        self.db.engagement_buckets.update_one(
+            {'outfit_id': outfit_id, 'bucket': bucket},
+            {'$inc': {field: delta}},
+            upsert=True,
+        )
+
+    def refresh(self, now: Optional[datetime] = None) -> int:
+        """Recompute every trending score from the buckets inside the window.
+
+        Returns:
+            Number of outfits ranked
+        """
+        now = now or datetime.now(timezone.utc)
+        cutoff = now - self.window
+        self.db.engagement_buckets.delete_many({'bucket': {'$lt': cutoff}})
+
+        scores: Dict[ObjectId, float] = {}
+        buckets = self.db.engagement_buckets.find(
+            {'bucket': {'$gte': cutoff}}, {'outfit_id': 1, 'bucket': 1, 'likes': 1, 'comments': 1}
+        )
+        for bucket in buckets:
+            weight = (bucket.get('likes') or 0) + self.comment_weight * (bucket.get('comments') or 0)
+            if not weight:
+                continue
+            started = bucket['bucket']
+            if started.tzinfo is None:
+                started = started.replace(tzinfo=timezone.utc)
+            age = max((now - started).total_seconds(), 0)
+            scores[bucket['outfit_id']] = scores.get(bucket['outfit_id'], 0.0) + weight * math.pow(
+                0.5, age / self.half_life_seconds
+            )
+
+        # Tallies recorded while the ranking was stale can still net to zero.
+        published = self._published([outfit_id for outfit_id, score in scores.items() if score > 0])
+        # $max keeps the newest generation on rows an overlapping refresh also
+        # wrote, and only older generations are deleted, so two refreshes
+        # never delete each other's rows.
+        generation = ObjectId()
+        batch: List[UpdateOne] = []
+        for outfit_id in published:
+            batch.append(UpdateOne(
+                {'_id': outfit_id},
+                {
+                    '$set': {'score': round(scores[outfit_id], 6), 'computed_at': now},
+                    '$max': {'generation': generation},
+                },
+                upsert=True,
+            ))
+            if len(batch) >= self.WRITE_BATCH_SIZE:
+                self.db.trending.bulk_write(batch, ordered=False)
+                batch = []
+        if batch:
+            self.db.trending.bulk_write(batch, ordered=False)
+        self.db.trending.delete_many({'generation': {'$lt': generation}})
+        return len(published)
+
+    def _published(self, outfit_ids: List[ObjectId]) -> List[ObjectId]:
+        published = []
+        for start in range(0, len(outfit_ids), self.WRITE_BATCH_SIZE):
+            chunk = outfit_ids[start:start + self.WRITE_BATCH_SIZE]
+            published.extend(
+                doc['_id'] for doc in self.db.outfits.find({'_id': {'$in': chunk}, 'published': True}, {'_id': 1})
+            )
+        return published
+
+    def read(self, limit: int, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Return one page of trending outfits, highest score first.
+
+        Returns:
+            Tuple of (outfit dicts with an author card and trending_score, next_cursor or None)
+        """
+        query = cursor_filter('score', cursor) if cursor else {}
+        ranked = list(self.db.trending.find(query, {'score': 1}).sort([('score', -1), ('_id', -1)]).limit(limit + 1))
+
+        next_cursor = None
+        if len(ranked) > limit:
+            ranked = ranked[:limit]
+            next_cursor = encode_cursor(ranked[-1].get('score'), ranked[-1]['_id'])
+
+        outfits = {
+            doc['_id']: doc
+            for doc in self.db.outfits.find(
+                {'_id': {'$in': [entry['_id'] for entry in ranked]}, 'published': True}, {'thumbnail': 0}
+            )
+        }
+        items = []
+        for entry in ranked:
+            if entry['_id'] in outfits:
+                outfit_dict = Outfit.from_doc(outfits[entry['_id']]).to_dict()
+                outfit_dict['trending_score'] = entry.get('score')
+                items.append(outfit_dict)
+        return attach_author_cards(self.db, items), next_cursor
+
+
+def trending_service(app) -> TrendingService:
+    """TrendingService configured from app.config."""
+    return TrendingService(
+        app.db,
+        half_life_hours=app.config.get('TRENDING_HALF_LIFE_HOURS', 24),
+        window_hours=app.config.get('TRENDING_WINDOW_HOURS', 168),
+        comment_weight=app.config.get('TRENDING_COMMENT_WEIGHT', 2),
+    )
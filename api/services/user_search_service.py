@@ -0,0 +1,136 @@
+"""Service for prefix-based user name search."""
+
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo import UpdateOne
+
+from api.models.user import User
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """Lowercase, strip accents and collapse whitespace so prefixes compare cheaply."""
+    if not name:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', str(name))
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return ' '.join(stripped.casefold().split())
+
+
+def name_search_fields(name: Optional[str]) -> Dict[str, Any]:
+    """Return the denormalized search fields stored alongside a user's name."""
+    normalized = normalize_name(name)
+    tokens = [token for token in re.split(r'[\s._\-]+', normalized) if token]
+    return {
+        'name_normalized': normalized,
+        'name_tokens': sorted(set(tokens)),
+    }
+
+
+class UserSearchService:
+    """Ranked autocomplete over users.name_normalized and users.name_tokens.
+
+    Both fields are indexed and only queried with anchored prefix regexes, so
+    each keystroke costs at most two bounded index range scans. Results are
+    ranked full-name prefix matches first, sorted by name (exact match first,
+    as it sorts shortest), then matches on the start of any later word. Word
+    matches are read in (name_tokens, name_normalized) index order, i.e. by
+    matched word and then name, because sorting them by name alone would need
+    an in-memory sort of every token match.
+    """
+
+    MAX_LIMIT = 50
+    PROJECTION = {'password_hash': 0, 'name_tokens': 0}
+
+    def __init__(self, db, cache=None):
+        """
+        Initialize UserSearchService.
+
+        Args:
+            db: MongoDB database instance
+            cache: Optional TTLCache for hot prefixes
+        """
+        self.db = db
+        self.cache = cache
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Return serialized users whose name starts with, or has a word starting with, query."""
+        normalized = normalize_name(query)
+        if not normalized:
+            return []
+
+        limit = max(1, min(int(limit), self.MAX_LIMIT))
+        cache_key = (normalized, limit)
+        if self.cache is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        prefix = {'$regex': f'^{re.escape(normalized)}'}
+        docs = list(
+            self.db.users.find({'name_normalized': prefix}, self.PROJECTION)
+            .sort('name_normalized', 1)
+            .limit(limit)
+        )
+
+        if len(docs) < limit:
+            seen = [doc['_id'] for doc in docs]
+            docs.extend(
+                self.db.users.find(
+                    {'name_tokens': prefix, '_id': {'$nin': seen}},
+                    self.PROJECTION,
+                )
+                .hint([('name_tokens', 1), ('name_normalized', 1)])
+                .limit(limit - len(docs))
+            )
+
+        results = [User.from_doc(doc).to_dict() for doc in docs]
+        if self.cache is not None:
+            self.cache.set(cache_key, results)
+        return results
+
+    def invalidate(self, names: Iterable[Optional[str]]) -> None:
+        """Forget the cached prefixes whose results a name was added to or removed from.
+
+        Args:
+            names: Names that appeared or disappeared (both old and new name on a rename)
+        """
+        if self.cache is None:
+            return
+        searchable = set()
+        for name in names:
+            fields = name_search_fields(name)
+            if fields['name_normalized']:
+                searchable.add(fields['name_normalized'])
+                searchable.update(fields['name_tokens'])
+        if searchable:
+            self.cache.invalidate_matching(
+                lambda key: any(value.startswith(key[0]) for value in searchable)
+            )
+
+    def backfill(self, batch_size: int = 500) -> int:
+        """Populate search fields for users created before they existed.
+
+        Returns:
+            Number of users updated
+        """
+        updated = 0
+        while True:
+            batch = list(
+                self.db.users.find(
+                    {'name_normalized': {'$exists': False}},
+                    {'_id': 1, 'name': 1},
+                ).limit(batch_size)
+            )
+            if not batch:
+                return updated
+
+            self.db.users.bulk_write(
+                [
+                    UpdateOne({'_id': doc['_id']}, {'$set': name_search_fields(doc.get('name'))})
+                    for doc in batch
+                ],
+                ordered=False,
+            )
+            updated += len(batch)
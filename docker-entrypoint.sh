@@ -0,0 +1,38 @@
+#!/bin/sh
+# Container entry point.
+#
+# PROCESS_TYPE selects what the container runs:
+#   all    (default) gunicorn plus one job worker, restarted if it exits
+#   web    gunicorn only; run the workers as a separate service
+#   worker python worker.py only
+#
+# Outfit delete cascades, timeline fan-out, thumbnail variants and the
+# trending refresh only happen when a worker drains the jobs collection,
+# so every deployment needs at least one "all" or "worker" container.
+set -e
+
+web() {
+    exec gunicorn --bind 0.0.0.0:8000 --workers "${WEB_CONCURRENCY:-4}" --threads 4 wsgi:app
+}
+
+case "${PROCESS_TYPE:-all}" in
+    web)
+        web
+        ;;
+    worker)
+        exec python worker.py
+        ;;
+    all)
+        (
+            while true; do
+                python worker.py || echo "Job worker exited with status $?; restarting in 5s" >&2
+                sleep 5
+            done
+        ) &
+        web
+        ;;
+    *)
+        echo "Unknown PROCESS_TYPE: ${PROCESS_TYPE}" >&2
+        exit 64
+        ;;
+esac
@@ -0,0 +1,149 @@
+"""Maintenance commands run against the configured database.
+
+Usage:
+    python maintenance.py reconcile-counters [--batch-size N]
+    python maintenance.py migrate-follows [--batch-size N]
+    python maintenance.py migrate-thumbnails [--batch-size N]
+    python maintenance.py refresh-trending
+    python maintenance.py retry-failed-jobs
+    python maintenance.py rebuild-garment-facets
+    python maintenance.py index-outfit-search [--batch-size N] [--rebuild]
+    python maintenance.py backfill-user-search [--batch-size N]
+    python maintenance.py backfill-thumbnail-flags
+"""
+
+import argparse
+
+from pymongo import ASCENDING, MongoClient
+
+from api.config import Config
+from api.services.counter_service import CounterService
+from api.services.follow_service import FollowService
+from api.services.garment_facets import GarmentFacetService
+from api.services.job_queue import JobQueue
+from api.services.outfit_search_service import OutfitSearchService
+from api.services.outfit_service import OutfitService
+from api.services.thumbnail_service import ThumbnailService
+from api.services.thumbnail_store import create_thumbnail_store
+from api.services.trending_service import TrendingService
+from api.services.user_search_service import UserSearchService
+
+
+def _connect():
+    client = MongoClient(
+        Config.MONGO_URI,
+        connectTimeoutMS=5000,
+        serverSelectionTimeoutMS=5000,
+        retryWrites=False,
+        tlsAllowInvalidCertificates=True,
+        tlsAllowInvalidHostnames=True,
+    )
+    return client[Config.MONGO_DB_NAME]
+
+
+def reconcile_counters(db, args):
+    """Recount follower/following/outfit/like/comment counters and repair drift."""
+    result = CounterService(db).reconcile(batch_size=args.batch_size)
+    print(f"✓ Repaired counters on {result['users']} users and {result['outfits']} outfits")
+
+
+def migrate_follows(db, args):
+    """Rewrite legacy follow documents from following_id to followed_id."""
+    migrated = FollowService(db).migrate_legacy_following_ids(batch_size=args.batch_size)
+    print(f"✓ Migrated {migrated} legacy follow documents")
+
+
+def migrate_thumbnails(db, args):
+    """Move inline base64 and per-node file thumbnails into the configured thumbnail store."""
+    config = {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+    service = ThumbnailService(db, create_thumbnail_store(config, db), config.get('UPLOAD_PATH', 'uploads'))
+    migrated = service.migrate_inline_thumbnails(batch_size=args.batch_size)
+    print(f"✓ Migrated {migrated} outfit thumbnails")
+
+
+def refresh_trending(db, args):
+    """Recompute the trending collection from the engagement buckets now."""
+    ranked = TrendingService(
+        db,
+        half_life_hours=Config.TRENDING_HALF_LIFE_HOURS,
+        window_hours=Config.TRENDING_WINDOW_HOURS,
+        comment_weight=Config.TRENDING_COMMENT_WEIGHT,
+    ).refresh()
+    print(f"✓ Ranked {ranked} trending outfits")
+
+
+def retry_failed_jobs(db, args):
+    """Requeue background jobs that ran out of attempts."""
+    queue = JobQueue(db)
+    requeued = queue.retry_failed()
+    print(f"✓ Requeued {requeued} failed jobs; queue now {queue.stats()}")
+
+
+def rebuild_garment_facets(db, args):
+    """Recount the garment catalog facet table from the garments collection."""
+    rows = GarmentFacetService(db).rebuild()
+    print(f"✓ Rebuilt {rows} garment facet rows")
+
+
+def index_outfit_search(db, args):
+    """Write search postings for outfits that have none yet; --rebuild reindexes every outfit."""
+    indexed = OutfitSearchService(db).backfill(batch_size=args.batch_size, rebuild=args.rebuild)
+    db.outfit_terms.create_index([('outfit_id', ASCENDING), ('term', ASCENDING)], unique=True)
+    print(f"✓ Indexed {indexed} outfits for search")
+
+
+def backfill_user_search(db, args):
+    """Write the name search fields of users created before they existed."""
+    backfilled = UserSearchService(db).backfill(batch_size=args.batch_size)
+    print(f"✓ Backfilled search fields for {backfilled} users")
+
+
+def backfill_thumbnail_flags(db, args):
+    """Set has_thumbnail on outfits written before the flag existed."""
+    flagged = OutfitService(db).backfill_thumbnail_flags()
+    print(f"✓ Backfilled has_thumbnail on {flagged} outfits")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    reconcile = commands.add_parser('reconcile-counters', help=reconcile_counters.__doc__)
+    reconcile.add_argument('--batch-size', type=int, default=Config.COUNTER_RECONCILE_BATCH_SIZE)
+    reconcile.set_defaults(handler=reconcile_counters)
+
+    follows = commands.add_parser('migrate-follows', help=migrate_follows.__doc__)
+    follows.add_argument('--batch-size', type=int, default=500)
+    follows.set_defaults(handler=migrate_follows)
+
+    thumbnails = commands.add_parser('migrate-thumbnails', help=migrate_thumbnails.__doc__)
+    thumbnails.add_argument('--batch-size', type=int, default=200)
+    thumbnails.set_defaults(handler=migrate_thumbnails)
+
+    trending = commands.add_parser('refresh-trending', help=refresh_trending.__doc__)
+    trending.set_defaults(handler=refresh_trending)
+
+    jobs = commands.add_parser('retry-failed-jobs', help=retry_failed_jobs.__doc__)
+    jobs.set_defaults(handler=retry_failed_jobs)
+
+    facets = commands.add_parser('rebuild-garment-facets', help=rebuild_garment_facets.__doc__)
+    facets.set_defaults(handler=rebuild_garment_facets)
+
+    search = commands.add_parser('index-outfit-search', help=index_outfit_search.__doc__)
+    search.add_argument('--batch-size', type=int, default=500)
+    search.add_argument('--rebuild', action='store_true', help='Drop and rewrite every posting')
+    search.set_defaults(handler=index_outfit_search)
+
+    users = commands.add_parser('backfill-user-search', help=backfill_user_search.__doc__)
+    users.add_argument('--batch-size', type=int, default=500)
+    users.set_defaults(handler=backfill_user_search)
+
+    flags = commands.add_parser('backfill-thumbnail-flags', help=backfill_thumbnail_flags.__doc__)
+    flags.set_defaults(handler=backfill_thumbnail_flags)
+
+    args = parser.parse_args(argv)
+    args.handler(_connect(), args)
+
+
+if __name__ == '__main__':
+    main()
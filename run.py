@@ -1,3 +1,4 @@
+import atexit
 import os
 from flask import Flask
 from flask_cors import CORS
@@ -5,31 +6,179 @@ from pymongo import ASCENDING, DESCENDING, MongoClient
 
 from api.config import Config
 from api.routes import register_blueprints
+from api.routes.auth import IDENTITY_COLLATION
 from api.middleware.error_handler import handle_errors
 
 # Initialize file service and cloud service
 from api.services.file_service import FileService
 from api.services.cloud_service import CloudService
+from api.services.cache import TTLCache
+from api.services.follow_graph import FollowGraphIndex
+from api.services.garment_facets import GarmentFacetService
+from api.services.image_cache import DiskImageCache, ImageProxy
+from api.services.job_queue import JobQueue
+from api.services.like_buffer import LikeBuffer
+from api.services.password_service import PasswordHasher
+from api.services.response_cache import MongoResponseCache, PublishedFeedCache
+from api.services.thumbnail_store import create_thumbnail_store
+from api.services.thumbnail_variants import ThumbnailVariantRenderer
 
 
 def ensure_indexes(db):
     """Create required MongoDB indexes."""
-    db.users.create_index([('email', ASCENDING)], unique=True)
+    # Case-insensitive identity indexes back the single $or lookup in auth.login
+    # and are the only duplicate check register does, so startup fails without them.
+    for field in ('name', 'email'):
+        try:
+            db.users.create_index(
+                [(field, ASCENDING)],
+                unique=True,
+                collation=IDENTITY_COLLATION,
+                name=f'{field}_ci_unique',
+            )
+        except Exception as e:
+            raise RuntimeError(
+                f"Failed to create case-insensitive unique {field} index ({e}); "
+                f"merge users whose {field} differs only by case and restart"
+            ) from e
+    # email_ci_unique covers the old case-sensitive email index.
+    try:
+        db.users.drop_index('email_1')
+    except Exception:
+        pass
+    db.users.create_index([('name_normalized', ASCENDING)])
+    db.users.create_index([('name_tokens', ASCENDING), ('name_normalized', ASCENDING)])
+    # The compound index above covers the old single-field name_tokens index.
+    try:
+        db.users.drop_index('name_tokens_1')
+    except Exception:
+        pass
+    db.refresh_tokens.create_index([('token_hash', ASCENDING)], unique=True)
+    db.refresh_tokens.create_index([('expires_at', ASCENDING)], expireAfterSeconds=0)
     db.follows.create_index([('follower_id', ASCENDING), ('followed_id', ASCENDING)], unique=True)
-    db.follows.create_index([('followed_id', ASCENDING), ('created_at', DESCENDING)])
-    db.follows.create_index([('follower_id', ASCENDING), ('created_at', DESCENDING)])
-    db.outfits.create_index([('user_id', ASCENDING), ('created_at', DESCENDING)])
+    # Compound (…, created_at, _id) indexes back the keyset pagination in api.services.pagination.
+    db.users.create_index([('created_at', DESCENDING), ('_id', DESCENDING)])
+    db.follows.create_index([('followed_id', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)])
+    db.follows.create_index([('follower_id', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)])
+    db.outfits.create_index([('user_id', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)])
+    # The three indexes above cover the old (…, created_at) indexes they replaced.
+    for collection, index_name in (
+        (db.follows, 'followed_id_1_created_at_-1'),
+        (db.follows, 'follower_id_1_created_at_-1'),
+        (db.outfits, 'user_id_1_created_at_-1'),
+    ):
+        try:
+            collection.drop_index(index_name)
+        except Exception:
+            pass
+    db.outfits.create_index([('created_at', DESCENDING), ('_id', DESCENDING)])
+    db.outfits.create_index([('published', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)])
+    db.garments.create_index([('created_at', DESCENDING), ('_id', DESCENDING)])
+    db.garments.create_index([('user_id', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)])
+    db.garments.create_index([('type', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)])
+    db.garments.create_index([('type', ASCENDING), ('gender', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)])
+    # Catalog filter combinations; equality fields lead so any subset stays an index scan.
+    db.garments.create_index([('gender', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)])
+    db.garments.create_index([('style', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)])
+    db.garments.create_index([('type', ASCENDING), ('style', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)])
+    db.garments.create_index([
+        ('type', ASCENDING), ('gender', ASCENDING), ('style', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)
+    ])
+    db.garments.create_index([('is_custom', ASCENDING), ('type', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)])
+    # Global facet rows have user_id None; creator-scoped catalogs read their own rows.
+    db.garment_facets.create_index([('user_id', ASCENDING)])
+    db.files.create_index([('uploaded_at', DESCENDING), ('_id', DESCENDING)])
+    db.files.create_index([('user_id', ASCENDING), ('uploaded_at', DESCENDING), ('_id', DESCENDING)])
+    db.files.create_index([('category', ASCENDING), ('uploaded_at', DESCENDING), ('_id', DESCENDING)])
     db.wardrobes.create_index([('user_id', ASCENDING)], unique=True)
     db.wardrobes.create_index([('outfit_ids', ASCENDING)])
+    db.users.create_index([('follower_count', DESCENDING)])
+    db.timelines.create_index([('owner_id', ASCENDING), ('outfit_id', ASCENDING)], unique=True)
+    db.timelines.create_index([('owner_id', ASCENDING), ('created_at', DESCENDING), ('outfit_id', DESCENDING)])
+    db.timelines.create_index([('outfit_id', ASCENDING)])
+    db.timelines.create_index([('owner_id', ASCENDING), ('author_id', ASCENDING)])
     db.likes.create_index([('outfit_id', ASCENDING), ('user_id', ASCENDING)], unique=True)
     db.comments.create_index([('outfit_id', ASCENDING), ('created_at', DESCENDING)])
     db.comments.create_index([('user_id', ASCENDING), ('created_at', DESCENDING)])
+    db.engagement_buckets.create_index([('outfit_id', ASCENDING), ('bucket', ASCENDING)], unique=True)
+    db.engagement_buckets.create_index([('bucket', ASCENDING)])
+    db.trending.create_index([('score', DESCENDING), ('_id', DESCENDING)])
+    db.trending.create_index([('generation', ASCENDING)])
+    db.jobs.create_index([('status', ASCENDING), ('run_at', ASCENDING), ('_id', ASCENDING)])
+    db.jobs.create_index([('status', ASCENDING), ('locked_until', ASCENDING)])
+    db.jobs.create_index([('dedupe_key', ASCENDING), ('status', ASCENDING)])
+    db.outfit_terms.create_index([('term', ASCENDING), ('weight', DESCENDING)])
+    try:
+        db.outfit_terms.create_index([('outfit_id', ASCENDING), ('term', ASCENDING)], unique=True)
+    except Exception as e:
+        print(
+            f"⚠ Warning: Failed to create unique outfit_terms index ({e}); "
+            "run `python maintenance.py index-outfit-search --rebuild`"
+        )
+    db.outfits.create_index([('search_indexed', ASCENDING)])
+    db.response_cache.create_index([('expires_at', ASCENDING)], expireAfterSeconds=0)
+    db.response_cache.create_index([('namespace', ASCENDING)])
 
     # Legacy garments.id index caused duplicate key errors when id was missing or null.
     try:
         db.garments.drop_index('id_1')
     except Exception:
         pass
+    # Non-unique and partial, so garments without a string id are neither indexed nor rejected.
+    db.garments.create_index(
+        [('id', ASCENDING)],
+        name='garment_ref_id',
+        partialFilterExpression={'id': {'$type': 'string'}},
+    )
+
+
+def _connect_db(app):
+    """Attach the configured MongoDB database to app.db."""
+    mongo_uri = app.config.get('MONGO_URI')
+    if not mongo_uri:
+        raise RuntimeError('MONGO_URI is not set. Define it in environment variables.')
+
+    client_options = {
+        'connectTimeoutMS': 5000,
+        'serverSelectionTimeoutMS': 5000,
+        'retryWrites': False,
+        'tlsAllowInvalidCertificates': True,
+        'tlsAllowInvalidHostnames': True,
+    }
+    
+    client = MongoClient(mongo_uri, **client_options)
+    app.db = client[app.config.get('MONGO_DB_NAME', 'database')]
+
+
+def _attach_job_services(app):
+    """Attach the thumbnail store, variant renderer and job queue the job handlers use."""
+    app.thumbnail_store = create_thumbnail_store(app.config, app.db)
+    app.thumbnail_variants = ThumbnailVariantRenderer(
+        app.db,
+        app.thumbnail_store,
+        quality=app.config.get('IMAGE_VARIANT_QUALITY', 82),
+    )
+    app.job_queue = JobQueue(
+        app.db,
+        max_attempts=app.config.get('JOB_MAX_ATTEMPTS', 5),
+        base_backoff_seconds=app.config.get('JOB_BASE_BACKOFF_SECONDS', 5),
+        max_backoff_seconds=app.config.get('JOB_MAX_BACKOFF_SECONDS', 600),
+        lease_seconds=app.config.get('JOB_LEASE_SECONDS', 300),
+    )
+
+
+def create_worker_app():
+    """Create the application used by worker.py.
+
+    Only the database and the services job handlers need are attached.
+    Index builds, startup backfills, blueprints and the background
+    threads stay with the web app in create_app.
+    """
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    _connect_db(app)
+    _attach_job_services(app)
+    return app
 
 
 def create_app():
@@ -47,28 +196,60 @@ def create_app():
             "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
             "allow_headers": ["Content-Type", "Authorization"],
             "supports_credentials": True,
-            "expose_headers": ["Content-Type", "Authorization"]
+            "expose_headers": ["Content-Type", "Authorization", "X-Next-Cursor"]
         }},
         supports_credentials=True,
     )
 
     # MongoDB connection
-    mongo_uri = app.config.get('MONGO_URI')
-    if not mongo_uri:
-        raise RuntimeError('MONGO_URI is not set. Define it in environment variables.')
-
-    client_options = {
-        'connectTimeoutMS': 5000,
-        'serverSelectionTimeoutMS': 5000,
-        'retryWrites': False,
-        'tlsAllowInvalidCertificates': True,
-        'tlsAllowInvalidHostnames': True,
-    }
-    
-    client = MongoClient(mongo_uri, **client_options)
-    app.db = client[app.config.get('MONGO_DB_NAME', 'database')]
+    _connect_db(app)
     ensure_indexes(app.db)
 
+    app.user_cache = TTLCache(
+        max_size=app.config.get('USER_CACHE_MAX_SIZE', 10000),
+        ttl_seconds=app.config.get('USER_CACHE_TTL_SECONDS', 60),
+    )
+    app.user_search_cache = TTLCache(
+        max_size=app.config.get('USER_SEARCH_CACHE_MAX_SIZE', 2048),
+        ttl_seconds=app.config.get('USER_SEARCH_CACHE_TTL_SECONDS', 30),
+    )
+    app.image_proxy = ImageProxy(
+        DiskImageCache(
+            app.config.get('IMAGE_CACHE_DIR'),
+            max_bytes=app.config.get('IMAGE_CACHE_MAX_BYTES'),
+        ),
+        revalidate_seconds=app.config.get('IMAGE_CACHE_REVALIDATE_SECONDS', 3600),
+    )
+    feed_cache_ttl = app.config.get('PUBLISHED_FEED_CACHE_TTL_SECONDS', 10)
+    app.published_feed_cache = PublishedFeedCache(
+        max_pages=app.config.get('PUBLISHED_FEED_CACHE_PAGES', 3),
+        ttl_seconds=feed_cache_ttl,
+        max_size=app.config.get('PUBLISHED_FEED_CACHE_MAX_SIZE', 256),
+        shared=MongoResponseCache(app.db.response_cache, ttl_seconds=feed_cache_ttl)
+        if app.config.get('PUBLISHED_FEED_CACHE_SHARED') else None,
+    )
+    _attach_job_services(app)
+    app.follow_graph = FollowGraphIndex(
+        app.db,
+        refresh_seconds=app.config.get('FOLLOW_GRAPH_REFRESH_SECONDS', 600),
+    ).start()
+    app.password_hasher = PasswordHasher(
+        method=app.config.get('PASSWORD_HASH_METHOD'),
+        max_workers=app.config.get('PASSWORD_HASH_WORKERS', 2),
+        max_pending=app.config.get('PASSWORD_HASH_MAX_PENDING', 16),
+        timeout_seconds=app.config.get('PASSWORD_HASH_TIMEOUT_SECONDS', 10),
+    )
+
+    app.like_buffer = None
+    if app.config.get('LIKE_WRITE_BEHIND'):
+        app.like_buffer = LikeBuffer(
+            app.db,
+            max_pending=app.config.get('LIKE_BUFFER_MAX_PENDING', 10000),
+            flush_size=app.config.get('LIKE_BUFFER_FLUSH_SIZE', 500),
+            flush_interval_seconds=app.config.get('LIKE_BUFFER_FLUSH_INTERVAL_SECONDS', 1),
+        ).start()
+        atexit.register(app.like_buffer.stop)
+
     # Register error handlers
     handle_errors(app)
 
@@ -81,6 +262,13 @@ def create_app():
             print("CloudService initialized and attached to app as app.cloud_service")
         except Exception as e:
             print(f"⚠ Warning: Failed to initialize CloudService: {e}")
+        try:
+            if app.db.garment_facets.estimated_document_count() == 0:
+                rows = GarmentFacetService(app.db).rebuild()
+                if rows:
+                    print(f"Built {rows} garment facet rows")
+        except Exception as e:
+            print(f"⚠ Warning: Failed to build garment facet counts: {e}")
         try:
             file_service = FileService(app.db, app.config)
             uploads_path = os.path.join(app.root_path, '..', 'uploads')
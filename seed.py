@@ -4,6 +4,7 @@ from datetime import datetime, timezone
 from pymongo import MongoClient, ASCENDING
 
 from api.config import Config
+from api.services.garment_facets import GarmentFacetService
 
 
 def _seed_default_garments(db):
@@ -248,6 +249,9 @@ def _seed_default_garments(db):
             upsert=True,
         )
 
+    # The upserts above bypass GarmentService, so recount the catalog facets.
+    GarmentFacetService(db).rebuild()
+
     print(
         f"Default garments seed complete: {len(all_garments)} items seeded to garment_default."
     )
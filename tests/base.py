@@ -0,0 +1,42 @@
+import os
+import unittest
+from unittest.mock import patch
+
+import mongomock
+import run as app_run
+
+
+class AppTestCase(unittest.TestCase):
+    """Runs create_app() once per test class against mongomock.
+
+    MongoClient, the default file download and CloudService are patched for
+    the lifetime of the class; the app is available as cls.app.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        os.environ.setdefault("FLASK_DEBUG", "False")
+        os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+        os.environ.setdefault("MONGO_DB_NAME", "test_database")
+        os.environ.setdefault("JWT_SECRET", "test-jwt-secret")
+
+        cls.mongo_patcher = patch.object(app_run, "MongoClient", mongomock.MongoClient)
+        cls.download_patcher = patch.object(
+            app_run.FileService,
+            "download_default_files",
+            lambda self, uploads_path: None,
+        )
+        cls.cloud_patcher = patch.object(app_run, "CloudService", lambda db, config: object())
+
+        cls.mongo_patcher.start()
+        cls.download_patcher.start()
+        cls.cloud_patcher.start()
+
+        cls.app = app_run.create_app()
+        cls.app.config["TESTING"] = True
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.cloud_patcher.stop()
+        cls.download_patcher.stop()
+        cls.mongo_patcher.stop()
@@ -1,43 +1,18 @@
-import os
 import unittest
 from unittest.mock import patch
 
-import mongomock
+from pymongo.errors import OperationFailure
 import run as app_run
+from api.services.password_service import HashingUnavailableError, PasswordHasher
+from tests.base import AppTestCase
 
 
-class TestAuth(unittest.TestCase):
-    @classmethod
-    def setUpClass(cls):
-        os.environ.setdefault("FLASK_DEBUG", "False")
-        os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
-        os.environ.setdefault("MONGO_DB_NAME", "test_database")
-        os.environ.setdefault("JWT_SECRET", "test-jwt-secret")
-
-        cls.mongo_patcher = patch.object(app_run, "MongoClient", mongomock.MongoClient)
-        cls.download_patcher = patch.object(
-            app_run.FileService,
-            "download_default_files",
-            lambda self, uploads_path: None,
-        )
-        cls.cloud_patcher = patch.object(app_run, "CloudService", lambda db, config: object())
-
-        cls.mongo_patcher.start()
-        cls.download_patcher.start()
-        cls.cloud_patcher.start()
-
-        cls.app = app_run.create_app()
-        cls.app.config["TESTING"] = True
-
-    @classmethod
-    def tearDownClass(cls):
-        cls.cloud_patcher.stop()
-        cls.download_patcher.stop()
-        cls.mongo_patcher.stop()
-
+class TestAuth(AppTestCase):
     def setUp(self):
         self.client = self.app.test_client()
         self.app.db.users.delete_many({})
+        self.app.db.refresh_tokens.delete_many({})
+        self.app.user_cache.clear()
 
     def register_user(self, name="tester", email="tester@example.com", password="Test1234"):
         return self.client.post(
@@ -79,6 +54,121 @@ class TestAuth(unittest.TestCase):
         me_body = me_response.get_json()
         self.assertEqual(me_body["email"], "tester@example.com")
 
+    def test_register_rejects_duplicate_identity(self):
+        self.assertEqual(self.register_user().status_code, 201)
+
+        duplicate_email = self.register_user(name="other", email="tester@example.com")
+        self.assertEqual(duplicate_email.status_code, 409)
+
+        duplicate_name = self.register_user(name="tester", email="other@example.com")
+        self.assertEqual(duplicate_name.status_code, 409)
+        self.assertEqual(self.app.db.users.count_documents({}), 1)
+
+    def test_startup_fails_without_case_insensitive_identity_indexes(self):
+        self.assertNotIn("email_1", self.app.db.users.index_information())
+        real_create_index = self.app.db.users.create_index
+
+        def create_index(keys, **kwargs):
+            if kwargs.get("name") == "email_ci_unique":
+                raise OperationFailure("E11000 duplicate key error")
+            return real_create_index(keys, **kwargs)
+
+        with patch.object(self.app.db.users, "create_index", side_effect=create_index):
+            with self.assertRaisesRegex(RuntimeError, "email"):
+                app_run.ensure_indexes(self.app.db)
+
+    def test_login_by_name(self):
+        self.register_user()
+        login_response = self.client.post(
+            "/api/auth/login",
+            json={"user_info": "tester", "password": "Test1234"},
+        )
+        self.assertEqual(login_response.status_code, 200)
+        self.assertEqual(login_response.get_json()["user"]["name"], "tester")
+
+    def test_login_rehashes_password_with_new_work_factor(self):
+        original_hasher = self.app.password_hasher
+        self.app.password_hasher = PasswordHasher(method="pbkdf2:sha256:1000", max_workers=0)
+        try:
+            self.register_user()
+            stored = self.app.db.users.find_one({"email": "tester@example.com"})
+            self.assertTrue(stored["password_hash"].startswith("pbkdf2:sha256:1000$"))
+
+            self.app.password_hasher = PasswordHasher(method="pbkdf2:sha256:2000", max_workers=0)
+            login_response = self.client.post(
+                "/api/auth/login",
+                json={"user_info": "tester", "password": "Test1234"},
+            )
+            self.assertEqual(login_response.status_code, 200)
+
+            rehashed = self.app.db.users.find_one({"email": "tester@example.com"})
+            self.assertTrue(rehashed["password_hash"].startswith("pbkdf2:sha256:2000$"))
+        finally:
+            self.app.password_hasher = original_hasher
+
+    def test_login_returns_503_when_hashing_saturated(self):
+        self.register_user()
+
+        with patch.object(
+            self.app.password_hasher,
+            "verify_password",
+            side_effect=HashingUnavailableError("password hashing queue is full"),
+        ):
+            login_response = self.client.post(
+                "/api/auth/login",
+                json={"user_info": "tester@example.com", "password": "Test1234"},
+            )
+
+        self.assertEqual(login_response.status_code, 503)
+        self.assertEqual(login_response.headers.get("Retry-After"), "1")
+
+    def test_stateless_tokens_refresh_and_revocation(self):
+        self.app.config["JWT_STATELESS_TOKENS"] = True
+        try:
+            register_body = self.register_user().get_json()
+            self.assertIn("refresh_token", register_body)
+            access_token = register_body["token"]
+
+            # Claims-based endpoints do not need the user document.
+            self.app.db.users.update_one(
+                {"email": "tester@example.com"},
+                {"$set": {"name": "renamed"}},
+            )
+            self.app.user_cache.clear()
+            with patch.object(self.app.db.users, "find_one", side_effect=AssertionError("unexpected lookup")):
+                wardrobe_response = self.client.get(
+                    "/api/wardrobes/me",
+                    headers=self.auth_header(access_token),
+                )
+            self.assertEqual(wardrobe_response.status_code, 200)
+
+            refresh_response = self.client.post(
+                "/api/auth/refresh",
+                json={"refresh_token": register_body["refresh_token"]},
+            )
+            self.assertEqual(refresh_response.status_code, 200)
+            refreshed = refresh_response.get_json()
+            self.assertEqual(refreshed["user"]["name"], "renamed")
+
+            reused_response = self.client.post(
+                "/api/auth/refresh",
+                json={"refresh_token": register_body["refresh_token"]},
+            )
+            self.assertEqual(reused_response.status_code, 401)
+
+            self.client.post("/api/auth/logout", json={"refresh_token": refreshed["refresh_token"]})
+            revoked_response = self.client.post(
+                "/api/auth/refresh",
+                json={"refresh_token": refreshed["refresh_token"]},
+            )
+            self.assertEqual(revoked_response.status_code, 401)
+        finally:
+            self.app.config["JWT_STATELESS_TOKENS"] = False
+
+    def test_refresh_disabled_by_default(self):
+        response = self.client.post("/api/auth/refresh", json={"refresh_token": "x"})
+        self.assertEqual(response.status_code, 404)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+from unittest.mock import patch
+
+from bson import ObjectId
+from api.services.background_jobs import job_handlers
+from tests.base import AppTestCase
+
+
+class TestFollowingFeed(AppTestCase):
+    def setUp(self):
+        self.client = self.app.test_client()
+        for name in ("users", "follows", "outfits", "timelines", "jobs"):
+            self.app.db[name].delete_many({})
+        self.app.user_cache.clear()
+
+    def register_user(self, name):
+        body = self.client.post(
+            "/api/auth/register",
+            json={"name": name, "email": f"{name}@example.com", "password": "Test1234"},
+        ).get_json()
+        return body["user"]["id"], {"Authorization": f"Bearer {body['token']}"}
+
+    def run_jobs(self):
+        while self.app.job_queue.run_batch(job_handlers(self.app), batch_size=100):
+            pass
+
+    def publish(self, headers, name, published=True):
+        outfit_id = self.client.post(
+            "/api/outfits", json={"name": name, "published": published}, headers=headers
+        ).get_json()["id"]
+        self.run_jobs()
+        return outfit_id
+
+    def feed_names(self, headers, query=""):
+        response = self.client.get(f"/api/feed/following{query}", headers=headers)
+        self.assertEqual(response.status_code, 200)
+        return [o["name"] for o in response.get_json()], response.headers.get("X-Next-Cursor")
+
+    def test_published_outfits_fan_out_to_followers(self):
+        reader_id, reader = self.register_user("reader")
+        author_id, author = self.register_user("author")
+        _, stranger = self.register_user("stranger")
+
+        old_id = self.publish(author, "Before follow")
+        self.client.post("/api/follows", json={"followed_id": author_id}, headers=reader)
+        self.publish(author, "First")
+        self.publish(author, "Draft", published=False)
+        self.publish(stranger, "Not followed")
+        second_id = self.publish(author, "Second")
+
+        names, next_cursor = self.feed_names(reader, "?limit=2")
+        self.assertEqual(names, ["Second", "First"])
+        names, next_cursor = self.feed_names(reader, f"?limit=2&cursor={next_cursor}")
+        self.assertEqual(names, ["Before follow"])
+        self.assertIsNone(next_cursor)
+
+        body = self.client.get("/api/feed/following", headers=reader).get_json()
+        self.assertEqual(body[0]["author"]["name"], "author")
+
+        self.client.put(f"/api/outfits/{second_id}", json={"published": False}, headers=author)
+        self.client.delete(f"/api/outfits/{old_id}", headers=author)
+        self.run_jobs()
+        self.assertEqual(self.app.db.timelines.count_documents({"outfit_id": ObjectId(second_id)}), 0)
+        self.assertEqual(self.feed_names(reader)[0], ["First"])
+
+        self.client.delete(f"/api/follows/{author_id}", headers=reader)
+        self.assertEqual(self.feed_names(reader)[0], [])
+
+    def test_fan_out_caps_timelines_nobody_reads(self):
+        _, reader = self.register_user("idle")
+        author_id, author = self.register_user("prolific")
+        self.client.post("/api/follows", json={"followed_id": author_id}, headers=reader)
+
+        with patch.dict(self.app.config, {"TIMELINE_MAX_ENTRIES": 2}):
+            for name in ("One", "Two", "Three"):
+                self.publish(author, name)
+        self.assertEqual(self.app.db.timelines.count_documents({}), 2)
+        self.assertEqual(self.feed_names(reader)[0], ["Three", "Two"])
+
+    def test_large_accounts_are_merged_at_read_time(self):
+        reader_id, reader = self.register_user("reader")
+        celebrity_id, celebrity = self.register_user("celebrity")
+        author_id, author = self.register_user("author")
+        self.client.post("/api/follows", json={"followed_id": celebrity_id}, headers=reader)
+        self.client.post("/api/follows", json={"followed_id": author_id}, headers=reader)
+
+        self.app.db.users.update_one({"_id": ObjectId(celebrity_id)}, {"$set": {"follower_count": 10 ** 6}})
+        self.publish(author, "Pushed")
+        self.publish(celebrity, "Merged")
+
+        self.assertEqual(self.app.db.timelines.count_documents({"owner_id": reader_id}), 1)
+        self.assertEqual(self.feed_names(reader)[0], ["Merged", "Pushed"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+import unittest
+from unittest.mock import patch
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+import run as app_run
+from api.services.follow_graph import FollowGraph, FollowGraphIndex
+from api.services.follow_service import FollowService
+from tests.base import AppTestCase
+
+
+class TestFollows(AppTestCase):
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.app.db.users.delete_many({})
+        self.app.db.follows.delete_many({})
+        self.app.user_cache.clear()
+
+    def register_user(self, name, email):
+        return self.client.post(
+            "/api/auth/register",
+            json={"name": name, "email": email, "password": "Test1234"},
+        ).get_json()
+
+    @staticmethod
+    def auth_header(token):
+        return {"Authorization": f"Bearer {token}"}
+
+    def test_bulk_is_following_answers_in_request_order(self):
+        me = self.register_user("me", "me@example.com")
+        followed = self.register_user("followed", "followed@example.com")
+        other = self.register_user("other", "other@example.com")
+        headers = self.auth_header(me["token"])
+
+        response = self.client.post(
+            "/api/follows", json={"followed_id": followed["user"]["id"]}, headers=headers
+        )
+        self.assertEqual(response.status_code, 201)
+        followed_user = self.app.db.users.find_one({"_id": ObjectId(followed["user"]["id"])})
+        self.assertEqual(followed_user["follower_count"], 1)
+
+        ids = [other["user"]["id"], followed["user"]["id"]]
+        response = self.client.get(f"/api/follows/is-following?ids={','.join(ids)}", headers=headers)
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertEqual(list(body), ids)
+        self.assertEqual(body, {ids[0]: False, ids[1]: True})
+
+        invalid = self.client.get("/api/follows/is-following?ids=nope", headers=headers)
+        self.assertEqual(invalid.status_code, 400)
+
+    def test_migrate_legacy_following_ids(self):
+        self.app.db.follows.insert_many([
+            {"follower_id": "a", "following_id": "b"},
+            {"follower_id": "a", "followed_id": "c"},
+            {"follower_id": "z", "followed_id": "c"},
+            {"follower_id": "z", "following_id": "c"},
+        ])
+
+        migrated = FollowService(self.app.db).migrate_legacy_following_ids(batch_size=1)
+
+        self.assertEqual(migrated, 2)
+        self.assertEqual(self.app.db.follows.count_documents({"following_id": {"$exists": True}}), 0)
+        self.assertEqual(self.app.db.follows.count_documents({"follower_id": "z"}), 1)
+        self.assertEqual(
+            FollowService(self.app.db).is_following_many("a", ["b", "c", "d"]),
+            {"b": True, "c": True, "d": False},
+        )
+
+    def test_ensure_indexes_drops_the_pre_keyset_created_at_indexes(self):
+        db = self.app.db
+        db.follows.create_index([("followed_id", ASCENDING), ("created_at", DESCENDING)])
+        db.follows.create_index([("follower_id", ASCENDING), ("created_at", DESCENDING)])
+        db.outfits.create_index([("user_id", ASCENDING), ("created_at", DESCENDING)])
+
+        app_run.ensure_indexes(db)
+
+        follows = db.follows.index_information()
+        self.assertNotIn("followed_id_1_created_at_-1", follows)
+        self.assertNotIn("follower_id_1_created_at_-1", follows)
+        self.assertIn("follower_id_1_created_at_-1__id_-1", follows)
+        self.assertNotIn("user_id_1_created_at_-1", db.outfits.index_information())
+
+    def test_follow_graph_ranks_friends_of_friends(self):
+        graph = FollowGraph()
+        for follower, followed in [("me", "a"), ("me", "b"), ("a", "x"), ("b", "x"), ("a", "y"), ("a", "b"), ("a", "me")]:
+            graph.add_edge(follower, followed)
+
+        self.assertEqual(graph.suggest("me"), [("x", 2), ("y", 1)])
+        graph.remove_edge("b", "x")
+        self.assertEqual(graph.suggest("me", limit=1), [("x", 1)])
+        self.assertEqual(graph.suggest("unknown"), [])
+
+    def test_follow_graph_builds_in_background_without_blocking_suggestions(self):
+        self.app.db.follows.insert_many([
+            {"follower_id": "me", "followed_id": "a"},
+            {"follower_id": "a", "followed_id": "x"},
+        ])
+        index = FollowGraphIndex(self.app.db)
+        with patch.object(FollowGraph, "add_edge", autospec=True, side_effect=FollowGraph.add_edge) as add_edge:
+            self.assertEqual(index.suggest("me"), [])
+            index._thread.join()
+        self.assertEqual([call.kwargs for call in add_edge.call_args_list], [{"check_existing": False}] * 2)
+        self.assertEqual(index.suggest("me"), [("x", 1)])
+
+    def test_suggestions_endpoint_tracks_follows(self):
+        me = self.register_user("me", "me@example.com")
+        friend = self.register_user("friend", "friend@example.com")
+        target = self.register_user("target", "target@example.com")
+        self.app.follow_graph.rebuild()
+
+        self.client.post("/api/follows", json={"followed_id": friend["user"]["id"]}, headers=self.auth_header(me["token"]))
+        self.client.post("/api/follows", json={"followed_id": target["user"]["id"]}, headers=self.auth_header(friend["token"]))
+
+        response = self.client.get("/api/follows/suggestions", headers=self.auth_header(me["token"]))
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertEqual([user["name"] for user in body], ["target"])
+        self.assertEqual(body[0]["mutual_count"], 1)
+
+        self.client.post("/api/follows", json={"followed_id": target["user"]["id"]}, headers=self.auth_header(me["token"]))
+        response = self.client.get("/api/follows/suggestions", headers=self.auth_header(me["token"]))
+        self.assertEqual(response.get_json(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+from unittest.mock import patch
+
+from api.models.garment import Pants, Shirt, Skirt
+from api.services.garment_facets import GarmentFacetService
+from api.services.garment_service import GarmentService
+from tests.base import AppTestCase
+
+
+class TestGarmentCatalog(AppTestCase):
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.app.db.garments.delete_many({})
+        self.app.db.garment_facets.delete_many({})
+        self.service = GarmentService(self.app.db)
+        self.ids = {
+            name: self.service.create_garment(garment)
+            for name, garment in {
+                "tee": Shirt(name="tee", user_id="default", gender="male", style="casual"),
+                "blouse": Shirt(name="blouse", user_id="default", gender="female", style="formal"),
+                "jeans": Pants(name="jeans", user_id="default", gender="male", style="casual"),
+                "mini": Skirt(name="mini", user_id="u1", gender="female", style="y2k", is_custom=True),
+            }.items()
+        }
+
+    def test_catalog_combines_filters_and_counts_other_facets(self):
+        response = self.client.get("/api/garments/catalog?type=shirt&gender=male&limit=1")
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertEqual([g["name"] for g in body["garments"]], ["tee"])
+        self.assertEqual(body["total"], 1)
+        self.assertEqual(body["facets"]["type"], {"pants": 1, "shirt": 1})
+        self.assertEqual(body["facets"]["gender"], {"female": 1, "male": 1})
+        self.assertEqual(body["facets"]["style"], {"casual": 1})
+
+        custom = self.client.get("/api/garments/catalog?is_custom=true&creator_id=u1").get_json()
+        self.assertEqual([g["name"] for g in custom["garments"]], ["mini"])
+        self.assertEqual(custom["facets"]["style"], {"y2k": 1})
+
+        listed = self.client.get("/api/garments?style=casual&gender=male").get_json()
+        self.assertEqual({g["name"] for g in listed["garments"]}, {"tee", "jeans"})
+        self.assertEqual(self.client.get("/api/garments/catalog?gender=robot").status_code, 400)
+        self.assertEqual(self.client.get("/api/garments/catalog?is_custom=maybe").status_code, 400)
+
+    def test_facet_table_follows_writes_without_grouping_garments(self):
+        self.service.update_garment(self.ids["blouse"], {"style": "casual"})
+        self.service.delete_garment(self.ids["jeans"])
+
+        with patch.object(self.app.db.garments, "aggregate") as aggregate:
+            body = self.client.get("/api/garments/catalog").get_json()
+            creator = self.client.get("/api/garments/catalog?creator_id=default").get_json()
+        aggregate.assert_not_called()
+        self.assertEqual(creator["total"], 2)
+        self.assertEqual(creator["facets"]["gender"], {"female": 1, "male": 1})
+        self.assertEqual(creator["facets"]["style"], {"casual": 2})
+        self.assertEqual(body["total"], 3)
+        self.assertEqual(body["facets"]["style"], {"casual": 2, "y2k": 1})
+        self.assertEqual(body["facets"]["type"], {"shirt": 2, "skirt": 1})
+
+        incremental = {row["_id"]: row["count"] for row in self.app.db.garment_facets.find({"count": {"$gt": 0}})}
+        GarmentFacetService(self.app.db).rebuild()
+        rebuilt = {row["_id"]: row["count"] for row in self.app.db.garment_facets.find()}
+        self.assertEqual(incremental, rebuilt)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import unittest
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import mongomock
+import run as app_run
+from api.services.background_jobs import generate_thumbnail_variants, job_handlers, periodic_jobs
+from api.services.job_queue import JobQueue
+
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.db = mongomock.MongoClient().db
+        self.queue = JobQueue(self.db, max_attempts=2, base_backoff_seconds=30)
+
+    def test_jobs_of_one_kind_run_as_a_batch(self):
+        for i in range(3):
+            self.queue.enqueue("echo", {"n": i})
+        batches = []
+
+        self.assertEqual(self.queue.run_batch({"echo": batches.append}, batch_size=10), 3)
+        self.assertEqual(batches, [[{"n": 0}, {"n": 1}, {"n": 2}]])
+        self.assertEqual(self.db.jobs.count_documents({}), 0)
+
+    def test_failures_back_off_then_park(self):
+        self.queue.enqueue("flaky", {})
+
+        def fail(payloads):
+            raise RuntimeError("boom")
+
+        self.queue.run_batch({"flaky": fail})
+        job = self.db.jobs.find_one()
+        self.assertEqual((job["status"], job["attempts"]), ("pending", 1))
+        self.assertGreater(job["run_at"].replace(tzinfo=timezone.utc), datetime.now(timezone.utc) + timedelta(seconds=20))
+        self.assertEqual(self.queue.run_batch({"flaky": fail}), 0)
+
+        self.db.jobs.update_one({}, {"$set": {"run_at": datetime.now(timezone.utc)}})
+        self.queue.run_batch({"flaky": fail})
+        job = self.db.jobs.find_one()
+        self.assertEqual(job["status"], "failed")
+        self.assertIn("boom", job["last_error"])
+
+        self.assertEqual(self.queue.retry_failed(), 1)
+        self.assertEqual(self.queue.stats()["pending"], 1)
+
+    def test_failed_variant_digest_retries_only_its_own_jobs(self):
+        for digest in ("good", "bad"):
+            self.queue.enqueue("thumbnail.variants", {"digest": digest})
+        def generate(digest):
+            if digest == "bad":
+                raise OSError("truncated image")
+
+        app = SimpleNamespace(thumbnail_variants=MagicMock(), logger=MagicMock())
+        app.thumbnail_variants.generate.side_effect = generate
+
+        self.queue.run_batch({"thumbnail.variants": lambda payloads: generate_thumbnail_variants(app, payloads)})
+
+        self.assertEqual(app.thumbnail_variants.generate.call_count, 2)
+        app.logger.exception.assert_called_once()
+        job = self.db.jobs.find_one()
+        self.assertEqual(self.db.jobs.count_documents({}), 1)
+        self.assertEqual((job["payload"], job["status"]), ({"digest": "bad"}, "pending"))
+
+    def test_expired_leases_are_reclaimed_and_duplicates_absorbed(self):
+        self.queue.enqueue("render", {"digest": "abc"}, dedupe_key="render:abc")
+        self.queue.enqueue("render", {"digest": "abc"}, dedupe_key="render:abc")
+        self.assertEqual(self.db.jobs.count_documents({}), 1)
+
+        claimed = self.queue.claim("crashed-worker")
+        self.assertIsNone(self.queue.claim("other-worker"))
+        self.db.jobs.update_one(
+            {"_id": claimed["_id"]}, {"$set": {"locked_until": datetime.now(timezone.utc) - timedelta(seconds=1)}}
+        )
+        reclaimed = self.queue.claim("other-worker")
+        self.assertEqual((reclaimed["_id"], reclaimed["attempts"]), (claimed["_id"], 2))
+
+    def test_periodic_jobs_stay_queued_once(self):
+        for _ in range(3):
+            self.queue.schedule("trending.refresh", 300)
+        job = self.db.jobs.find_one()
+        self.assertEqual(self.db.jobs.count_documents({}), 1)
+        self.assertEqual(job["dedupe_key"], "periodic:trending.refresh")
+        self.assertGreater(job["run_at"].replace(tzinfo=timezone.utc), datetime.now(timezone.utc) + timedelta(seconds=290))
+
+    def test_worker_app_skips_web_startup(self):
+        os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+        os.environ.setdefault("JWT_SECRET", "test-jwt-secret")
+        with patch.object(app_run, "MongoClient", mongomock.MongoClient), \
+                patch.object(app_run, "ensure_indexes") as ensure_indexes:
+            app = app_run.create_worker_app()
+        ensure_indexes.assert_not_called()
+        self.assertEqual(app.blueprints, {})
+        self.assertIsInstance(app.job_queue, JobQueue)
+        self.assertIn("timeline.sync", job_handlers(app))
+        self.assertEqual(
+            periodic_jobs(app),
+            {"trending.refresh": app.config["TRENDING_REFRESH_INTERVAL_SECONDS"],
+             "counters.reconcile": app.config["COUNTER_RECONCILE_INTERVAL_SECONDS"]},
+        )
@@ -0,0 +1,118 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from bson import ObjectId
+import mongomock
+from pymongo import ASCENDING
+from api.services.counter_service import CounterService
+from api.services.like_buffer import LikeBuffer
+from api.services.like_service import LikeService
+from api.services.trending_service import TrendingService
+
+
+class TestLikeBuffer(unittest.TestCase):
+    def setUp(self):
+        self.db = mongomock.MongoClient().db
+        self.db.likes.create_index([("outfit_id", ASCENDING), ("user_id", ASCENDING)], unique=True)
+        self.outfit_id = self.db.outfits.insert_one({"name": "Viral", "like_count": 0}).inserted_id
+        self.users = [ObjectId() for _ in range(3)]
+        self.buffer = LikeBuffer(self.db, max_pending=100, flush_size=100, flush_interval_seconds=60)
+
+    def like_count(self):
+        return self.db.outfits.find_one({"_id": self.outfit_id})["like_count"]
+
+    def test_toggles_coalesce_into_one_bulk_write(self):
+        service = LikeService(self.db, buffer=self.buffer)
+        for user in self.users:
+            self.assertEqual(service.like_outfit(self.outfit_id, user)[1], 202)
+        service.unlike_outfit(self.outfit_id, self.users[0])
+        service.like_outfit(self.outfit_id, self.users[0])
+        service.unlike_outfit(self.outfit_id, self.users[1])
+
+        self.assertEqual(self.db.likes.count_documents({}), 0)
+        self.assertTrue(service.is_liked_by_user(self.outfit_id, self.users[0]))
+        self.assertEqual(service.liked_outfit_ids(self.users[1], [self.outfit_id]), set())
+
+        with patch.object(self.db.likes, "bulk_write", wraps=self.db.likes.bulk_write) as bulk_write:
+            self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(bulk_write.call_count, 1)
+        self.assertFalse(bulk_write.call_args.kwargs["ordered"])
+        self.assertEqual(self.like_count(), 2)
+        self.assertEqual(
+            {like["user_id"] for like in self.db.likes.find()}, {self.users[0], self.users[2]}
+        )
+
+        stats = self.buffer.stats()
+        self.assertEqual((stats["depth"], stats["submitted"], stats["coalesced"]), (0, 6, 3))
+        self.assertEqual((stats["flushes"], stats["written"], stats["skipped"]), (1, 2, 1))
+        self.assertGreaterEqual(stats["max_flush_seconds"], stats["last_flush_seconds"])
+
+    def test_unlike_decrements_the_bucket_the_like_was_counted_in(self):
+        liked_at = datetime.now(timezone.utc) - timedelta(hours=30)
+        self.db.likes.insert_one({"outfit_id": self.outfit_id, "user_id": self.users[0], "created_at": liked_at})
+        TrendingService(self.db).record(self.outfit_id, "likes", 1, when=liked_at)
+
+        self.buffer.submit(self.outfit_id, self.users[0], False)
+        self.buffer.submit(self.outfit_id, self.users[1], True)
+        self.buffer.flush()
+
+        tallies = {
+            b["bucket"].replace(tzinfo=timezone.utc): b["likes"] for b in self.db.engagement_buckets.find()
+        }
+        self.assertEqual(tallies[TrendingService.bucket_start(liked_at)], 0)
+        self.assertEqual(tallies[TrendingService.bucket_start(datetime.now(timezone.utc))], 1)
+
+    def test_failed_flush_requeues_and_replay_converges(self):
+        self.db.likes.insert_one({"outfit_id": self.outfit_id, "user_id": self.users[2]})
+        self.db.outfits.update_one({"_id": self.outfit_id}, {"$set": {"like_count": 1}})
+        self.buffer.submit(self.outfit_id, self.users[0], True)
+        self.buffer.submit(self.outfit_id, self.users[1], True)
+        self.buffer.submit(self.outfit_id, self.users[2], True)
+
+        with patch.object(self.db.likes, "bulk_write", side_effect=RuntimeError("primary stepped down")):
+            self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(self.buffer.stats()["failed_flushes"], 1)
+        self.assertEqual(self.buffer.stats()["depth"], 3)
+
+        # A toggle that arrived after the failed flush wins over the re-queued one.
+        self.buffer.submit(self.outfit_id, self.users[1], False)
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(self.like_count(), 2)
+
+        # Replaying an already applied batch changes nothing.
+        self.buffer.submit(self.outfit_id, self.users[0], True)
+        self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(self.db.likes.count_documents({}), 2)
+
+    def test_unflushed_toggles_are_lost_on_crash_and_counters_reconcile(self):
+        self.buffer.submit(self.outfit_id, self.users[0], True)
+        del self.buffer  # process died before the flusher ran
+        self.assertEqual(self.db.likes.count_documents({}), 0)
+
+        # A partially applied batch leaves like_count behind until reconcile.
+        self.db.likes.insert_one({"outfit_id": self.outfit_id, "user_id": self.users[1]})
+        CounterService(self.db).reconcile_outfits()
+        self.assertEqual(self.like_count(), 1)
+
+    def test_full_buffer_flushes_inline_and_skips_deleted_outfits(self):
+        buffer = LikeBuffer(self.db, max_pending=2, flush_size=2, flush_interval_seconds=60)
+        gone = ObjectId()
+        buffer.submit(gone, self.users[0], True)
+        buffer.submit(self.outfit_id, self.users[0], True)
+        self.assertEqual(self.db.likes.count_documents({}), 0)
+
+        buffer.submit(self.outfit_id, self.users[1], True)
+        self.assertEqual(buffer.stats()["depth"], 1)
+        self.assertEqual(
+            [like["outfit_id"] for like in self.db.likes.find()], [self.outfit_id]
+        )
+
+        buffer.start()
+        buffer.stop()
+        self.assertEqual(buffer.stats()["depth"], 0)
+        self.assertEqual(self.like_count(), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,41 +1,38 @@
-import os
+import base64
+import io
+import shutil
+import tempfile
 import unittest
-from datetime import datetime, timezone
+from argparse import Namespace
+from datetime import datetime, timedelta, timezone
 from unittest.mock import patch
 
 from bson import ObjectId
-import mongomock
-import run as app_run
+from PIL import Image
+import maintenance
+from api.services.background_jobs import job_handlers
+from api.services.counter_service import CounterService
+from api.services.like_buffer import LikeBuffer
+from api.services.outfit_search_service import OutfitSearchService
+from api.services.thumbnail_service import ThumbnailService, current_thumbnail_service
+from api.services.thumbnail_store import LocalThumbnailStore, ThumbnailStore
+from api.services.thumbnail_variants import ThumbnailVariantRenderer
+from api.services.trending_service import TrendingService
+from tests.base import AppTestCase
 
 
-class TestOutfitInteractions(unittest.TestCase):
+class TestOutfitInteractions(AppTestCase):
     @classmethod
     def setUpClass(cls):
-        os.environ.setdefault("FLASK_DEBUG", "False")
-        os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
-        os.environ.setdefault("MONGO_DB_NAME", "test_database")
-        os.environ.setdefault("JWT_SECRET", "test-jwt-secret")
-
-        cls.mongo_patcher = patch.object(app_run, "MongoClient", mongomock.MongoClient)
-        cls.download_patcher = patch.object(
-            app_run.FileService,
-            "download_default_files",
-            lambda self, uploads_path: None,
-        )
-        cls.cloud_patcher = patch.object(app_run, "CloudService", lambda db, config: object())
-
-        cls.mongo_patcher.start()
-        cls.download_patcher.start()
-        cls.cloud_patcher.start()
-
-        cls.app = app_run.create_app()
-        cls.app.config["TESTING"] = True
+        super().setUpClass()
+        cls.thumbnail_dir = tempfile.mkdtemp()
+        cls.app.thumbnail_store = LocalThumbnailStore(cls.thumbnail_dir)
+        cls.app.thumbnail_variants = ThumbnailVariantRenderer(cls.app.db, cls.app.thumbnail_store)
 
     @classmethod
     def tearDownClass(cls):
-        cls.cloud_patcher.stop()
-        cls.download_patcher.stop()
-        cls.mongo_patcher.stop()
+        shutil.rmtree(cls.thumbnail_dir, ignore_errors=True)
+        super().tearDownClass()
 
     def setUp(self):
         self.client = self.app.test_client()
@@ -43,6 +40,17 @@ class TestOutfitInteractions(unittest.TestCase):
         self.app.db.outfits.delete_many({})
         self.app.db.likes.delete_many({})
         self.app.db.comments.delete_many({})
+        self.app.db.garments.delete_many({})
+        self.app.db.engagement_buckets.delete_many({})
+        self.app.db.trending.delete_many({})
+        self.app.db.thumbnail_blobs.delete_many({})
+        self.app.published_feed_cache.invalidate()
+        self.app.db.jobs.delete_many({})
+        self.app.db.outfit_terms.delete_many({})
+
+    def run_jobs(self):
+        while self.app.job_queue.run_batch(job_handlers(self.app), batch_size=100):
+            pass
 
     def register_user(self, name="tester", email="tester@example.com", password="Test1234"):
         return self.client.post(
@@ -109,6 +117,61 @@ class TestOutfitInteractions(unittest.TestCase):
         self.assertEqual(comments_body["count"], 1)
         self.assertEqual(comments_body["comments"][0]["content"], "Great look")
 
+    def test_counters_follow_likes_comments_and_outfits(self):
+        body = self.register_user(name="counter", email="counter@example.com").get_json()
+        token, user_id = body["token"], body["user"]["id"]
+        headers = self.auth_header(token)
+
+        outfit_id = self.client.post(
+            "/api/outfits", json={"name": "Counted", "published": True}, headers=headers
+        ).get_json()["id"]
+        self.client.post(f"/api/outfits/{outfit_id}/likes", headers=headers)
+        self.client.post(f"/api/outfits/{outfit_id}/likes", headers=headers)
+        comment_id = self.client.post(
+            f"/api/outfits/{outfit_id}/comments", json={"content": "one"}, headers=headers
+        ).get_json()["id"]
+        self.client.post(f"/api/outfits/{outfit_id}/comments", json={"content": "two"}, headers=headers)
+        self.client.delete(f"/api/outfits/{outfit_id}/comments/{comment_id}", headers=headers)
+
+        outfit = self.client.get(f"/api/outfits/{outfit_id}", headers=headers).get_json()
+        self.assertEqual((outfit["like_count"], outfit["comment_count"]), (1, 1))
+        self.assertEqual(self.app.db.users.find_one({"_id": ObjectId(user_id)})["outfit_count"], 1)
+
+        self.client.delete(f"/api/outfits/{outfit_id}/likes", headers=headers)
+        self.client.delete(f"/api/outfits/{outfit_id}", headers=headers)
+        self.assertEqual(self.app.db.users.find_one({"_id": ObjectId(user_id)})["outfit_count"], 0)
+
+    def test_reconcile_repairs_drifted_counters(self):
+        self.app.db.follows.delete_many({})
+        alice, bob = ObjectId(), ObjectId()
+        outfit_id = ObjectId()
+        self.app.db.users.insert_many([
+            {"_id": alice, "name": "alice", "email": "alice@example.com", "follower_count": 7},
+            {"_id": bob, "name": "bob", "email": "bob@example.com", "following_count": 1, "outfit_count": 0},
+        ])
+        self.app.db.outfits.insert_one({"_id": outfit_id, "name": "x", "user_id": str(bob), "like_count": -2})
+        self.app.db.follows.insert_one({"follower_id": str(bob), "followed_id": str(alice)})
+        self.app.db.likes.insert_many([
+            {"outfit_id": outfit_id, "user_id": alice},
+            {"outfit_id": outfit_id, "user_id": bob},
+        ])
+        self.app.db.comments.insert_one({"outfit_id": outfit_id, "user_id": alice, "content": "hi"})
+
+        result = CounterService(self.app.db).reconcile(batch_size=1)
+
+        self.assertEqual(result, {"users": 2, "outfits": 1})
+        self.assertEqual(self.app.db.users.find_one({"_id": alice})["follower_count"], 1)
+        self.assertEqual(self.app.db.users.find_one({"_id": bob})["outfit_count"], 1)
+        outfit = self.app.db.outfits.find_one({"_id": outfit_id})
+        self.assertEqual((outfit["like_count"], outfit["comment_count"]), (2, 1))
+        self.assertEqual(CounterService(self.app.db).reconcile(), {"users": 0, "outfits": 0})
+
+        # worker.py runs the same pass as one deduplicated periodic job.
+        self.app.db.users.update_one({"_id": alice}, {"$set": {"follower_count": 9}})
+        self.app.job_queue.schedule("counters.reconcile", 0)
+        self.run_jobs()
+        self.assertEqual(self.app.db.users.find_one({"_id": alice})["follower_count"], 1)
+
     def test_get_published_outfits_returns_only_published(self):
         published_id = ObjectId()
 
@@ -151,6 +214,468 @@ class TestOutfitInteractions(unittest.TestCase):
         self.assertEqual(body[0]["id"], str(published_id))
         self.assertEqual(body[0]["name"], "Published Outfit")
 
+    def test_published_feed_pages_by_cursor_with_author_cards(self):
+        body = self.register_user(name="author", email="author@example.com").get_json()
+        headers = self.auth_header(body["token"])
+        for i in range(3):
+            self.client.post("/api/outfits", json={"name": f"Look {i}", "published": True}, headers=headers)
+
+        first = self.client.get("/api/outfits/published?limit=2")
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual([o["name"] for o in first.get_json()], ["Look 2", "Look 1"])
+        self.assertEqual(first.get_json()[0]["author"]["name"], "author")
+        self.assertEqual(first.get_json()[0]["userId"], body["user"]["id"])
+
+        next_cursor = first.headers.get("X-Next-Cursor")
+        second = self.client.get(f"/api/outfits/published?limit=2&cursor={next_cursor}")
+        self.assertEqual([o["name"] for o in second.get_json()], ["Look 0"])
+        self.assertIsNone(second.headers.get("X-Next-Cursor"))
+
+    def test_published_feed_cache_is_invalidated_by_outfit_writes(self):
+        body = self.register_user(name="cached", email="cached@example.com").get_json()
+        headers = self.auth_header(body["token"])
+        outfit_id = self.client.post(
+            "/api/outfits", json={"name": "First", "published": True}, headers=headers
+        ).get_json()["id"]
+        self.assertEqual(len(self.client.get("/api/outfits/published").get_json()), 1)
+
+        # Writes that bypass OutfitService are only seen once the entry expires.
+        self.app.db.outfits.insert_one({"name": "Raw", "published": True, "created_at": datetime.now(timezone.utc)})
+        self.assertEqual(len(self.client.get("/api/outfits/published").get_json()), 1)
+
+        self.client.put(f"/api/outfits/{outfit_id}", json={"name": "Renamed"}, headers=headers)
+        names = [o["name"] for o in self.client.get("/api/outfits/published").get_json()]
+        self.assertEqual(sorted(names), ["Raw", "Renamed"])
+
+        self.client.delete(f"/api/outfits/{outfit_id}", headers=headers)
+        names = [o["name"] for o in self.client.get("/api/outfits/published").get_json()]
+        self.assertEqual(names, ["Raw"])
+
+    def test_expand_garments_resolves_object_and_seed_ids(self):
+        body = self.register_user(name="dresser", email="dresser@example.com").get_json()
+        headers = self.auth_header(body["token"])
+        shirt_id = self.app.db.garments.insert_one({
+            "type": "shirt", "name": "Tee", "user_id": "u", "gender": "unisex",
+        }).inserted_id
+        self.app.db.garments.insert_one({
+            "type": "pants", "id": "seed-pants", "name": "Jeans", "user_id": "u", "gender": "unisex",
+        })
+        outfit_id = self.client.post(
+            "/api/outfits",
+            json={"name": "Dressed", "published": True, "shirt": str(shirt_id), "pants": "seed-pants", "skirt": "gone"},
+            headers=headers,
+        ).get_json()["id"]
+
+        outfit = self.client.get(f"/api/outfits/{outfit_id}?expand=garments", headers=headers).get_json()
+        self.assertEqual(outfit["garments"]["shirt"]["name"], "Tee")
+        self.assertEqual(outfit["garments"]["pants"]["name"], "Jeans")
+        self.assertIsNone(outfit["garments"]["skirt"])
+        self.assertEqual(outfit["shirt"], str(shirt_id))
+
+        with patch.object(self.app.db.garments, "find", wraps=self.app.db.garments.find) as find:
+            feed = self.client.get("/api/outfits/published?expand=garments").get_json()
+        self.assertEqual(find.call_count, 1)
+        self.assertEqual(feed[0]["garments"]["pants"]["id"], "seed-pants")
+        ref_index = self.app.db.garments.index_information()["garment_ref_id"]
+        self.assertEqual(ref_index["partialFilterExpression"], {"id": {"$type": "string"}})
+        self.assertEqual(find.call_args[0][0]["$or"][0]["id"]["$type"], "string")
+        self.assertNotIn("garments", self.client.get("/api/outfits/published").get_json()[0])
+
+    def test_feed_pages_carry_viewer_engagement(self):
+        author = self.register_user(name="poster", email="poster@example.com").get_json()
+        viewer = self.register_user(name="viewer", email="viewer@example.com").get_json()
+        author_headers = self.auth_header(author["token"])
+        viewer_headers = self.auth_header(viewer["token"])
+        liked_id = self.client.post(
+            "/api/outfits", json={"name": "Liked", "published": True}, headers=author_headers
+        ).get_json()["id"]
+        self.client.post("/api/outfits", json={"name": "Other", "published": True}, headers=author_headers)
+        self.client.post(f"/api/outfits/{liked_id}/likes", headers=viewer_headers)
+
+        with patch.object(self.app.db.likes, "find", wraps=self.app.db.likes.find) as find:
+            page = self.client.get("/api/outfits/published", headers=viewer_headers).get_json()
+        self.assertEqual(find.call_count, 1)
+        cards = {o["name"]: o for o in page}
+        self.assertTrue(cards["Liked"]["liked_by_me"])
+        self.assertEqual(cards["Liked"]["like_count"], 1)
+        self.assertFalse(cards["Other"]["liked_by_me"])
+
+        anonymous = self.client.get("/api/outfits/published").get_json()
+        self.assertFalse(any(o["liked_by_me"] for o in anonymous))
+        by_author = self.client.get(
+            f"/api/outfits?user_id={author['user']['id']}", headers=viewer_headers
+        ).get_json()
+        self.assertEqual({o["name"] for o in by_author if o["liked_by_me"]}, {"Liked"})
+
+    def test_listings_see_buffered_likes_before_they_are_flushed(self):
+        author = self.register_user(name="buffered", email="buffered@example.com").get_json()
+        headers = self.auth_header(author["token"])
+        outfit_id = self.client.post(
+            "/api/outfits", json={"name": "Pending", "published": True}, headers=headers
+        ).get_json()["id"]
+
+        # What create_app wires up when LIKE_WRITE_BEHIND is enabled, minus the flusher thread.
+        buffer = LikeBuffer(self.app.db, flush_interval_seconds=3600)
+        with patch.dict(self.app.config, {"LIKE_WRITE_BEHIND": True}), \
+                patch.object(self.app, "like_buffer", buffer, create=True):
+            self.assertEqual(self.client.post(f"/api/outfits/{outfit_id}/likes", headers=headers).status_code, 202)
+            self.assertEqual(self.app.db.likes.count_documents({}), 0)
+            for path in (
+                "/api/outfits/published",
+                f"/api/outfits?user_id={author['user']['id']}",
+                "/api/outfits/search?q=pending",
+            ):
+                page = self.client.get(path, headers=headers).get_json()
+                self.assertEqual([o["liked_by_me"] for o in page], [True], path)
+
+            self.client.delete(f"/api/outfits/{outfit_id}/likes", headers=headers)
+            page = self.client.get("/api/outfits/published", headers=headers).get_json()
+            self.assertFalse(page[0]["liked_by_me"])
+
+    def test_trending_ranks_by_decayed_engagement(self):
+        author = self.register_user(name="trendy", email="trendy@example.com").get_json()
+        fan = self.register_user(name="fan", email="fan@example.com").get_json()
+        headers = self.auth_header(author["token"])
+        ids = {
+            name: self.client.post(
+                "/api/outfits", json={"name": name, "published": name != "Draft"}, headers=headers
+            ).get_json()["id"]
+            for name in ("Old", "Fresh", "Draft")
+        }
+        trending = TrendingService(self.app.db, half_life_hours=24)
+        two_days_ago = datetime.now(timezone.utc) - timedelta(hours=48)
+        for _ in range(3):
+            trending.record(ObjectId(ids["Old"]), "likes", 1, when=two_days_ago)
+        self.client.post(f"/api/outfits/{ids['Fresh']}/likes", headers=headers)
+        self.client.post(f"/api/outfits/{ids['Fresh']}/likes", headers=self.auth_header(fan["token"]))
+        self.client.post(f"/api/outfits/{ids['Draft']}/likes", headers=headers)
+
+        self.assertEqual(trending.refresh(), 2)
+
+        first = self.client.get("/api/outfits/trending?limit=1", headers=headers)
+        self.assertEqual([o["name"] for o in first.get_json()], ["Fresh"])
+        self.assertTrue(first.get_json()[0]["liked_by_me"])
+        second = self.client.get(f"/api/outfits/trending?limit=1&cursor={first.headers['X-Next-Cursor']}")
+        self.assertEqual([o["name"] for o in second.get_json()], ["Old"])
+        self.assertLess(second.get_json()[0]["trending_score"], first.get_json()[0]["trending_score"])
+        self.assertIsNone(second.headers.get("X-Next-Cursor"))
+
+        self.client.delete(f"/api/outfits/{ids['Fresh']}/likes", headers=headers)
+        self.client.delete(f"/api/outfits/{ids['Fresh']}/likes", headers=self.auth_header(fan["token"]))
+        trending.refresh()
+        self.assertEqual([o["name"] for o in self.client.get("/api/outfits/trending").get_json()], ["Old"])
+
+    def test_search_ranks_name_matches_and_respects_visibility(self):
+        author = self.register_user(name="searcher", email="searcher@example.com").get_json()
+        other = self.register_user(name="browser", email="browser@example.com").get_json()
+        headers = self.auth_header(author["token"])
+        outfits = [
+            {"name": "Linen summer suit", "gender": "male", "published": True},
+            {"name": "Beach day", "description": "Light linen shirt", "gender": "female", "published": True},
+            {"name": "Linen draft", "gender": "male", "published": False},
+            {"name": "Wool coat", "gender": "male", "published": True},
+        ]
+        ids = {
+            o["name"]: self.client.post("/api/outfits", json=o, headers=headers).get_json()["id"]
+            for o in outfits
+        }
+
+        first = self.client.get("/api/outfits/search?q=linen&limit=1")
+        self.assertEqual([o["name"] for o in first.get_json()], ["Linen summer suit"])
+        self.assertEqual(first.get_json()[0]["author"]["name"], "searcher")
+        second = self.client.get(f"/api/outfits/search?q=linen&limit=1&cursor={first.headers['X-Next-Cursor']}")
+        self.assertEqual([o["name"] for o in second.get_json()], ["Beach day"])
+        self.assertIsNone(second.headers.get("X-Next-Cursor"))
+
+        as_other = self.client.get("/api/outfits/search?q=linen", headers=self.auth_header(other["token"]))
+        self.assertNotIn("Linen draft", [o["name"] for o in as_other.get_json()])
+        own_drafts = self.client.get("/api/outfits/search?q=linen&published=false", headers=headers)
+        self.assertEqual([o["name"] for o in own_drafts.get_json()], ["Linen draft"])
+        by_gender = self.client.get("/api/outfits/search?q=linen&gender=male", headers=headers)
+        self.assertEqual({o["name"] for o in by_gender.get_json()}, {"Linen summer suit", "Linen draft"})
+
+        self.client.put(f"/api/outfits/{ids['Wool coat']}", json={"name": "Linen coat"}, headers=headers)
+        self.client.delete(f"/api/outfits/{ids['Beach day']}", headers=headers)
+        self.run_jobs()
+        renamed = self.client.get("/api/outfits/search?q=linen").get_json()
+        self.assertEqual({o["name"] for o in renamed}, {"Linen summer suit", "Linen coat"})
+        self.assertEqual(self.app.db.outfit_terms.count_documents({"outfit_id": ObjectId(ids["Beach day"])}), 0)
+        self.assertEqual(self.client.get("/api/outfits/search?q=").status_code, 400)
+        self.assertEqual(self.client.get("/api/outfits/search?q=linen&gender=robot").status_code, 400)
+
+    def test_unlike_and_comment_delete_cancel_their_original_bucket(self):
+        body = self.register_user(name="decay", email="decay@example.com").get_json()
+        headers = self.auth_header(body["token"])
+        outfit_id = self.client.post(
+            "/api/outfits", json={"name": "Aging", "published": True}, headers=headers
+        ).get_json()["id"]
+        self.client.post(f"/api/outfits/{outfit_id}/likes", headers=headers)
+        comment_id = self.client.post(
+            f"/api/outfits/{outfit_id}/comments", json={"content": "old news"}, headers=headers
+        ).get_json()["id"]
+
+        # Move the like, the comment and their tallies two days back.
+        two_days_ago = datetime.now(timezone.utc) - timedelta(hours=48)
+        old_bucket = TrendingService.bucket_start(two_days_ago)
+        self.app.db.likes.update_many({}, {"$set": {"created_at": two_days_ago}})
+        self.app.db.comments.update_many({}, {"$set": {"created_at": two_days_ago}})
+        self.app.db.engagement_buckets.update_many({}, {"$set": {"bucket": old_bucket}})
+
+        self.client.delete(f"/api/outfits/{outfit_id}/likes", headers=headers)
+        self.client.delete(f"/api/outfits/{outfit_id}/comments/{comment_id}", headers=headers)
+
+        buckets = list(self.app.db.engagement_buckets.find())
+        self.assertEqual(len(buckets), 1)
+        self.assertEqual((buckets[0]["likes"], buckets[0]["comments"]), (0, 0))
+
+    def test_overlapping_trending_refreshes_keep_each_others_rows(self):
+        author = self.register_user(name="overlap", email="overlap@example.com").get_json()
+        headers = self.auth_header(author["token"])
+        ids = [
+            ObjectId(self.client.post(
+                "/api/outfits", json={"name": name, "published": True}, headers=headers
+            ).get_json()["id"])
+            for name in ("Seen by both", "Seen by newer")
+        ]
+        trending = TrendingService(self.app.db)
+        for outfit_id in ids:
+            trending.record(outfit_id, "likes", 1)
+        older, newer = ObjectId(), ObjectId()
+
+        with patch("api.services.trending_service.ObjectId", return_value=newer):
+            self.assertEqual(trending.refresh(), 2)
+        # A refresh that started earlier and missed the second outfit finishes last.
+        with patch("api.services.trending_service.ObjectId", return_value=older), \
+                patch.object(trending, "_published", return_value=ids[:1]):
+            trending.refresh()
+
+        rows = {row["_id"]: row["generation"] for row in self.app.db.trending.find()}
+        self.assertEqual(rows, {ids[0]: newer, ids[1]: newer})
+
+    def test_search_postings_stay_unique_across_reindexing(self):
+        body = self.register_user(name="indexer", email="indexer@example.com").get_json()
+        outfit_id = self.client.post(
+            "/api/outfits", json={"name": "Linen linen suit", "description": "Summer suit"},
+            headers=self.auth_header(body["token"]),
+        ).get_json()["id"]
+        search = OutfitSearchService(self.app.db)
+        doc = self.app.db.outfits.find_one({"_id": ObjectId(outfit_id)})
+        search.index_outfit(doc)
+        search.index_outfit(doc)
+        postings = {p["term"]: p["weight"] for p in self.app.db.outfit_terms.find()}
+        self.assertEqual(postings, {"linen": 3, "suit": 4, "summer": 1})
+        self.assertEqual(self.app.db.outfit_terms.count_documents({}), 3)
+
+        search.index_outfit({**doc, "name": "Wool suit", "description": None})
+        self.assertEqual({p["term"] for p in self.app.db.outfit_terms.find()}, {"wool", "suit"})
+
+        self.app.db.outfit_terms.insert_one({"outfit_id": ObjectId(), "term": "stale", "weight": 1})
+        maintenance.index_outfit_search(self.app.db, Namespace(batch_size=10, rebuild=True))
+        self.assertEqual({p["term"] for p in self.app.db.outfit_terms.find()}, {"linen", "suit", "summer"})
+
+    def test_search_reads_only_the_heaviest_postings_per_term(self):
+        body = self.register_user(name="capped", email="capped@example.com").get_json()
+        headers = self.auth_header(body["token"])
+        for outfit in (
+            {"name": "Denim jacket", "published": True},
+            {"name": "Denim jeans", "published": True},
+            {"name": "Loose", "description": "Denim again", "published": True},
+        ):
+            self.client.post("/api/outfits", json=outfit, headers=headers)
+
+        with patch("api.services.outfit_search_service.MAX_CANDIDATES_PER_TERM", 2):
+            first = self.client.get("/api/outfits/search?q=denim&limit=1")
+            second = self.client.get(f"/api/outfits/search?q=denim&limit=1&cursor={first.headers['X-Next-Cursor']}")
+        self.assertEqual(
+            {o["name"] for o in first.get_json() + second.get_json()}, {"Denim jacket", "Denim jeans"}
+        )
+        self.assertIsNone(second.headers.get("X-Next-Cursor"))
+
+    def test_outfit_delete_defers_cascade_to_job_worker(self):
+        body = self.register_user(name="cascade", email="cascade@example.com").get_json()
+        headers = self.auth_header(body["token"])
+        outfit_id = self.client.post("/api/outfits", json={"name": "Doomed"}, headers=headers).get_json()["id"]
+        kept_id = self.client.post("/api/outfits", json={"name": "Kept"}, headers=headers).get_json()["id"]
+        self.client.post(f"/api/outfits/{outfit_id}/likes", headers=headers)
+        self.app.db.wardrobes.insert_many([
+            {"user_id": "a", "outfit_ids": [ObjectId(outfit_id), ObjectId(kept_id)]},
+            {"user_id": "b", "outfit_ids": [ObjectId(kept_id)]},
+        ])
+
+        self.assertEqual(self.client.delete(f"/api/outfits/{outfit_id}", headers=headers).status_code, 200)
+        self.assertEqual(self.app.db.likes.count_documents({}), 1)
+
+        with patch.object(self.app.db.wardrobes, "update_many", wraps=self.app.db.wardrobes.update_many) as pull:
+            self.run_jobs()
+        self.assertEqual(pull.call_args[0][0], {"outfit_ids": {"$in": [ObjectId(outfit_id)]}})
+        self.assertEqual(self.app.db.likes.count_documents({}), 0)
+        self.assertEqual(
+            [w["outfit_ids"] for w in self.app.db.wardrobes.find().sort("user_id", 1)],
+            [[ObjectId(kept_id)], [ObjectId(kept_id)]],
+        )
+        self.app.db.wardrobes.delete_many({})
+
+    def test_job_stats_report_an_undrained_queue(self):
+        body = self.register_user(name="ops", email="ops@example.com").get_json()
+        headers = self.auth_header(body["token"])
+        self.assertEqual(self.client.get("/api/jobs/stats", headers=headers).status_code, 403)
+        self.app.db.users.update_one({"_id": ObjectId(body["user"]["id"])}, {"$set": {"role": "admin"}})
+        self.app.user_cache.clear()
+
+        healthy = self.client.get("/api/jobs/stats", headers=headers)
+        self.assertEqual(healthy.status_code, 200)
+        self.assertTrue(healthy.get_json()["healthy"])
+
+        self.app.job_queue.enqueue("timeline.sync", {"outfit_id": str(ObjectId())}, delay_seconds=-3600)
+        stalled = self.client.get("/api/jobs/stats", headers=headers)
+        self.assertEqual(stalled.status_code, 503)
+        self.assertEqual(stalled.get_json()["pending"], 1)
+        self.assertGreaterEqual(stalled.get_json()["oldest_due_seconds"], 3600)
+
+    def test_list_payloads_link_thumbnails_instead_of_inlining(self):
+        outfit_id = ObjectId()
+        thumbnail = "data:image/png;base64," + base64.b64encode(b"png-bytes").decode("ascii")
+        self.app.db.outfits.insert_one({
+            "_id": outfit_id,
+            "name": "With Thumbnail",
+            "user_id": "user-1",
+            "published": True,
+            "thumbnail": thumbnail,
+            "created_at": datetime.now(timezone.utc),
+        })
+        maintenance.backfill_thumbnail_flags(self.app.db, Namespace())
+        self.assertTrue(self.app.db.outfits.find_one({"_id": outfit_id})["has_thumbnail"])
+
+        listed = self.client.get("/api/outfits/published").get_json()[0]
+        self.assertNotIn("thumbnail", listed)
+        self.assertEqual(listed["thumbnail_url"], f"/api/outfits/{outfit_id}/thumbnail")
+
+        legacy = self.client.get("/api/outfits/published?include=thumbnail").get_json()[0]
+        self.assertEqual(legacy["thumbnail"], thumbnail)
+
+        image = self.client.get(listed["thumbnail_url"])
+        self.assertEqual(image.status_code, 200)
+        self.assertEqual(image.data, b"png-bytes")
+
+    def test_identical_thumbnails_share_one_blob_with_immutable_urls(self):
+        body = self.register_user(name="thumbs", email="thumbs@example.com").get_json()
+        headers = self.auth_header(body["token"])
+        thumbnail = "data:image/png;base64," + base64.b64encode(b"\x89PNG shared").decode("ascii")
+
+        ids = [
+            self.client.post(
+                "/api/outfits", json={"name": f"Look {i}", "thumbnail": thumbnail}, headers=headers
+            ).get_json()["id"]
+            for i in range(2)
+        ]
+        blobs = list(self.app.db.thumbnail_blobs.find())
+        self.assertEqual(len(blobs), 1)
+        self.assertEqual(blobs[0]["ref_count"], 2)
+
+        outfit = self.client.get(f"/api/outfits/{ids[0]}", headers=headers).get_json()
+        self.assertEqual(outfit["thumbnail_url"], f"/api/outfits/{ids[0]}/thumbnail?v={blobs[0]['_id']}")
+        image = self.client.get(outfit["thumbnail_url"])
+        self.assertEqual(image.data, b"\x89PNG shared")
+        self.assertEqual(image.mimetype, "image/png")
+        self.assertIn("immutable", image.headers["Cache-Control"])
+        revalidated = self.client.get(
+            f"/api/outfits/{ids[0]}/thumbnail", headers={"If-None-Match": f'"{blobs[0]["_id"]}"'}
+        )
+        self.assertEqual(revalidated.status_code, 304)
+
+        self.client.delete(f"/api/outfits/{ids[0]}", headers=headers)
+        self.run_jobs()
+        self.assertEqual(self.app.db.thumbnail_blobs.find_one()["ref_count"], 1)
+        self.client.delete(f"/api/outfits/{ids[1]}", headers=headers)
+        self.run_jobs()
+        self.assertIsNone(self.app.db.thumbnail_blobs.find_one())
+        self.assertIsNone(self.app.thumbnail_store.get(blobs[0]["_id"]))
+
+    def test_only_the_upload_that_creates_a_blob_writes_its_bytes(self):
+        body = self.register_user(name="writer", email="writer@example.com").get_json()
+        headers = self.auth_header(body["token"])
+        thumbnail = "data:image/png;base64," + base64.b64encode(b"\x89PNG once").decode("ascii")
+
+        with patch.object(self.app.thumbnail_store, "put", wraps=self.app.thumbnail_store.put) as put:
+            for i in range(2):
+                self.client.post("/api/outfits", json={"name": f"Copy {i}", "thumbnail": thumbnail}, headers=headers)
+        self.assertEqual(put.call_count, 1)
+        self.assertEqual(self.app.db.thumbnail_blobs.find_one()["ref_count"], 2)
+
+        self.app.db.thumbnail_blobs.delete_many({})
+        outfit_id = self.app.db.outfits.find_one({"name": "Copy 0"})["_id"]
+        with self.app.app_context(), \
+                patch.object(self.app.thumbnail_store, "put", side_effect=IOError("store down")):
+            with self.assertRaises(IOError):
+                current_thumbnail_service().store_thumbnail(str(outfit_id), thumbnail)
+        self.assertIsNone(self.app.db.thumbnail_blobs.find_one())
+        with self.assertRaises(TypeError):
+            ThumbnailStore()
+
+    def test_blob_retained_during_its_release_keeps_its_bytes(self):
+        thumbnails = ThumbnailService(self.app.db, self.app.thumbnail_store)
+        data = b"\x89PNG raced"
+        digest = thumbnails._retain(data)
+        store_delete = self.app.thumbnail_store.delete
+
+        def delete_after_concurrent_retain(key):
+            # Another upload of the same bytes lands after the row was deleted;
+            # its put is skipped because the bytes are still stored.
+            if key == digest:
+                thumbnails._retain(data)
+            store_delete(key)
+
+        with patch.object(self.app.thumbnail_store, "delete", side_effect=delete_after_concurrent_retain):
+            thumbnails.release(digest)
+
+        self.assertEqual(self.app.db.thumbnail_blobs.find_one({"_id": digest})["ref_count"], 1)
+        self.assertEqual(self.app.thumbnail_store.get(digest), data)
+
+    def test_thumbnail_size_serves_original_until_variants_are_rendered(self):
+        canvas = io.BytesIO()
+        Image.new("RGB", (1200, 900), "red").save(canvas, format="PNG")
+        outfit_id = self.app.db.outfits.insert_one({
+            "name": "Canvas",
+            "user_id": "user-1",
+            "created_at": datetime.now(timezone.utc),
+        }).inserted_id
+        # Stored without a pool, like originals written before variants existed.
+        digest = ThumbnailService(self.app.db, self.app.thumbnail_store).store_thumbnail(
+            str(outfit_id), base64.b64encode(canvas.getvalue()).decode("ascii")
+        )
+        url = f"/api/outfits/{outfit_id}/thumbnail?v={digest}&size=small"
+
+        fallback = self.client.get(url)
+        self.assertEqual(fallback.mimetype, "image/png")
+        self.assertNotIn("immutable", fallback.headers["Cache-Control"])
+
+        self.run_jobs()
+        small = self.client.get(url)
+        self.assertEqual(small.mimetype, "image/jpeg")
+        self.assertIn("immutable", small.headers["Cache-Control"])
+        self.assertEqual(max(Image.open(io.BytesIO(small.data)).size), 160)
+        webp = self.client.get(url, headers={"Accept": "image/webp"})
+        self.assertEqual(webp.mimetype, "image/webp")
+        self.assertEqual(self.client.get(url.replace("small", "huge")).status_code, 400)
+
+    def test_migrate_inline_thumbnails_moves_bytes_into_store(self):
+        outfit_id = ObjectId()
+        self.app.db.outfits.insert_one({
+            "_id": outfit_id,
+            "name": "Inline",
+            "user_id": "user-1",
+            "thumbnail": base64.b64encode(b"inline-bytes").decode("ascii"),
+            "created_at": datetime.now(timezone.utc),
+        })
+
+        with self.app.app_context():
+            self.assertEqual(current_thumbnail_service().migrate_inline_thumbnails(batch_size=1), 1)
+
+        doc = self.app.db.outfits.find_one({"_id": outfit_id})
+        self.assertNotIn("thumbnail", doc)
+        self.assertTrue(doc["has_thumbnail"])
+        self.assertEqual(self.app.thumbnail_store.get(doc["thumbnail_hash"]), b"inline-bytes")
+
     def test_get_outfit_comments_returns_404_when_outfit_missing(self):
         missing_outfit_id = str(ObjectId())
 
@@ -0,0 +1,71 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+import mongomock
+from api.services.pagination import InvalidCursorError, decode_cursor, encode_cursor, paginate
+from tests.base import AppTestCase
+
+
+class TestPaginate(unittest.TestCase):
+    def setUp(self):
+        self.collection = mongomock.MongoClient().db.items
+
+    def test_walks_every_document_once_including_ties_and_nulls(self):
+        now = datetime(2026, 1, 1)
+        docs = [{"_id": ObjectId(), "created_at": now - timedelta(minutes=i // 2)} for i in range(7)]
+        docs.append({"_id": ObjectId()})
+        self.collection.insert_many(docs)
+
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = paginate(self.collection, {}, 3, cursor)
+            seen.extend(doc["_id"] for doc in page)
+            if not cursor:
+                break
+
+        self.assertEqual(len(seen), len(docs))
+        self.assertEqual(set(seen), {doc["_id"] for doc in docs})
+        self.assertEqual(seen[-1], docs[-1]["_id"])
+
+    def test_cursor_roundtrip_and_rejects_garbage(self):
+        doc_id = ObjectId()
+        value = datetime(2026, 1, 1, 12, 30)
+        self.assertEqual(decode_cursor(encode_cursor(value, doc_id)), (value, doc_id))
+
+        with self.assertRaises(InvalidCursorError):
+            decode_cursor("not-a-cursor")
+
+
+class TestPaginatedEndpoints(AppTestCase):
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.app.db.outfits.delete_many({})
+
+    def test_outfits_are_paged_with_next_cursor_header(self):
+        now = datetime.now(timezone.utc)
+        self.app.db.outfits.insert_many(
+            [
+                {"name": f"Outfit {i}", "user_id": "user-1", "created_at": now - timedelta(minutes=i)}
+                for i in range(5)
+            ]
+        )
+
+        first = self.client.get("/api/outfits?user_id=user-1&limit=3")
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual([o["name"] for o in first.get_json()], ["Outfit 0", "Outfit 1", "Outfit 2"])
+        next_cursor = first.headers.get("X-Next-Cursor")
+        self.assertTrue(next_cursor)
+
+        second = self.client.get(f"/api/outfits?user_id=user-1&limit=3&cursor={next_cursor}")
+        self.assertEqual([o["name"] for o in second.get_json()], ["Outfit 3", "Outfit 4"])
+        self.assertIsNone(second.headers.get("X-Next-Cursor"))
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get("/api/outfits?cursor=garbage")
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import mongomock
+from api.services.response_cache import MongoResponseCache, PublishedFeedCache
+
+
+class TestPublishedFeedCache(unittest.TestCase):
+    def test_concurrent_misses_compute_once(self):
+        cache = PublishedFeedCache(max_pages=2, ttl_seconds=60)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.05)
+            return {"outfits": ["a"], "next_cursor": "c1"}, 200
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get_or_compute(20, None, compute)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [({"outfits": ["a"], "next_cursor": "c1"}, 200)] * 8)
+
+    def test_only_leading_pages_are_cached(self):
+        cache = PublishedFeedCache(max_pages=2, ttl_seconds=60)
+        calls = []
+
+        def page(next_cursor):
+            def compute():
+                calls.append(next_cursor)
+                return {"outfits": [], "next_cursor": next_cursor}, 200
+            return compute
+
+        for _ in range(2):
+            cache.get_or_compute(20, None, page("c1"))
+            cache.get_or_compute(20, "c1", page("c2"))
+            cache.get_or_compute(20, "c2", page("c3"))
+            cache.get_or_compute(20, "unknown", page(None))
+        self.assertEqual(calls, ["c1", "c2", "c3", None, "c3", None])
+
+        cache.invalidate()
+        cache.get_or_compute(20, "c1", page("c2"))
+        self.assertEqual(calls[-1], "c2")
+
+    def test_shared_backend_serves_other_workers(self):
+        collection = mongomock.MongoClient().db.response_cache
+        worker_a = PublishedFeedCache(shared=MongoResponseCache(collection, ttl_seconds=60))
+        worker_b = PublishedFeedCache(shared=MongoResponseCache(collection, ttl_seconds=60))
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return {"outfits": ["a"], "next_cursor": None}, 200
+
+        worker_a.get_or_compute(20, None, compute)
+        payload, status = worker_b.get_or_compute(20, None, compute)
+        self.assertEqual((payload["outfits"], status), (["a"], 200))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(collection.count_documents({"_id": {"$regex": "^lease:"}}), 0)
+
+        worker_b.invalidate()
+        self.assertEqual(collection.count_documents({}), 0)
+
+    def test_page_invalidated_while_computing_is_not_shared(self):
+        collection = mongomock.MongoClient().db.response_cache
+        cache = PublishedFeedCache(shared=MongoResponseCache(collection, ttl_seconds=60))
+
+        def compute():
+            cache.invalidate()  # an outfit was published mid-computation
+            return {"outfits": ["stale"], "next_cursor": None}, 200
+
+        self.assertEqual(cache.get_or_compute(20, None, compute)[0]["outfits"], ["stale"])
+        self.assertEqual(collection.count_documents({}), 0)
+
+    def test_shared_backend_failures_are_logged(self):
+        shared = MongoResponseCache(mongomock.MongoClient().db.response_cache, ttl_seconds=60)
+        cache = PublishedFeedCache(shared=shared)
+        with patch.object(shared, "set", side_effect=RuntimeError("down")), \
+                patch.object(shared, "release_lease", side_effect=RuntimeError("down")), \
+                self.assertLogs("api.services.response_cache", level="ERROR") as logs:
+            payload, status = cache.get_or_compute(20, None, lambda: ({"outfits": [], "next_cursor": None}, 200))
+        self.assertEqual(status, 200)
+        self.assertEqual(len(logs.records), 2)
@@ -0,0 +1,89 @@
+import unittest
+from unittest.mock import patch
+
+from api.services.cache import TTLCache
+from tests.base import AppTestCase
+
+
+class TestTTLCache(unittest.TestCase):
+    def test_lru_eviction_and_counters(self):
+        cache = TTLCache(max_size=2, ttl_seconds=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+
+        stats = cache.stats()
+        self.assertEqual(stats["size"], 2)
+        self.assertEqual(stats["hits"], 3)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["evictions"], 1)
+
+    def test_expired_entries_are_misses(self):
+        cache = TTLCache(max_size=10, ttl_seconds=60)
+        with patch("api.services.cache.time.monotonic", return_value=1000.0):
+            cache.set("a", 1)
+        with patch("api.services.cache.time.monotonic", return_value=1061.0):
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["size"], 0)
+
+
+class TestUserCacheIntegration(AppTestCase):
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.app.db.users.delete_many({})
+        self.app.user_cache.clear()
+
+    @staticmethod
+    def auth_header(token):
+        return {"Authorization": f"Bearer {token}"}
+
+    def test_token_required_uses_cache_and_update_invalidates(self):
+        response = self.client.post(
+            "/api/auth/register",
+            json={"name": "cached", "email": "cached@example.com", "password": "Test1234"},
+        )
+        body = response.get_json()
+        token = body["token"]
+        user_id = body["user"]["id"]
+
+        self.client.get("/api/users/me", headers=self.auth_header(token))
+        hits_before = self.app.user_cache.hits
+        self.client.get("/api/users/me", headers=self.auth_header(token))
+        self.assertEqual(self.app.user_cache.hits, hits_before + 1)
+
+        update_response = self.client.put(
+            f"/api/users/{user_id}",
+            json={"bio": "updated bio"},
+            headers=self.auth_header(token),
+        )
+        self.assertEqual(update_response.status_code, 200)
+
+        me_response = self.client.get("/api/users/me", headers=self.auth_header(token))
+        self.assertEqual(me_response.get_json()["bio"], "updated bio")
+
+    def test_deleted_user_is_rejected(self):
+        response = self.client.post(
+            "/api/auth/register",
+            json={"name": "gone", "email": "gone@example.com", "password": "Test1234"},
+        )
+        body = response.get_json()
+        token = body["token"]
+
+        self.client.get("/api/users/me", headers=self.auth_header(token))
+        delete_response = self.client.delete(
+            f"/api/users/{body['user']['id']}",
+            headers=self.auth_header(token),
+        )
+        self.assertEqual(delete_response.status_code, 200)
+
+        me_response = self.client.get("/api/users/me", headers=self.auth_header(token))
+        self.assertEqual(me_response.status_code, 401)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,253 @@
+import os
+import tempfile
+import unittest
+from argparse import Namespace
+from io import BytesIO
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from PIL import Image
+import maintenance
+from api.services.image_cache import DiskImageCache, ImageProxy
+from api.services.image_variants import render_variant
+from api.services.user_search_service import name_search_fields, normalize_name
+from tests.base import AppTestCase
+
+
+class TestUsers(AppTestCase):
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.app.db.users.delete_many({})
+        self.app.user_cache.clear()
+        self.app.user_search_cache.clear()
+
+    def register_user(self, name="tester", email="tester@example.com", password="Test1234"):
+        return self.client.post(
+            "/api/auth/register",
+            json={
+                "name": name,
+                "email": email,
+                "password": password,
+            },
+        )
+
+    @staticmethod
+    def auth_header(token):
+        return {"Authorization": f"Bearer {token}"}
+
+    def test_name_search_fields(self):
+        self.assertEqual(normalize_name("  Zoë   Smith "), "zoe smith")
+        fields = name_search_fields("Zoë Smith-Jones")
+        self.assertEqual(fields["name_normalized"], "zoe smith-jones")
+        self.assertEqual(fields["name_tokens"], ["jones", "smith", "zoe"])
+
+    def test_backfill_command_adds_search_fields_to_old_users(self):
+        self.app.db.users.insert_one({"name": "Legacy User", "email": "legacy@example.com"})
+        maintenance.backfill_user_search(self.app.db, Namespace(batch_size=10))
+        self.assertEqual([user["name"] for user in self.client.get("/api/users/search?q=leg").get_json()], ["Legacy User"])
+
+    def test_search_ranks_prefix_before_word_matches(self):
+        self.register_user(name="Anna Lee", email="anna@example.com")
+        self.register_user(name="Ann", email="ann@example.com")
+        self.register_user(name="Jo Ann", email="joann@example.com")
+        self.register_user(name="Bob", email="bob@example.com")
+
+        response = self.client.get("/api/users/search?q=ANN")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [user["name"] for user in response.get_json()],
+            ["Ann", "Anna Lee", "Jo Ann"],
+        )
+
+    def test_search_sees_renamed_user(self):
+        body = self.register_user(name="oldname").get_json()
+        self.assertEqual(len(self.client.get("/api/users/search?q=old").get_json()), 1)
+
+        self.client.put(
+            f"/api/users/{body['user']['id']}",
+            json={"name": "newname"},
+            headers=self.auth_header(body["token"]),
+        )
+
+        self.assertEqual(self.client.get("/api/users/search?q=old").get_json(), [])
+        self.assertEqual(len(self.client.get("/api/users/search?q=new").get_json()), 1)
+
+    def test_name_changes_invalidate_only_matching_prefixes(self):
+        body = self.register_user(name="oldname").get_json()
+        self.register_user(name="Zed Other", email="zed@example.com")
+        for query in ("old", "new", "zed", "oth"):
+            self.client.get(f"/api/users/search?q={query}")
+
+        self.client.put(
+            f"/api/users/{body['user']['id']}",
+            json={"name": "newname"},
+            headers=self.auth_header(body["token"]),
+        )
+        cached = {key[0] for key in self.app.user_search_cache._entries}
+        self.assertEqual(cached, {"zed", "oth"})
+
+        self.client.delete(f"/api/users/{body['user']['id']}", headers=self.auth_header(body["token"]))
+        self.register_user(name="Othello", email="othello@example.com")
+        self.assertEqual({key[0] for key in self.app.user_search_cache._entries}, {"zed"})
+        self.assertIn(
+            "name_tokens_1_name_normalized_1", self.app.db.users.index_information()
+        )
+
+    def test_batch_returns_cards_in_request_order(self):
+        first = self.register_user(name="first", email="first@example.com").get_json()
+        second = self.register_user(name="second", email="second@example.com").get_json()
+        missing = "0" * 24
+        ids = [second["user"]["id"], missing, first["user"]["id"]]
+
+        response = self.client.get(
+            f"/api/users/batch?ids={','.join(ids)}",
+            headers=self.auth_header(first["token"]),
+        )
+        self.assertEqual(response.status_code, 200)
+        cards = response.get_json()
+        self.assertEqual(list(cards), ids)
+        self.assertEqual(cards[ids[0]], {"id": ids[0], "name": "second", "profile_picture": None})
+        self.assertIsNone(cards[missing])
+        self.assertNotIn("email", cards[ids[2]])
+
+        invalid = self.client.get("/api/users/batch?ids=nope", headers=self.auth_header(first["token"]))
+        self.assertEqual(invalid.status_code, 400)
+
+    def test_profile_picture_is_cached_and_conditional(self):
+        body = self.register_user().get_json()
+        user_id = body["user"]["id"]
+        self.app.db.users.update_one(
+            {"name": "tester"},
+            {"$set": {"profile_picture": "http://cloud.test/profile_pictures/tester.jpg"}},
+        )
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            proxy = ImageProxy(DiskImageCache(cache_dir), revalidate_seconds=3600)
+            proxy.session = MagicMock()
+            proxy.session.get.return_value = SimpleNamespace(
+                status_code=200,
+                content=b"jpeg-bytes",
+                headers={"Content-Type": "image/jpeg", "ETag": '"up-1"'},
+            )
+
+            with patch.object(self.app, "image_proxy", proxy, create=True), \
+                    patch.object(self.app, "cloud_service", SimpleNamespace(nextcloud_user="u", nextcloud_pass="p"), create=True):
+                first = self.client.get(f"/api/users/{user_id}/profile-picture")
+                self.assertEqual(first.status_code, 200)
+                self.assertEqual(first.data, b"jpeg-bytes")
+                etag = first.headers.get("ETag")
+                self.assertTrue(etag)
+
+                second = self.client.get(
+                    f"/api/users/{user_id}/profile-picture",
+                    headers={"If-None-Match": etag},
+                )
+                self.assertEqual(second.status_code, 304)
+                self.assertEqual(proxy.session.get.call_count, 1)
+
+    def test_new_profile_picture_upload_bypasses_stale_cache_entry(self):
+        body = self.register_user().get_json()
+        user_id = body["user"]["id"]
+        picture = {"profile_picture": "http://cloud.test/profile_pictures/tester.jpg"}
+        self.app.db.users.update_one({"name": "tester"}, {"$set": dict(picture, profile_picture_version="file-1")})
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            proxy = ImageProxy(DiskImageCache(cache_dir), revalidate_seconds=3600)
+            proxy.session = MagicMock()
+            proxy.session.get.side_effect = [
+                SimpleNamespace(status_code=200, content=body_bytes, headers={"Content-Type": "image/jpeg"})
+                for body_bytes in (b"old-bytes", b"new-bytes")
+            ]
+
+            with patch.object(self.app, "image_proxy", proxy, create=True), \
+                    patch.object(self.app, "cloud_service", SimpleNamespace(nextcloud_user="u", nextcloud_pass="p"), create=True):
+                self.assertEqual(self.client.get(f"/api/users/{user_id}/profile-picture").data, b"old-bytes")
+
+                # Another worker stored the new upload under the same NextCloud path.
+                self.app.db.users.update_one({"name": "tester"}, {"$set": {"profile_picture_version": "file-2"}})
+                self.assertEqual(self.client.get(f"/api/users/{user_id}/profile-picture").data, b"new-bytes")
+                self.assertEqual(proxy.session.get.call_count, 2)
+
+    def test_public_image_uses_its_own_max_age(self):
+        file_id = self.app.db.files.insert_one({
+            "url": "http://cloud.test/uploads/look.jpg",
+            "filename": "look.jpg",
+            "content_type": "image/jpeg",
+        }).inserted_id
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            proxy = ImageProxy(DiskImageCache(cache_dir), revalidate_seconds=3600)
+            proxy.session = MagicMock()
+            proxy.session.get.return_value = SimpleNamespace(
+                status_code=200, content=b"jpeg-bytes", headers={"Content-Type": "image/jpeg"}
+            )
+
+            with patch.object(self.app, "image_proxy", proxy, create=True), \
+                    patch.object(self.app, "cloud_service", SimpleNamespace(nextcloud_user="u", nextcloud_pass="p"), create=True), \
+                    patch.dict(self.app.config, {"PUBLIC_IMAGE_MAX_AGE_SECONDS": 1234, "PROFILE_PICTURE_MAX_AGE_SECONDS": 5}):
+                response = self.client.get(f"/api/public/image/{file_id}")
+        self.app.db.files.delete_many({})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("max-age=1234", response.headers["Cache-Control"])
+
+    def test_profile_picture_variant_is_resized_negotiated_and_cached(self):
+        body = self.register_user().get_json()
+        user_id = body["user"]["id"]
+        self.app.db.users.update_one(
+            {"name": "tester"},
+            {"$set": {"profile_picture": "http://cloud.test/profile_pictures/tester.jpg"}},
+        )
+        source = BytesIO()
+        Image.new("RGB", (400, 200), "red").save(source, format="JPEG")
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            proxy = ImageProxy(DiskImageCache(cache_dir), revalidate_seconds=3600)
+            proxy.session = MagicMock()
+            proxy.session.get.return_value = SimpleNamespace(
+                status_code=200,
+                content=source.getvalue(),
+                headers={"Content-Type": "image/jpeg"},
+            )
+
+            with patch.object(self.app, "image_proxy", proxy, create=True), \
+                    patch.object(self.app, "cloud_service", SimpleNamespace(nextcloud_user="u", nextcloud_pass="p"), create=True), \
+                    patch("api.services.image_cache.render_variant", wraps=render_variant) as render:
+                url = f"/api/users/{user_id}/profile-picture?w=100&h=100&fit=cover"
+                first = self.client.get(url, headers={"Accept": "image/webp,image/*"})
+                self.assertEqual(first.status_code, 200)
+                self.assertEqual(first.mimetype, "image/webp")
+                self.assertIn("Accept", first.headers.get("Vary", ""))
+                with Image.open(BytesIO(first.data)) as variant:
+                    self.assertEqual(variant.size, (128, 128))
+
+                second = self.client.get(url.replace("w=100&h=100", "w=120&h=128"), headers={"Accept": "image/webp"})
+                self.assertEqual(second.data, first.data)
+                self.assertEqual(render.call_count, 1)
+
+                fallback = self.client.get(url, headers={"Accept": "*/*"})
+                self.assertEqual(fallback.mimetype, "image/jpeg")
+                self.assertEqual(proxy.session.get.call_count, 1)
+
+                self.assertEqual(self.client.get(f"/api/users/{user_id}/profile-picture?w=abc").status_code, 400)
+                self.assertEqual(self.client.get(f"/api/users/{user_id}/profile-picture?fit=stretch").status_code, 400)
+
+                with patch.object(Image, "MAX_IMAGE_PIXELS", 1000):
+                    bomb = self.client.get(f"/api/users/{user_id}/profile-picture?w=64&format=png")
+                self.assertEqual(bomb.status_code, 413)
+
+    def test_disk_image_cache_evicts_least_recently_used(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = DiskImageCache(cache_dir, max_bytes=25)
+            cache.put("a", b"x" * 10)
+            cache.put("b", b"y" * 10)
+            os.utime(cache._paths("a")[0], (1, 1))
+            cache.put("c", b"z" * 10)
+
+            self.assertIsNone(cache.get("a"))
+            self.assertEqual(cache.get("b").content, b"y" * 10)
+            self.assertEqual(cache.get("c").content, b"z" * 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
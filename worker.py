@@ -0,0 +1,67 @@
+"""Background job worker.
+
+Runs the jobs queued by the API (outfit cascades, timeline fan-out and
+thumbnail variants) and the periodic trending refresh and counter
+reconciliation from the Mongo jobs collection. Run one or more next to the web processes:
+
+    python worker.py [--batch-size N] [--poll-interval SECONDS] [--once]
+
+The Docker image starts one next to gunicorn by default; set
+PROCESS_TYPE=web and PROCESS_TYPE=worker on separate services to scale
+them independently (see docker-entrypoint.sh). Without a worker those
+jobs never run; GET /api/jobs/stats answers 503 once the queue backs up.
+"""
+
+import argparse
+import time
+
+from run import create_worker_app
+from api.services.background_jobs import job_handlers, periodic_jobs
+from api.services.job_queue import default_worker_id
+
+
+# How often a worker makes sure each periodic job is queued.
+SCHEDULE_CHECK_SECONDS = 30
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--batch-size', type=int, default=None)
+    parser.add_argument('--poll-interval', type=float, default=None)
+    parser.add_argument('--once', action='store_true', help='Run due jobs once and exit')
+    args = parser.parse_args(argv)
+
+    app = create_worker_app()
+    batch_size = args.batch_size or app.config.get('JOB_BATCH_SIZE', 50)
+    poll_interval = args.poll_interval or app.config.get('JOB_POLL_INTERVAL_SECONDS', 1)
+    handlers = job_handlers(app)
+    worker_id = default_worker_id()
+    print(f"Job worker {worker_id} started")
+
+    # Periodic jobs go through the queue, so they run once per interval
+    # however many workers are up.
+    periodic = periodic_jobs(app)
+    next_schedule = 0.0
+
+    with app.app_context():
+        while True:
+            if time.monotonic() >= next_schedule:
+                try:
+                    for kind, interval in periodic.items():
+                        app.job_queue.schedule(kind, interval)
+                except Exception:
+                    app.logger.exception('Scheduling periodic jobs failed')
+                next_schedule = time.monotonic() + SCHEDULE_CHECK_SECONDS
+            try:
+                claimed = app.job_queue.run_batch(handlers, worker_id=worker_id, batch_size=batch_size)
+            except Exception:
+                app.logger.exception('Job worker loop failed')
+                claimed = 0
+            if args.once and claimed < batch_size:
+                break
+            if not claimed:
+                time.sleep(poll_interval)
+
+
+if __name__ == '__main__':
+    main()